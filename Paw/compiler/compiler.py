@@ -0,0 +1,168 @@
+from __future__ import annotations
+import time
+from collections import deque
+from typing import Iterable, TYPE_CHECKING
+from lexer.engines import LEXER_ENGINES, DEFAULT_ENGINE
+from lexer.token_cache import TokenCache
+# The symbol table has to be imported before parser.LL1, the two modules import each other
+from symbol_table.symbol_table import SymbolTable, REDEFINE_ERROR, REDEFINE_ASK
+from parser.LL1 import Node, ProgramNode
+from parser.p_err import Diagnostic, ERROR, WARNING, LEX, PARSE
+from parser.parser import Parser
+from tokens.tokens import Token
+
+if TYPE_CHECKING:
+    # compiler.module_cache imports this module
+    from compiler.module_cache import ModuleCache
+
+
+class CompileOptions:
+    """
+    How compile_source and compile_file run:
+        engine        name of the lexer engine in LEXER_ENGINES
+        redefinition  redefinition policy of the symbol tables, 'error', 'warn' or 'shadow' (see SymbolTable)
+        token_cache   TokenCache to load and store the tokens of the source in, None lexes every time
+        module_cache  ModuleCache (see compiler/module_cache.py) to load and store whole results of
+                      compile_source in, None compiles every time
+    """
+
+    def __init__(self,
+                 engine: str = DEFAULT_ENGINE,
+                 redefinition: str = REDEFINE_ERROR,
+                 token_cache: TokenCache | None = None,
+                 module_cache: ModuleCache | None = None):
+        if engine not in LEXER_ENGINES:
+            raise ValueError(f"Unknown lexer engine '{engine}', expected one of {list(LEXER_ENGINES)}")
+        self.engine = engine
+        self.redefinition = redefinition
+        self.token_cache = token_cache
+        self.module_cache = module_cache
+
+    def __repr__(self):
+        return f"CompileOptions(engine={self.engine!r}, redefinition={self.redefinition!r})"
+
+
+class CompileResult:
+    """
+    Everything one compilation produced. ast is the ProgramNode and statements its top level statements,
+    both None when the source could not be lexed. symbols is the global SymbolTable. timings holds the
+    seconds each stage took: 'read' (compile_file only), 'lex', 'parse' (symbols are built while parsing)
+    and 'total', or only 'load' and 'total' for a result loaded from the module cache.
+    """
+
+    def __init__(self, source: str, filename: str | None = None):
+        self.source = source
+        self.filename = filename
+        self.tokens: Iterable[Token] | None = None
+        self.ast: ProgramNode | None = None
+        self.statements: deque[Node] | None = None
+        self.symbols: SymbolTable | None = None
+        self.diagnostics: list[Diagnostic] = []
+        self.timings: dict[str, float] = {}
+
+    @property
+    def errors(self) -> list[Diagnostic]:
+        return [diagnostic for diagnostic in self.diagnostics if diagnostic.severity == ERROR]
+
+    @property
+    def warnings(self) -> list[Diagnostic]:
+        return [diagnostic for diagnostic in self.diagnostics if diagnostic.severity == WARNING]
+
+    @property
+    def ok(self) -> bool:
+        return self.ast is not None and not self.errors
+
+    def __repr__(self):
+        return f"CompileResult({self.filename or '<source>'}, {'ok' if self.ok else 'failed'}, " \
+               f"{len(self.errors)} errors, {len(self.warnings)} warnings)"
+
+
+def _lex(source: str, options: CompileOptions) -> Iterable[Token]:
+    cache = options.token_cache
+    cached = cache.load(source) if cache is not None else None
+    if cached is not None:
+        return cached
+    lexer = LEXER_ENGINES[options.engine](character_stream=source)
+    tokenize = getattr(lexer, "tokenize", None)
+    if tokenize is not None:
+        tokenize()
+    else:
+        for _ in lexer:
+            pass
+    if cache is not None:
+        cache.store(source, lexer.tokens)
+    return lexer.tokens
+
+
+def compile_source(text: str, options: CompileOptions | None = None, filename: str | None = None) -> CompileResult:
+    """
+    Lexes and parses text and builds its symbol tables without printing, sleeping or asking anything.
+    Problems end up in the diagnostics of the result instead of being raised, including the parser
+    failing on a construct it cannot handle yet.
+    """
+    options = options or CompileOptions()
+    cache = options.module_cache
+    # What ask makes of a source depends on the answers, it is not cached
+    if cache is None or options.redefinition == REDEFINE_ASK:
+        return _compile(text, options, filename)
+    start_time = time.perf_counter()
+    result = cache.load(text, options, filename)
+    if result is not None:
+        result.timings['load'] = result.timings['total'] = time.perf_counter() - start_time
+        return result
+    result = _compile(text, options, filename)
+    cache.store(result, options)
+    return result
+
+
+def _compile(text: str, options: CompileOptions, filename: str | None = None, statement_cache=None,
+             tokens: list[Token] | None = None) -> CompileResult:
+    # tokens are those of text lexed already, the statement_cache is used by compiler/incremental.py
+    result = CompileResult(text, filename)
+    start_time = time.perf_counter()
+
+    try:
+        result.tokens = tokens if tokens is not None else _lex(text, options)
+    except (ValueError, IndexError) as e:
+        # The lexers raise on malformed numbers
+        result.diagnostics.append(Diagnostic(ERROR, f"Could not lex the source: {e}", stage=LEX))
+    lexed_time = time.perf_counter()
+    result.timings['lex'] = lexed_time - start_time
+    if result.tokens is None:
+        result.timings['total'] = lexed_time - start_time
+        return result
+
+    # Reusing statements needs a journal of what every statement did to the symbol tables
+    result.symbols = SymbolTable(redefinition=options.redefinition,
+                                 journal=[] if statement_cache is not None else None)
+    parser = Parser(result.tokens, result.symbols, verbose=False, statement_cache=statement_cache)
+    failure = None
+    try:
+        result.statements = parser.parse()
+    except Exception as e:
+        token = parser.current_token if isinstance(parser.current_token, Token) else None
+        failure = Diagnostic(ERROR, f"The parser failed: {type(e).__name__}: {e}", token, PARSE)
+    parsed_time = time.perf_counter()
+    result.timings['parse'] = parsed_time - lexed_time
+    result.timings['total'] = parsed_time - start_time
+
+    program_symbol, _ = result.symbols.lookup('PROGRAM')
+    if program_symbol is not None:
+        result.ast = program_symbol.node
+    result.diagnostics.extend(Diagnostic.from_parse_error(error) for error in parser.errors)
+    if failure is not None:
+        result.diagnostics.append(failure)
+    result.diagnostics.extend(result.symbols.diagnostics)
+    return result
+
+
+def compile_file(path: str, options: CompileOptions | None = None) -> CompileResult:
+    # A missing or unreadable file raises OSError, it is not a problem of the source
+    start_time = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    read_time = time.perf_counter() - start_time
+    result = compile_source(text, options, filename=path)
+    result.timings = {'read': read_time, **result.timings}
+    result.timings['total'] += read_time
+    return result
@@ -0,0 +1,433 @@
+from __future__ import annotations
+import argparse
+import time
+from bisect import bisect_left
+from itertools import islice
+from operator import attrgetter
+from tabulate import tabulate
+from compiler.compiler import CompileOptions, CompileResult, _compile, _lex
+from lexer.incremental import IncrementalLexer
+from parser.p_err import ParseError
+from parser.parser import PARSE_TABLE
+from tokens.token_cursor import TokenCursor
+from tokens.tokens import Token, TokenKind
+
+
+class StatementRecord:
+    """
+    One statement of a parse kept for the next one: its node (value), its tokens, the errors and diagnostics
+    it produced and, in order, what it read from and did to the symbol table it was parsed in (events):
+        ('lookup', name, symbol, node)  name resolved to symbol, None when it was not found, its node was node
+        ('local', name, symbol, None)   name was bound to symbol in the table itself before it was defined
+        ('access', table, name, symbol, node)  a lookup like lookup in another table, a context read with ::
+        ('inner', number)               the statement took the anonymous context number
+        ('define', name, symbol, node)  the statement defined name, symbol.node was node
+        ('enter', table)                table is a context the statement entered
+        ('assign', symbol, node)        the statement assigned node to a symbol defined before it
+        ('move', token, source)         token was made from source, one of the tokens of the statement
+    Symbols and tables the statement made itself only show up in define and enter events.
+    """
+
+    def __init__(self, key: tuple, value, tokens: list[Token], events: list[tuple], errors: list[tuple[Token, str]],
+                 diagnostics: list):
+        self.key = key
+        self.value = value
+        self.tokens = tokens
+        self.events = events
+        self.errors = errors
+        self.diagnostics = diagnostics
+
+    def __repr__(self):
+        return f"StatementRecord({self.value!r}, {len(self.tokens)} tokens, {len(self.events)} events)"
+
+
+# Tokens that may follow a statement. Parsing its trailing semicolons looks at the token after it, a
+# statement followed by anything else is parsed again for the error.
+FOLLOWERS = frozenset(kind for nonterminal, kind in PARSE_TABLE if nonterminal == 'Semicolons')
+
+
+def move(token: Token, to: Token):
+    token.begin_position = to.begin_position
+    token.line_position = to.line_position
+    # Some made up tokens have no column
+    if token.column_position is not None:
+        token.column_position = to.column_position
+
+
+class _Pending:
+    # A statement being parsed that is recorded once the parser is done with it, see StatementCache.leave
+    def __init__(self, parser, tokens: list[Token], key: tuple):
+        self.tokens = tokens
+        self.key = key
+        self.table = parser.symbol_table
+        self.end = parser.tokens.position + len(tokens)
+        self.errors = len(parser.errors)
+        self.diagnostics = len(self.table.diagnostics)
+        self.journal = len(self.table.journal)
+
+
+class StatementCache:
+    """
+    The statements of the previous parse, the statement_cache of the Parser (see Parser.statement).
+
+    A statement is found again by the symbol table it starts in and the kinds and lexemes of its tokens, so
+    moving it around or editing other lines does not matter. It is reused when everything it read from the
+    symbol tables still resolves the same way: its node, symbols and context tables are put back and its
+    effects on the symbol tables replayed, instead of parsing it again. Statements in blocks are kept as
+    well, an edit inside a function reparses the function statement but reuses the statements of its body
+    that did not change.
+
+    The symbol tables have to keep a journal (SymbolTable(journal=[])), it is what the reads and effects
+    of a statement are taken from. With nested False only top level statements are kept.
+    """
+
+    def __init__(self, nested: bool = True):
+        self.nested = nested
+        self.records: dict[tuple, list[StatementRecord]] = {}
+        self.previous: dict[tuple, list[StatementRecord]] = {}
+        # The same records by their first token, tokens an IncrementalLexer kept find them without a key
+        self.starts: dict[int, StatementRecord] = {}
+        self.previous_starts: dict[int, StatementRecord] = {}
+        self._used: set[int] = set()
+        self.reused = 0
+        self.parsed = 0
+        self.reused_tokens = 0
+
+    def start(self):
+        # A new parse, the statements the last one recorded are the ones to reuse now
+        self.previous, self.records = self.records, {}
+        self.previous_starts, self.starts = self.starts, {}
+        self._used = set()
+        self.reused = self.parsed = self.reused_tokens = 0
+
+    @staticmethod
+    def span(tokens: TokenCursor) -> list[Token] | None:
+        """
+        The tokens of the statement at the cursor: up to its ';' outside of braces and the ';' right after
+        it. None when the statement does not end before the input or the block it is in does.
+        """
+        buffer = tokens.buffer
+        if buffer is None:
+            # Tokens read through a lexer, finding where statements end takes the rest of them
+            while tokens.buffer is None:
+                tokens.peek(len(tokens) - tokens.position)
+            buffer = tokens.buffer
+        start = index = tokens.position
+        depth = 0
+        lbrace, rbrace, semicolon, eof = TokenKind.LBRACE, TokenKind.RBRACE, TokenKind.SEMICOLON, TokenKind.EOF
+        while True:
+            kind = buffer[index].kind
+            index += 1
+            if kind == semicolon:
+                if depth == 0:
+                    break
+            elif kind == lbrace:
+                depth += 1
+            elif kind == rbrace:
+                depth -= 1
+                if depth < 0:
+                    return None
+            elif kind == eof:
+                return None
+        while buffer[index].kind == semicolon:
+            index += 1
+        return buffer[start:index]
+
+    @staticmethod
+    def valid(record: StatementRecord, table) -> bool:
+        # Whether everything the statement read resolves the same way in table
+        for event in record.events:
+            kind = event[0]
+            if kind == 'lookup':
+                symbol = table.resolve(event[1])
+                if symbol is not event[2] or (symbol is not None and symbol.node is not event[3]):
+                    return False
+            elif kind == 'access':
+                symbol = event[1].resolve(event[2])
+                if symbol is not event[3] or (symbol is not None and symbol.node is not event[4]):
+                    return False
+            elif kind == 'local':
+                if table.current_context().get(event[1]) is not event[2]:
+                    return False
+            elif kind == 'inner':
+                if not table.inners or table.inners[0] != event[1]:
+                    return False
+        return True
+
+    def enter(self, parser) -> tuple[bool, object, _Pending | None]:
+        """
+        Called by the parser at the start of every statement. Returns (True, node, None) after replaying a
+        statement of the previous parse, the parser has been moved past it, else (False, None, entry) and
+        the parser hands entry to leave once it has parsed the statement.
+        """
+        table = parser.symbol_table
+        if not parser.frames:
+            # Nothing outside of a top level statement can still need its events
+            table.journal.clear()
+        elif not self.nested:
+            return False, None, None
+        record = self.previous_starts.get(id(parser.current_token))
+        if record is not None and self.unchanged(record, parser.tokens, table):
+            tokens = record.tokens
+            candidates = [record]
+            key = record.key
+        else:
+            tokens = self.span(parser.tokens)
+            if tokens is None:
+                return False, None, None
+            key = (table.context_name, table.context_level, tuple((token.kind, token.lexeme) for token in tokens))
+            candidates = self.previous.get(key, ())
+        if parser.tokens.peek(len(tokens)).kind not in FOLLOWERS:
+            candidates = ()
+        for record in candidates:
+            if id(record) in self._used or not self.valid(record, table):
+                continue
+            # Other tokens that read the same, an IncrementalLexer may have kept the old ones further on. They
+            # cannot be in the token list twice.
+            if record.tokens != tokens and self.live(record.tokens, parser.tokens.buffer):
+                continue
+            self._used.add(id(record))
+            self.replay(parser, record, tokens)
+            self.keep(record)
+            self.reused += 1
+            self.reused_tokens += len(tokens)
+            return True, record.value, None
+        self.parsed += 1
+        return False, None, _Pending(parser, tokens, key)
+
+    @staticmethod
+    def unchanged(record: StatementRecord, tokens: TokenCursor, table) -> bool:
+        # Whether the statement at the cursor is made of the very tokens of record, as an IncrementalLexer
+        # keeps them. Comparing the lists compares the objects, no need to look for the end of the statement.
+        buffer = tokens.buffer
+        if buffer is None or record.key[0] != table.context_name or record.key[1] != table.context_level:
+            return False
+        end = tokens.position + len(record.tokens)
+        return buffer[tokens.position:end] == record.tokens and buffer[end].kind != TokenKind.SEMICOLON
+
+    @staticmethod
+    def live(tokens: list[Token], buffer: list[Token]) -> bool:
+        # Whether any of tokens is in buffer, which is in order of begin_position
+        for token in tokens:
+            index = bisect_left(buffer, token.begin_position, key=attrgetter('begin_position'))
+            if index < len(buffer) and buffer[index] is token:
+                return True
+        return False
+
+    def keep(self, record: StatementRecord):
+        self.records.setdefault(record.key, []).append(record)
+        self.starts[id(record.tokens[0])] = record
+
+    @staticmethod
+    def replay(parser, record: StatementRecord, tokens: list[Token]):
+        # Does to the symbol tables what parsing the statement again would, and skips its tokens
+        # The nodes keep the tokens of the parse that made them. They take the place of the new ones in the
+        # token list, an IncrementalLexer working on it keeps them in step with later edits.
+        if record.tokens != tokens:
+            for old, new in zip(record.tokens, tokens):
+                move(old, new)
+            position = parser.tokens.position
+            parser.tokens.buffer[position:position + len(tokens)] = record.tokens
+        table = parser.symbol_table
+        journal = table.journal
+        for event in record.events:
+            kind = event[0]
+            if kind == 'move':
+                # Made up tokens are not in the token list, they move with the one they were made from
+                move(event[1], event[2])
+                journal.append(event)
+
+        for event in record.events:
+            kind = event[0]
+            if kind == 'lookup' or kind == 'local':
+                # Statements around this one depend on what it read
+                journal.append((kind, table, event[1], event[2], event[3]))
+            elif kind == 'access':
+                journal.append(('lookup',) + event[1:])
+            elif kind == 'inner':
+                table.inner_context_name()
+            elif kind == 'define':
+                symbol = event[2]
+                symbol.node = event[3]
+                symbol.create_symbol()
+                table.restore(event[1], symbol)
+            elif kind == 'enter':
+                # The context was made in an earlier parse, reads through it go to this one's journal now
+                event[1]._parent_table = table
+                event[1].journal = journal
+                journal.append(('enter', table, event[1]))
+            elif kind == 'assign':
+                table.reassign(event[1], event[2])
+        parser.errors.extend(ParseError(token, reason) for token, reason in record.errors)
+        table.diagnostics.extend(record.diagnostics)
+        parser.reset(parser.tokens.position + len(tokens))
+
+    def leave(self, parser, pending: _Pending, value):
+        """
+        Called by the parser with the entry enter handed out once the statement is parsed, records it.
+        """
+        if parser.tokens.position != pending.end:
+            # Recovering from an error went past the end of the statement
+            return
+        # Statements reused inside this one have put their own tokens into the list
+        tokens = parser.tokens.buffer[pending.end - len(pending.tokens):pending.end]
+        table = pending.table
+        journal = table.journal[pending.journal:]
+        tables = {id(event[2]) for event in journal if event[0] == 'enter'}
+        symbols = {id(event[3]) for event in journal if event[0] == 'define' and event[5]}
+
+        # Symbols the statement assigned to, what it reads from them after that it wrote itself
+        assigned = set()
+        events = []
+        for event in journal:
+            kind = event[0]
+            if kind == 'lookup' or kind == 'local':
+                if id(event[3]) in symbols or id(event[3]) in assigned:
+                    continue
+                # Lookups inside contexts the statement entered go through table for anything defined outside
+                if event[1] is table or (kind == 'lookup' and id(event[1]) in tables):
+                    events.append((kind, event[2], event[3], event[4]))
+                elif kind == 'lookup':
+                    # A name read through a context of its own, what that context holds can change as well
+                    events.append(('access', event[1], event[2], event[3], event[4]))
+            elif kind == 'define':
+                if event[1] is table:
+                    if id(event[4]) not in symbols:
+                        events.append(('local', event[2], event[4], None))
+                    if event[5]:
+                        events.append(('define', event[2], event[3], event[3].node))
+            elif kind == 'enter':
+                if event[1] is table:
+                    events.append(('enter', event[2]))
+                # Context tokens are made up from the name or the brace in front of the block
+                context_token = event[2].context_token
+                for token in tokens:
+                    if token.begin_position == context_token.begin_position:
+                        events.append(('move', context_token, token))
+                        break
+            elif kind == 'move':
+                events.append(event)
+            elif kind == 'inner':
+                if event[1] is table:
+                    events.append(('inner', event[2]))
+            elif kind == 'assign':
+                if id(event[1]) not in symbols:
+                    events.append(('assign', event[1], event[2]))
+                    assigned.add(id(event[1]))
+
+        errors = [(error.token, error.reason) for error in islice(parser.errors, pending.errors, None)]
+        self.keep(StatementRecord(pending.key, value, tokens, events, errors,
+                                  table.diagnostics[pending.diagnostics:]))
+
+
+class IncrementalParser:
+    """
+    Keeps a source compiled across edits, as an editor would while it is being typed in. compile takes a
+    whole new version of the source, edit a change to the current one, which is relexed around the edit
+    with an IncrementalLexer. Either way only the statements that changed, or whose names now resolve to
+    something else, are parsed again, the others are reused from the previous compile.
+
+    The results share nodes and symbols: reusing a statement hands out the node of the earlier result again
+    and moves its tokens to their new positions. Only the latest result is up to date.
+    """
+
+    def __init__(self, options: CompileOptions | None = None, filename: str | None = None):
+        self.options = options or CompileOptions()
+        self.filename = filename
+        self.cache = StatementCache()
+        self.source: str | None = None
+        # None while the source cannot be lexed, edits are then compiled in full
+        self.lexer: IncrementalLexer | None = None
+
+    def compile(self, text: str) -> CompileResult:
+        self.cache.start()
+        self.source = text
+        start_time = time.perf_counter()
+        try:
+            self.lexer = IncrementalLexer(text, _lex(text, self.options))
+        except (ValueError, IndexError):
+            # Compiled again for the diagnostic
+            self.lexer = None
+            return _compile(text, self.options, self.filename, statement_cache=self.cache)
+        return self._parse(time.perf_counter() - start_time)
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> CompileResult:
+        """
+        Replaces deleted characters at offset of the current source with inserted and compiles the result,
+        see IncrementalLexer.edit.
+        """
+        if self.source is None:
+            raise ValueError("Nothing to edit, compile a source first")
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.source):
+            raise ValueError(f"Edit ({offset}, {deleted}) falls outside of the source")
+        source = self.source[:offset] + inserted + self.source[offset + deleted:]
+        if self.lexer is None:
+            return self.compile(source)
+        start_time = time.perf_counter()
+        try:
+            self.lexer.edit(offset, deleted, inserted)
+        except ValueError:
+            # The edit made the source impossible to lex
+            return self.compile(source)
+        self.cache.start()
+        self.source = source
+        return self._parse(time.perf_counter() - start_time)
+
+    def _parse(self, lex_time: float) -> CompileResult:
+        # The parser reads the list of the lexer in place, reused statements put their tokens back into it
+        result = _compile(self.source, self.options, self.filename, statement_cache=self.cache,
+                          tokens=self.lexer.tokens)
+        result.timings['lex'] = lex_time
+        result.timings['total'] += lex_time
+        return result
+
+    @property
+    def stats(self) -> dict[str, int]:
+        # Of the last compile, statements in blocks included
+        return {"reused": self.cache.reused, "parsed": self.cache.parsed, "reused_tokens": self.cache.reused_tokens}
+
+
+def main():
+    from parser.benchmark import generate_source
+
+    arg_parser = argparse.ArgumentParser(description="Time compiling a source again after inserting a statement.")
+    arg_parser.add_argument("--statements", type=int, nargs="+", default=[500, 2000, 8000],
+                            help="statements in the sources")
+    arg_parser.add_argument("--depth", type=int, default=4, help="nesting depth of their expressions")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    options = CompileOptions(redefinition='shadow')
+    inserted = "let edited = 1 + 2;\n"
+    rows = []
+    for statements in args.statements:
+        source = generate_source(args.depth, statements)
+        # In the middle of the source, every statement after it moves
+        offset = source.index("\n", len(source) // 2) + 1
+        edited = source[:offset] + inserted + source[offset:]
+
+        full = incremental = float("inf")
+        for _ in range(args.repeat):
+            full = min(full, compile_time(lambda: _compile(edited, options)))
+            parser = IncrementalParser(options)
+            parser.compile(source)
+            incremental = min(incremental, compile_time(lambda: parser.edit(offset, 0, inserted)))
+        stats = parser.stats
+        rows.append([statements, f"{full * 1e3:.1f}", f"{incremental * 1e3:.1f}", f"{full / incremental:.1f}x",
+                     stats["reused"], stats["parsed"]])
+
+    print(tabulate(rows, headers=["Statements", "Full ms", "Edit ms", "Speedup", "Reused", "Parsed"],
+                   tablefmt="grid"))
+
+
+def compile_time(compile) -> float:
+    start_time = time.perf_counter()
+    result = compile()
+    if result.errors:
+        raise ValueError(f"The benchmark source does not compile: {result.errors[0]}")
+    return time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    # python -m compiler.incremental, run from the Paw directory
+    main()
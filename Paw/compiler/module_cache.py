@@ -0,0 +1,117 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from tabulate import tabulate
+from compiler.compiler import CompileOptions, CompileResult, compile_source
+from compiler.serialization import ModuleImage, FORMAT_VERSION, dumps, loads
+from lexer.token_cache import DirectoryCache, LEXER_VERSION
+from parser.benchmark import generate_source
+
+# Bump whenever the AST, symbol tables or diagnostics compile_source makes of a source change, old cache
+# entries are then never hit again
+COMPILER_VERSION = 1
+
+# Module images are about a hundred bytes per token, a few large programs fit in this
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def default_directory() -> str:
+    return os.environ.get("MONKE_MODULE_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "monkepaw",
+                                                                  "modules")
+
+
+class ModuleCache(DirectoryCache):
+    """
+    Content-addressed on-disk cache of compiled modules, what compile_source made of a source stored as
+    a ModuleImage (see compiler/serialization.py), so an unchanged source is loaded instead of lexed and
+    parsed again.
+
+    Entries are keyed by the SHA-256 of COMPILER_VERSION, LEXER_VERSION, the image format, the lexer
+    engine and redefinition policy of the options, and the source. Writing and evicting entries is up to
+    DirectoryCache.
+    """
+    suffix = '.mod'
+
+    def __init__(self, directory: str | None = None, max_bytes: int = MAX_CACHE_BYTES):
+        super().__init__(directory or default_directory(), max_bytes)
+
+    @staticmethod
+    def key(source: str, options: CompileOptions) -> str:
+        digest = hashlib.sha256(f"{COMPILER_VERSION}:{LEXER_VERSION}:{FORMAT_VERSION}:"
+                                f"{options.engine}:{options.redefinition}:".encode())
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def load(self, source: str, options: CompileOptions, filename: str | None = None) -> CompileResult | None:
+        """
+        The cached result of compiling source with options, None on a miss. Unreadable or damaged entries
+        count as misses.
+        """
+        key = self.key(source, options)
+        data = self.read(key)
+        if data is None:
+            return None
+        try:
+            image = loads(data)
+            result = image.to_result(source, filename) if image is not None else None
+        except (pickle.UnpicklingError, EOFError, ValueError, TypeError, IndexError, AttributeError):
+            result = None
+        if result is None:
+            self._remove(self.path(key))
+        return result
+
+    def store(self, result: CompileResult, options: CompileOptions):
+        self.write(self.key(result.source, options), dumps(ModuleImage.from_result(result)))
+
+
+def benchmark(source: str, repeat: int = 3) -> dict:
+    """
+    Best of repeat runs of compile_source on source, of storing its result in a ModuleCache and of
+    compile_source loading it from there.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ModuleCache(directory)
+        plain = CompileOptions(engine="pattern", redefinition='shadow')
+        cached = CompileOptions(engine="pattern", redefinition='shadow', module_cache=cache)
+        timings = {'compile': float('inf'), 'store': float('inf'), 'load': float('inf')}
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            result = compile_source(source, plain)
+            timings['compile'] = min(timings['compile'], time.perf_counter() - start_time)
+            start_time = time.perf_counter()
+            cache.store(result, cached)
+            timings['store'] = min(timings['store'], time.perf_counter() - start_time)
+            start_time = time.perf_counter()
+            loaded = compile_source(source, cached)
+            timings['load'] = min(timings['load'], time.perf_counter() - start_time)
+            if 'load' not in loaded.timings:
+                raise RuntimeError("compile_source did not load the stored module")
+        timings['bytes'] = os.path.getsize(cache.path(cache.key(source, cached)))
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare compiling a source with loading it from the cache.")
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[1, 16, 256],
+                            help="nesting depths of the generated expressions, see parser/benchmark.py")
+    arg_parser.add_argument("--statements", type=int, default=200, help="statements per source")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    rows = []
+    for depth in args.depths:
+        source = generate_source(depth, args.statements)
+        r = benchmark(source, args.repeat)
+        rows.append([f"depth {depth}", len(source), f"{r['compile'] * 1e3:.1f}", f"{r['store'] * 1e3:.1f}",
+                     f"{r['load'] * 1e3:.1f}", f"{r['compile'] / r['load']:.1f}x", r['bytes']])
+    print(tabulate(rows, headers=["Source", "Characters", "Compile ms", "Store ms", "Load ms", "Speedup",
+                                  "Entry bytes"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    # python -m compiler.module_cache --depths 1 16 256, run from the Paw directory
+    main()
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import gc
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from compiler.compiler import CompileOptions, CompileResult, _compile, _lex
+from compiler.incremental import StatementCache, StatementRecord
+from lexer.incremental import token_start, token_end
+from lexer.pattern_lexer import PatternLexer
+from parser.p_err import Diagnostic, ERROR, LEX
+from parser.parser import Parser
+from symbol_table.symbol_table import SymbolTable, REDEFINE_ASK
+from tokens.tokens import Token, TokenKind
+
+# Below this many tokens in units starting worker processes costs more than it saves
+MIN_UNIT_TOKENS = 20000
+
+# Top level statements that are parsed on the workers, the ones with a context of their own
+UNIT_KINDS = frozenset((TokenKind.CONTEXT, TokenKind.FUNCTION))
+
+
+def find_units(tokens: list[Token]) -> list[tuple[int, int]]:
+    """
+    The (start, end) token ranges of the top level context and function statements, each with its
+    braces balanced and its semicolons. Scanning stops at the first statement that does not end, the
+    sequential parse reports it.
+    """
+    units = []
+    depth = 0
+    start = 0
+    index = 0
+    end_of_input = len(tokens) - 1
+    lbrace, rbrace, semicolon = TokenKind.LBRACE, TokenKind.RBRACE, TokenKind.SEMICOLON
+    while index < end_of_input:
+        kind = tokens[index].kind
+        index += 1
+        if kind == lbrace:
+            depth += 1
+        elif kind == rbrace:
+            depth -= 1
+            if depth < 0:
+                # A stray '}', the statements after it start afresh
+                depth = 0
+                start = index
+        elif kind == semicolon and depth == 0:
+            while index < end_of_input and tokens[index].kind == semicolon:
+                index += 1
+            if tokens[start].kind in UNIT_KINDS:
+                units.append((start, index))
+            start = index
+    return units
+
+
+def batches(units: list[tuple[int, int]], parts: int) -> list[list[tuple[int, int]]]:
+    # Splits units into up to parts runs in source order with about as many tokens each
+    total = sum(end - start for start, end in units)
+    size = total / max(parts, 1)
+    runs, run, tokens = [], [], 0
+    for unit in units:
+        run.append(unit)
+        tokens += unit[1] - unit[0]
+        if tokens >= size * (len(runs) + 1) and len(runs) < parts - 1:
+            runs.append(run)
+            run = []
+    if run:
+        runs.append(run)
+    return runs
+
+
+def parse_units(text: str, ranges: list[tuple[int, int, int]],
+                redefinition: str) -> tuple[list[Token], list[StatementRecord]]:
+    """
+    Worker side of compile_parallel: lexes a run of units, (position, line_position, end) ranges of text,
+    and parses them as a program of their own. Returns the tokens and the records of the units. Lexing here
+    is cheaper than sending the tokens over.
+    """
+    tokens = []
+    for position, line_position, end in ranges:
+        for token in PatternLexer(text, keep_tokens=False, position=position, line_position=line_position):
+            if token.kind == TokenKind.EOF or token.begin_position >= end:
+                break
+            tokens.append(token)
+    # Records of the statements in the units would only double what has to be sent back
+    cache = StatementCache(nested=False)
+    table = SymbolTable(redefinition=redefinition, journal=[])
+    Parser(tokens, table, verbose=False, statement_cache=cache).parse()
+    # The tables share the journal, the records have what they need from it
+    table.journal.clear()
+    return tokens, [record for records in cache.records.values() for record in records]
+
+
+def compile_parallel(text: str, options: CompileOptions | None = None, filename: str | None = None,
+                     max_workers: int | None = None, min_unit_tokens: int = MIN_UNIT_TOKENS) -> CompileResult:
+    """
+    compile_source with the top level context and function statements parsed on a ProcessPoolExecutor.
+
+    Each worker parses a run of them on its own, with nothing of the program around them, and sends back
+    the records of their statements (see StatementCache). The program is then parsed sequentially, reusing
+    every unit whose reads still hold in the real symbol tables: its context and symbols are stitched
+    under the global table in source order. A unit that used a name the worker did not have, or that is
+    defined differently by the statements in between, is parsed again in that pass, so the result is the
+    one of compile_source. result.timings has 'units', the seconds until all of the workers were done.
+    """
+    options = options or CompileOptions()
+    max_workers = max_workers or os.cpu_count() or 1
+    if options.redefinition == REDEFINE_ASK or max_workers < 2:
+        return _compile(text, options, filename)
+
+    start_time = time.perf_counter()
+    try:
+        tokens = _lex(text, options)
+    except (ValueError, IndexError) as e:
+        result = CompileResult(text, filename)
+        result.diagnostics.append(Diagnostic(ERROR, f"Could not lex the source: {e}", stage=LEX))
+        result.timings['lex'] = result.timings['total'] = time.perf_counter() - start_time
+        return result
+    tokens = list(tokens)
+    lex_time = time.perf_counter() - start_time
+
+    units = find_units(tokens)
+    if not units or sum(end - start for start, end in units) < min_unit_tokens:
+        result = _compile(text, options, filename, tokens=tokens)
+        result.timings['lex'] = lex_time
+        result.timings['total'] += lex_time
+        return result
+
+    cache = StatementCache()
+    runs = batches(units, max_workers)
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(runs))) as pool:
+        futures = [pool.submit(parse_units, text,
+                               [(token_start(tokens[start]), tokens[start].line_position, token_end(tokens[end - 1]))
+                                for start, end in run],
+                               options.redefinition)
+                   for run in runs]
+        # Unpickling the records makes objects by the thousand, the collector has nothing to find in them
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for run, future in zip(runs, futures):
+                unit_tokens, records = future.result()
+                # The very tokens of the records take the place of those lexed here. Should the engine of the
+                # options have lexed differently the records are still found by their key.
+                if len(unit_tokens) == sum(end - start for start, end in run):
+                    index = 0
+                    for start, end in run:
+                        tokens[start:end] = unit_tokens[index:index + end - start]
+                        index += end - start
+                for record in records:
+                    cache.keep(record)
+        finally:
+            if collecting:
+                gc.enable()
+    units_time = time.perf_counter() - start_time - lex_time
+
+    # The records of the workers are the ones to reuse
+    cache.start()
+    result = _compile(text, options, filename, statement_cache=cache, tokens=tokens)
+    result.timings = {'lex': lex_time, 'units': units_time, 'parse': result.timings['parse'],
+                      'total': time.perf_counter() - start_time}
+    return result
+
+
+def benchmark(source: str, worker_counts: list[int], repeat: int = 3) -> list[tuple[int, float, float]]:
+    """
+    Times compile_parallel on source for every worker count, best of repeat runs.
+    Returns (workers, seconds, speedup over compile_source) rows.
+    """
+    options = CompileOptions(engine="pattern", redefinition='shadow')
+    single = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        _compile(source, options)
+        single = min(single, time.perf_counter() - start_time)
+    rows = [(1, single, 1.0)]
+    for workers in worker_counts:
+        if workers < 2:
+            continue
+        best = float('inf')
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            compile_parallel(source, options, max_workers=workers, min_unit_tokens=0)
+            best = min(best, time.perf_counter() - start_time)
+        rows.append((workers, best, single / best))
+    return rows
+
+
+def generate_source(contexts: int, statements: int = 50) -> str:
+    # contexts named contexts of statements let statements each, with a global they all read at the end
+    lines = ["let shared = 1;"]
+    for i in range(contexts):
+        body = " ".join(f"let v{j} = ({j} + {i}) * {j + 1} - {i % 7};" for j in range(statements))
+        lines.append(f"context c{i} {{ {body} }};")
+    lines.append("context last { let total = shared + 1; };")
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    # python -m compiler.parallel [contexts], run from the Paw directory
+    contexts = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    corpus = generate_source(contexts)
+    cores = os.cpu_count() or 1
+    counts = sorted({cores} | {2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores})
+    print(f"{contexts} contexts, {len(corpus) / 1e6:.1f} MB, {cores} cores")
+    for workers, seconds, speedup in benchmark(corpus, counts):
+        print(f"{workers:>3} workers  {seconds:8.3f}s  {speedup:5.2f}x")
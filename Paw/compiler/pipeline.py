@@ -0,0 +1,160 @@
+from __future__ import annotations
+import argparse
+import gc
+import itertools
+import time
+import tracemalloc
+from typing import Iterator
+from tabulate import tabulate
+from compiler.compiler import CompileOptions, CompileResult, compile_source
+from lexer.engines import LEXER_ENGINES
+from symbol_table.symbol_table import SymbolTable
+from parser.LL1 import Node
+from parser.p_err import Diagnostic, ERROR, LEX, PARSE
+from parser.parser import Parser
+from parser.visitor import walk
+from tokens.tokens import Token
+
+# How to make each lexer engine hand its tokens out without keeping them. The others lex the whole source
+# before handing out the first token and keep all of it.
+STREAMING_LEXERS = {
+    "classic": {"keep_tokens": False},
+    "pattern": {"keep_tokens": False},
+    "stream": {"token_history": 0},
+}
+
+
+class StatementStream:
+    """
+    compile_source pulled a top level statement at a time. Iterating the stream lexes and parses the text
+    only as far as the next statement and yields it, so a consumer, symbol checks, code generation or
+    serialization, starts on the first statement while the rest of the text is still to be read. Neither
+    the statements nor their tokens are collected, once the consumer lets go of a statement what is left
+    of it is what the symbol tables refer to.
+
+    result is a CompileResult filled in as the statements are pulled: symbols from the start, the
+    diagnostics of the statements parsed so far, and once the stream is done the diagnostics of the symbol
+    tables and timings['total'], the consumer's time included. ast is the ProgramNode with an empty
+    statement list, tokens and statements stay None. A stream is iterated once, the caches of the options
+    are not used, both need the whole source.
+    """
+
+    def __init__(self, text: str, options: CompileOptions | None = None, filename: str | None = None):
+        self.options = options or CompileOptions()
+        self.result = CompileResult(text, filename)
+        self.result.symbols = SymbolTable(redefinition=self.options.redefinition)
+        # Statements handed out so far
+        self.count = 0
+
+    def _tokens(self, lexer) -> Iterator[Token]:
+        # The lexers raise on malformed numbers, the stream then ends there as if the source did
+        try:
+            yield from lexer
+        except (ValueError, IndexError) as e:
+            self.result.diagnostics.append(Diagnostic(ERROR, f"Could not lex the source: {e}", stage=LEX))
+
+    def __iter__(self) -> Iterator[Node]:
+        result = self.result
+        start_time = time.perf_counter()
+        lexer = LEXER_ENGINES[self.options.engine](character_stream=result.source,
+                                                   **STREAMING_LEXERS.get(self.options.engine, {}))
+        parser = Parser(self._tokens(lexer), result.symbols, verbose=False)
+        reported = 0
+        try:
+            for statement in parser.statements(keep=False):
+                if result.ast is None:
+                    result.ast = result.symbols.lookup('PROGRAM')[0].node
+                if len(parser.errors) > reported:
+                    result.diagnostics.extend(Diagnostic.from_parse_error(error)
+                                              for error in itertools.islice(parser.errors, reported, None))
+                    reported = len(parser.errors)
+                self.count += 1
+                yield statement
+        except Exception as e:
+            # compile_source reports the errors parsed before the failure first
+            result.diagnostics.extend(Diagnostic.from_parse_error(error)
+                                      for error in itertools.islice(parser.errors, reported, None))
+            reported = len(parser.errors)
+            token = parser.current_token if isinstance(parser.current_token, Token) else None
+            result.diagnostics.append(Diagnostic(ERROR, f"The parser failed: {type(e).__name__}: {e}", token,
+                                                 PARSE))
+        program_symbol, _ = result.symbols.lookup('PROGRAM')
+        if program_symbol is not None:
+            result.ast = program_symbol.node
+        result.diagnostics.extend(Diagnostic.from_parse_error(error)
+                                  for error in itertools.islice(parser.errors, reported, None))
+        result.diagnostics.extend(result.symbols.diagnostics)
+        result.timings['total'] = time.perf_counter() - start_time
+
+
+def _consume(statement: Node) -> int:
+    # The benchmark's consumer, it walks every statement it is handed
+    return sum(1 for _ in walk(statement))
+
+
+def benchmark(source: str, options: CompileOptions) -> dict:
+    """
+    Peak memory and seconds until the first statement reaches a consumer, for compile_source and for a
+    StatementStream over source.
+    """
+    timings = {}
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = compile_source(source, options)
+    first = True
+    for statement in result.statements or ():
+        _consume(statement)
+        if first:
+            timings['whole_first'] = time.perf_counter() - start_time
+            first = False
+    timings['whole_total'] = time.perf_counter() - start_time
+    timings['whole_peak'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    stream = StatementStream(source, options)
+    first = True
+    for statement in stream:
+        _consume(statement)
+        if first:
+            timings['stream_first'] = time.perf_counter() - start_time
+            first = False
+    timings['stream_total'] = time.perf_counter() - start_time
+    timings['stream_peak'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return timings
+
+
+def generate_source(statements: int, terms: int = 40) -> str:
+    # Statements that declare nothing, print of a sum of terms each, with a let they all read
+    term = " + ".join(f"({i} * {i + 1})" for i in range(terms))
+    return "let base = 1;\n" + "".join(f"print(base + {term});\n" for _ in range(statements))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare compiling a whole source with streaming its "
+                                                     "statements to a consumer.")
+    arg_parser.add_argument("--statements", type=int, nargs="+", default=[100, 400, 1600],
+                            help="statements of the generated sources")
+    arg_parser.add_argument("--engine", choices=list(LEXER_ENGINES), default="pattern")
+    args = arg_parser.parse_args()
+
+    options = CompileOptions(engine=args.engine, redefinition='shadow')
+    rows = []
+    for statements in args.statements:
+        source = generate_source(statements)
+        r = benchmark(source, options)
+        rows.append([statements, len(source), f"{r['whole_first'] * 1e3:.1f}", f"{r['stream_first'] * 1e3:.1f}",
+                     f"{r['whole_total'] * 1e3:.1f}", f"{r['stream_total'] * 1e3:.1f}",
+                     f"{r['whole_peak'] / 1e6:.2f}", f"{r['stream_peak'] / 1e6:.2f}"])
+    print(tabulate(rows, headers=["Statements", "Characters", "First ms", "First ms (stream)", "Total ms",
+                                  "Total ms (stream)", "Peak MB", "Peak MB (stream)"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    # python -m compiler.pipeline --statements 100 400 1600, run from the Paw directory
+    main()
@@ -0,0 +1,253 @@
+from __future__ import annotations
+import gc
+import io
+import pickle
+import struct
+import sys
+from array import array
+from itertools import repeat
+from compiler.compiler import CompileResult
+from parser.arena import AstArena
+from parser.LL1 import Node
+from tokens.tokens import Token
+
+# Bump whenever the layout of ModuleImage changes, images of other versions are not read
+FORMAT_VERSION = 1
+
+# dumps layout, all integers little-endian:
+#
+#   header   magic b'MKMI', format version u16, buffer count u16, pickle length u32
+#   lengths  u64 byte length per buffer
+#   pickle   the ModuleImage pickled with protocol 5, its columns out-of-band
+#   buffers  the columns, each starting 8-byte aligned
+MAGIC = b'MKMI'
+HEADER = struct.Struct('<4sHHI')
+LENGTH = struct.Struct('<Q')
+
+# Columns of AstArena, then those of the tokens: indexes into strings and the positions, -1 for None
+ARENA_COLUMNS = ('kind', 'token', 'first_child', 'next_sibling', 'field', 'value')
+TOKEN_COLUMNS = ('types', 'lexemes', 'begins', 'lines', 'columns')
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _little_endian(column: array) -> array:
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+class _GraphPickler(pickle.Pickler):
+    # Nodes with a row in the arena and all tokens are pickled as a number: token index * 2, or row * 2 + 1
+    def __init__(self, file, rows: dict[int, int], token_index):
+        super().__init__(file, protocol=5)
+        self.rows = rows
+        self.token_index = token_index
+
+    def persistent_id(self, obj):
+        if type(obj) is Token:
+            return self.token_index(obj) << 1
+        if isinstance(obj, Node):
+            row = self.rows.get(id(obj))
+            return None if row is None else row << 1 | 1
+        return None
+
+
+class _GraphUnpickler(pickle.Unpickler):
+    def __init__(self, file, tokens: list[Token], nodes: list[Node]):
+        super().__init__(file)
+        self.tokens = tokens
+        self.nodes = nodes
+
+    def persistent_load(self, pid):
+        return self.nodes[pid >> 1] if pid & 1 else self.tokens[pid >> 1]
+
+
+class ModuleImage:
+    """
+    A CompileResult in a form that is quick to write and to read back:
+
+        columns     the AstArena of the AST and, a row per token, indexes into strings and the positions
+        missing     per position column the tokens without that position, the parser's made up ones
+        strings     every distinct token type and lexeme once
+        stream      how many of the tokens are the token stream of the source, the rest are made up by the
+                    parser, -1 when the source could not be lexed
+        graph       the literals of the arena, the symbol tables and the diagnostics, pickled with every
+                    token and every node of the AST in them replaced by its index or row
+
+    Pickled with protocol 5 the columns are out-of-band buffers, dumps and loads keep them in one bytes
+    object for ModuleCache.
+    """
+
+    def __init__(self):
+        self.columns: dict[str, array] = {}
+        self.missing: dict[str, list[int]] = {}
+        self.strings: list[str] = []
+        self.stream = -1
+        self.statements = False
+        self.graph = b''
+
+    @classmethod
+    def from_result(cls, result: CompileResult) -> ModuleImage:
+        # See to_result
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return cls._from_result(result)
+        finally:
+            if collecting:
+                gc.enable()
+
+    @classmethod
+    def _from_result(cls, result: CompileResult) -> ModuleImage:
+        image = cls()
+        tokens: list[Token] = []
+        token_rows: dict[int, int] = {}
+
+        def token_index(token: Token) -> int:
+            index = token_rows.get(id(token))
+            if index is None:
+                index = token_rows[id(token)] = len(tokens)
+                tokens.append(token)
+            return index
+
+        if result.tokens is not None:
+            tokens.extend(result.tokens)
+            token_rows.update((id(token), index) for index, token in enumerate(tokens))
+            image.stream = len(tokens)
+
+        rows: dict[int, int] = {}
+        arena = AstArena.from_nodes(result.ast, rows) if result.ast is not None else AstArena()
+        image.statements = result.ast is not None and result.statements is result.ast.value.value
+        # The arena's rows point into its own token list, the image's into the one of all tokens
+        arena_tokens = [token_index(token) for token in arena.tokens]
+        arena.token = array('i', (arena_tokens[index] if index >= 0 else index for index in arena.token))
+
+        graph = io.BytesIO()
+        _GraphPickler(graph, rows, token_index).dump((arena.literals, result.symbols, result.diagnostics))
+        image.graph = graph.getvalue()
+
+        for name in ARENA_COLUMNS:
+            image.columns[name] = getattr(arena, name)
+        strings: dict[str, int] = {}
+        image.columns['types'] = array('i', (strings.setdefault(token.type, len(strings)) for token in tokens))
+        image.columns['lexemes'] = array('i', (strings.setdefault(token.lexeme, len(strings)) for token in tokens))
+        for name, attribute in zip(TOKEN_COLUMNS[2:], ('begin_position', 'line_position', 'column_position')):
+            positions = [getattr(token, attribute) for token in tokens]
+            image.missing[name] = [index for index, position in enumerate(positions) if position is None]
+            image.columns[name] = array('i', (-1 if position is None else position for position in positions))
+        image.strings = list(strings)
+        return image
+
+    def to_result(self, source: str, filename: str | None = None) -> CompileResult:
+        # Both ways make objects by the hundred thousand, the collector has nothing to find in them
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return self._to_result(source, filename)
+        finally:
+            if collecting:
+                gc.enable()
+
+    def _to_result(self, source: str, filename: str | None) -> CompileResult:
+        strings = self.strings
+        columns = self.columns
+        tokens = list(map(Token, map(strings.__getitem__, columns['types']),
+                          map(strings.__getitem__, columns['lexemes']),
+                          columns['begins'], columns['lines'], repeat(None), columns['columns']))
+        for name, attribute in zip(TOKEN_COLUMNS[2:], ('begin_position', 'line_position', 'column_position')):
+            for index in self.missing[name]:
+                setattr(tokens[index], attribute, None)
+
+        arena = AstArena()
+        for name in ARENA_COLUMNS:
+            setattr(arena, name, columns[name])
+        arena.tokens = tokens
+        # The nodes are there before the graph refers to them and get their fields once it is loaded
+        nodes = arena.shells()
+        arena.literals, symbols, diagnostics = _GraphUnpickler(io.BytesIO(self.graph), tokens, nodes).load()
+        arena.fill(nodes)
+
+        result = CompileResult(source, filename)
+        result.tokens = tokens[:self.stream] if self.stream >= 0 else None
+        result.ast = nodes[0] if nodes else None
+        result.statements = result.ast.value.value if self.statements else None
+        result.symbols = symbols
+        result.diagnostics = diagnostics
+        return result
+
+    def __reduce_ex__(self, protocol):
+        columns = {}
+        for name, column in self.columns.items():
+            data = _little_endian(column)
+            columns[name] = (column.typecode, pickle.PickleBuffer(data) if protocol >= 5 else data.tobytes())
+        return _restore, (FORMAT_VERSION, columns, self.missing, self.strings, self.stream, self.statements,
+                          self.graph)
+
+    def __repr__(self):
+        rows = len(self.columns.get('kind', ()))
+        tokens = len(self.columns.get('types', ()))
+        return f"ModuleImage({rows} nodes, {tokens} tokens, {len(self.strings)} strings, " \
+               f"{len(self.graph)} graph bytes)"
+
+
+def _restore(version: int, columns: dict, missing: dict[str, list[int]], strings: list[str], stream: int,
+             statements: bool, graph: bytes) -> ModuleImage:
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Module image format {version}, expected {FORMAT_VERSION}")
+    image = ModuleImage()
+    for name, (typecode, data) in columns.items():
+        column = array(typecode)
+        # Out-of-band data comes back as handed in, the buffer of an array keeps the array's item format
+        column.frombytes(memoryview(data).cast('B'))
+        if sys.byteorder == 'big':
+            column.byteswap()
+        image.columns[name] = column
+    image.missing = missing
+    image.strings = strings
+    image.stream = stream
+    image.statements = statements
+    image.graph = graph
+    return image
+
+
+def dumps(image: ModuleImage) -> bytes:
+    buffers: list[pickle.PickleBuffer] = []
+    payload = pickle.dumps(image, protocol=5, buffer_callback=buffers.append)
+    raw = [buffer.raw() for buffer in buffers]
+    chunks = [HEADER.pack(MAGIC, FORMAT_VERSION, len(raw), len(payload))]
+    chunks += [LENGTH.pack(len(data)) for data in raw]
+    chunks.append(payload)
+    offset = sum(len(chunk) for chunk in chunks)
+    for data in raw:
+        chunks.append(bytes(_padded(offset) - offset))
+        chunks.append(data)
+        offset = _padded(offset) + len(data)
+    return b''.join(chunks)
+
+
+def loads(data: bytes) -> ModuleImage | None:
+    """
+    The image dumps wrote into data, None when it is not one of this format version or is cut short.
+    """
+    if len(data) < HEADER.size:
+        return None
+    magic, version, count, size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    view = memoryview(data)
+    offset = HEADER.size + count * LENGTH.size
+    lengths = [LENGTH.unpack_from(data, HEADER.size + i * LENGTH.size)[0] for i in range(count)]
+    payload = view[offset:offset + size]
+    offset += size
+    buffers = []
+    for length in lengths:
+        offset = _padded(offset)
+        buffers.append(view[offset:offset + length])
+        offset += length
+    if offset > len(data) or len(payload) != size:
+        return None
+    return pickle.loads(payload, buffers=buffers)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import argparse
+import ast
+import pprint
+import random
+import time
+import tracemalloc
+from typing import Callable
+from tabulate import tabulate
+from lexer.engines import LEXER_ENGINES
+
+# Words the generator builds identifiers and string contents from
+WORDS = ["a", "b", "c", "d", "mine", "add", "total", "count", "value", "boy", "here", "is", "my", "string",
+         "x987", "_ui", "result", "left", "right", "inner"]
+
+
+def _ident(rng: random.Random) -> str:
+    return rng.choice(WORDS) + (str(rng.randrange(100)) if rng.random() < 0.3 else "")
+
+
+def _number(rng: random.Random) -> str:
+    return str(rng.randrange(1000)) if rng.random() < 0.8 else f"{rng.randrange(100)}.{rng.randrange(1000)}"
+
+
+def _words(rng: random.Random) -> str:
+    # Strings have to start with an alphanumeric character, a quote followed by '_' ends the input
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))).lstrip("_")
+
+
+# Statement generators for the constructs of the sample sources (parser/source_parser*.txt, lexer/test.txt)
+CONSTRUCTS: dict[str, Callable[[random.Random], str]] = {
+    "let": lambda rng: f"let {_ident(rng)} = {_number(rng)};",
+    "assign": lambda rng: f"{_ident(rng)} = {_ident(rng)} + {_number(rng)} * ({_ident(rng)} - {_number(rng)});",
+    "context": lambda rng: f"context {_ident(rng)} {{\nlet {_ident(rng)} = {_number(rng)};\n}};"
+                           if rng.random() < 0.5 else f"{{ // inner\nlet {_ident(rng)} = {_number(rng)};\n}};",
+    "fn": lambda rng: f"fn {_ident(rng)} ({_ident(rng)},{_ident(rng)}){{\nreturn {_ident(rng)};\n}};",
+    "if": lambda rng: f"if ({_ident(rng)} > {_ident(rng)}) {{\nprint({_ident(rng)});\n}}\n"
+                      f"else if ({_ident(rng)} != {_number(rng)}) {{\nprint({_ident(rng)});\n}}\n"
+                      f"else{{\nprint({_ident(rng)},{_ident(rng)});\n}};",
+    "string": lambda rng: f'{_ident(rng)} = "{_words(rng)}";',
+    "comment": lambda rng: f"// {_words(rng)}",
+}
+
+# Relative weight of each construct in a generated corpus
+DEFAULT_MIX = {"let": 4, "assign": 3, "context": 1, "fn": 1, "if": 1, "string": 2, "comment": 2}
+
+
+def generate_corpus(size: int, mix: dict[str, float] | None = None, seed: int = 0) -> str:
+    """
+    Generates a Monke source of at least size characters, one statement per line, with the constructs
+    drawn at random in proportion to mix (see DEFAULT_MIX). The same size, mix and seed always give the
+    same corpus.
+    """
+    mix = mix or DEFAULT_MIX
+    unknown = set(mix) - set(CONSTRUCTS)
+    if unknown:
+        raise ValueError(f"Unknown constructs {sorted(unknown)}, expected some of {list(CONSTRUCTS)}")
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    lines = []
+    length = 0
+    while length < size:
+        line = CONSTRUCTS[rng.choices(names, weights)[0]](rng)
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def lex(engine: str, source: str) -> int:
+    """
+    Lexes source to the end with the named engine, returns the number of tokens including EOF.
+    """
+    lexer = LEXER_ENGINES[engine](character_stream=source)
+    tokenize = getattr(lexer, "tokenize", None)
+    if tokenize is not None:
+        tokenize()
+    else:
+        for _ in lexer:
+            pass
+    return len(lexer.tokens)
+
+
+def measure(engine: str, source: str, repeat: int = 3) -> dict:
+    """
+    Best of repeat timed runs, plus one run under tracemalloc for the peak memory. Peak memory only
+    covers the current process, so the workers of the parallel engine are not included.
+    """
+    best = float("inf")
+    tokens = 0
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        tokens = lex(engine, source)
+        best = min(best, time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    try:
+        lex(engine, source)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    megabytes = len(source.encode("utf-8")) / 1e6
+    return {
+        "tokens": tokens,
+        "seconds": best,
+        "tokens_per_sec": tokens / best,
+        "mb_per_sec": megabytes / best,
+        "peak_mb": peak / 1e6,
+    }
+
+
+def run(source: str, engines: list[str], repeat: int = 3) -> dict[str, dict]:
+    return {engine: measure(engine, source, repeat) for engine in engines}
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict]) -> list[list]:
+    """
+    Rows of (engine, tokens/sec now, tokens/sec in the baseline, speedup, peak MB now, peak MB in the baseline).
+    """
+    rows = []
+    for engine, result in results.items():
+        old = baseline.get(engine)
+        if old is None:
+            rows.append([engine, round(result["tokens_per_sec"]), "-", "-", round(result["peak_mb"], 2), "-"])
+            continue
+        rows.append([engine,
+                     round(result["tokens_per_sec"]),
+                     round(old["tokens_per_sec"]),
+                     f"{result['tokens_per_sec'] / old['tokens_per_sec']:.2f}x",
+                     round(result["peak_mb"], 2),
+                     round(old["peak_mb"], 2)])
+    return rows
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    # "let=4,fn=1" -> {"let": 4.0, "fn": 1.0}
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the Monke lexer engines on a generated corpus.")
+    arg_parser.add_argument("--size", type=int, default=1_000_000, help="corpus size in characters")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--mix", type=parse_mix, default=None,
+                            help=f"construct weights, e.g. let=4,fn=1 (constructs: {', '.join(CONSTRUCTS)})")
+    arg_parser.add_argument("--engines", nargs="+", default=list(LEXER_ENGINES), choices=list(LEXER_ENGINES))
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--save", metavar="FILE", help="save the results as a baseline")
+    arg_parser.add_argument("--baseline", metavar="FILE", help="compare the results with a saved baseline")
+    args = arg_parser.parse_args()
+
+    corpus = {"size": args.size, "seed": args.seed, "mix": args.mix or DEFAULT_MIX}
+    source = generate_corpus(args.size, args.mix, args.seed)
+    results = run(source, args.engines, args.repeat)
+
+    print(f"Corpus of {len(source) / 1e6:.2f} MB, {results[args.engines[0]]['tokens']} tokens\n")
+    print(tabulate([[engine, r["tokens"], f"{r['seconds']:.3f}", round(r["tokens_per_sec"]),
+                     f"{r['mb_per_sec']:.2f}", f"{r['peak_mb']:.2f}"] for engine, r in results.items()],
+                   headers=["Engine", "Tokens", "Seconds", "Tokens/sec", "MB/sec", "Peak MB"], tablefmt="grid"))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = ast.literal_eval(f.read())
+        if saved["corpus"] != corpus:
+            print(f"\nWarning: the baseline was measured on another corpus {saved['corpus']}")
+        print(f"\nCompared with {args.baseline}\n")
+        print(tabulate(compare(results, saved["results"]),
+                       headers=["Engine", "Tokens/sec", "Baseline", "Speedup", "Peak MB", "Baseline MB"],
+                       tablefmt="grid"))
+
+    if args.save:
+        # A Python literal rather than JSON, the json package of this directory shadows the standard library one
+        with open(args.save, "w") as f:
+            f.write(pprint.pformat({"corpus": corpus, "results": results}))
+        print(f"\nSaved the results to {args.save}")
+
+
+if __name__ == "__main__":
+    # python -m lexer.benchmark --size 1000000 --save baseline.txt, run from the Paw directory
+    main()
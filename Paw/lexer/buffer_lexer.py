@@ -0,0 +1,38 @@
+from __future__ import annotations
+from typing import Iterator
+from lexer.pattern_lexer import PatternLexer
+from tokens.token_buffer import TokenBuffer
+from tokens.tokens import *
+
+
+class BufferLexer(PatternLexer):
+    """
+    PatternLexer that records its tokens in a compact TokenBuffer instead of a deque of Tokens.
+    tokenize() fills the buffer without creating a single Token object.
+    """
+
+    def __init__(self, character_stream: str, position: int = 0, line_position: int = 1):
+        super().__init__(character_stream, position=position, line_position=line_position)
+        self.tokens: TokenBuffer = TokenBuffer(character_stream)
+
+    def scan(self) -> Iterator[Token | None]:
+        append = self.tokens.append
+        for raw in self.scan_raw():
+            if raw is None:
+                yield None
+                continue
+            type_, lexeme, begin, line, column = raw
+            append(type_, begin, begin + len(lexeme), line)
+            yield Token(type_, lexeme, begin_position=begin, line_position=line, column_position=column)
+
+    # Tokenize the whole character_stream into the buffer, stopping at the first EOF token
+    def tokenize(self) -> TokenBuffer:
+        append = self.tokens.append
+        for raw in self.scan_raw():
+            if raw is None:
+                continue
+            type_, lexeme, begin, line, _ = raw
+            append(type_, begin, begin + len(lexeme), line)
+            if type_ == EOF:
+                break
+        return self.tokens
@@ -0,0 +1,15 @@
+from lexer.lexer import Lexer
+from lexer.pattern_lexer import PatternLexer
+from lexer.stream_lexer import StreamLexer
+from lexer.buffer_lexer import BufferLexer
+from lexer.parallel_lexer import ParallelLexer
+
+# Lexer engines selectable by name, they all share the next_token()/tokens interface
+LEXER_ENGINES = {
+    "classic": Lexer,
+    "pattern": PatternLexer,
+    "stream": StreamLexer,
+    "buffer": BufferLexer,
+    "parallel": ParallelLexer,
+}
+DEFAULT_ENGINE = "classic"
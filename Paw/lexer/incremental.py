@@ -0,0 +1,101 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Iterable
+from lexer.pattern_lexer import PatternLexer
+from tokens.tokens import *
+
+
+# Offset just past a token, a string token also owns its opening and closing quotes
+def token_end(token: Token) -> int:
+    return token.begin_position + len(token.lexeme) + (token.kind == TokenKind.STR)
+
+
+# Offset of the first character a token was lexed from
+def token_start(token: Token) -> int:
+    return token.begin_position - (token.kind == TokenKind.STR)
+
+
+class IncrementalLexer:
+    """
+    Keeps a source text and its token stream in step across small text edits.
+
+    An edit is relexed from the end of the last token that lies before it, which is a state
+    (position, line_position) the lexer has really been in. Relexing stops as soon as a fresh
+    token lines up with an old token that starts after the edit: from there on the old stream
+    is still valid, so its Token objects are kept and only their positions are shifted (columns only
+    change for the tokens left on the line the edit ends on).
+    """
+
+    def __init__(self, source: str, tokens: Iterable[Token] | None = None):
+        self.source = source
+        # The stream ends with its EOF token, as produced by any lexer in this package
+        self.tokens: list[Token] = list(PatternLexer(source, keep_tokens=False) if tokens is None else tokens)
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> tuple[int, int, int]:
+        """
+        Replaces deleted characters at offset with inserted and updates the tokens.
+
+        Returns (index, removed, added): tokens[index:index + removed] of the old stream were
+        replaced by the added tokens now at tokens[index:index + added]. Tokens after them are
+        the old objects with begin_position/line_position/column_position shifted in place.
+
+        A ValueError from the lexer (e.g. an unterminated string) leaves source and tokens untouched.
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.source):
+            raise ValueError(f"Edit ({offset}, {deleted}) falls outside of the source")
+
+        tokens = self.tokens
+        source = self.source[:offset] + inserted + self.source[offset + deleted:]
+        delta = len(inserted) - deleted
+        edit_end = offset + deleted
+
+        # The first token the edit can touch, a token ending right at offset may grow into the edit
+        first = min(bisect_left(tokens, offset, key=token_end), len(tokens) - 1)
+        if first:
+            previous = tokens[first - 1]
+            position, line_position = token_end(previous), previous.line_position
+        else:
+            position, line_position = 0, 1
+
+        lexer = PatternLexer(source, keep_tokens=False, position=position, line_position=line_position)
+        fresh: list[Token] = []
+        old = first
+        sync: int | None = None
+        line_delta = column_delta = 0
+        for raw in lexer.scan_raw():
+            if raw is None:
+                continue
+            type_, lexeme, begin, line, column = raw
+            old_begin = begin - delta
+            while old < len(tokens) and tokens[old].begin_position < old_begin:
+                old += 1
+            if old < len(tokens) and token_start(tokens[old]) >= edit_end:
+                candidate = tokens[old]
+                if candidate.begin_position == old_begin and candidate.type == type_ and candidate.lexeme == lexeme:
+                    sync, line_delta = old, line - candidate.line_position
+                    column_delta = column - candidate.column_position
+                    break
+            fresh.append(Token(type_, lexeme, begin_position=begin, line_position=line, column_position=column))
+            if type_ == EOF:
+                break
+
+        if sync is None:
+            sync = len(tokens)
+        else:
+            if delta or line_delta:
+                for index in range(sync, len(tokens)):
+                    tok = tokens[index]
+                    tok.begin_position += delta
+                    tok.line_position += line_delta
+            if column_delta:
+                # Only the tokens left on the line the edit ended on move sideways
+                line_end = source.find('\n', tokens[sync].begin_position)
+                for index in range(sync, len(tokens)):
+                    tok = tokens[index]
+                    if line_end != -1 and token_start(tok) > line_end:
+                        break
+                    tok.column_position += column_delta
+
+        tokens[first:sync] = fresh
+        self.source = source
+        return first, sync - first, len(fresh)
@@ -1,13 +1,27 @@
 from __future__ import annotations
+import math
 from collections import deque
+from typing import Iterator
+from tokens.line_index import LineIndex
 from tokens.tokens import *
+from tracing.tracing import trace
 
 
 class Lexer:
-    def __init__(self, character_stream: str):
+    def __init__(self, character_stream: str, keep_tokens: bool = True):
         self.character_stream = character_stream
+        # With keep_tokens off the lexer only hands tokens out (see __iter__) and does not
+        # keep a second copy of the whole stream around
+        self.keep_tokens = keep_tokens
         self.position = self.start_position = self.read_position = 0
         self.line_position = 1
+        # Lines and columns are looked up in the index instead of being counted character by character.
+        # line_shift keeps line_position as it always was: newlines inside strings are not counted
+        # and a comment running into the end of input still adds a line.
+        self.line_index = LineIndex(character_stream)
+        self.line_shift = 0
+        # The real line the last token started on and the offsets that line spans
+        self.line, self.line_start, self.next_line_start = 1, 0, 0
         self.critical = False
         self.ch = ''
         self.tokens: deque[Token] = deque()
@@ -30,8 +44,6 @@ class Lexer:
     # Skip whitespace in the character_stream
     def skip_whitespace(self):
         while self.ch in ' \t\n\r':
-            if self.ch == '\n':
-                self.line_position += 1
             self.read_char()
 
     # Peek at the next character without advancing the lexer
@@ -128,11 +140,11 @@ class Lexer:
                 while True:
                     self.read_char()
                     if (self.ch == '\n') or self.read_position > len(self.character_stream):
-                        print("STATS\n")
-                        print(self.read_position, self.position, len(self.character_stream))
-                        print("STATS\n")
-
-                        self.line_position += 1
+                        if trace.lexer:
+                            trace.lexer("comment ends at read_position %s, position %s of %s",
+                                        self.read_position, self.position, len(self.character_stream))
+                        if self.ch != '\n':
+                            self.line_shift += 1
                         break
             else:
                 tok = self.new_token(SLASH, self.ch)
@@ -177,6 +189,7 @@ class Lexer:
                     tok_lexeme = self.read_string()
                     tok_type = STR
                     tok = self.new_token(tok_type, tok_lexeme)
+                    self.line_shift -= tok_lexeme.count('\n')
                     return tok
             elif self.ch == '\0':  # End of input
                 return self.new_token(EOF, '')
@@ -191,10 +204,30 @@ class Lexer:
             self.comment = False
             return None if is_comment else self.new_token(EOF, '')
 
+    # Yield the real tokens (comments are skipped) up to and including the EOF token
+    def __iter__(self) -> Iterator[Token]:
+        while True:
+            tok = self.next_token()
+            if tok is None:
+                continue
+            yield tok
+            if tok.type == EOF:
+                return
+
     # Helper method to create a new tokens
     def new_token(self, token_type: Literal["str"] | str, ch: str):
-        token = Token(token_type, ch, begin_position=self.start_position, line_position=self.line_position)
-        self.tokens.append(token)
+        start = self.start_position
+        # Tokens come in source order, the index is only searched when a token starts on another line
+        if not self.line_start <= start < self.next_line_start:
+            index = self.line_index
+            self.line = index.line_of(start)
+            self.line_start = index.line_start(self.line)
+            self.next_line_start = index.line_start(self.line + 1) if self.line < len(index) else math.inf
+        self.line_position = self.line + self.line_shift
+        token = Token(token_type, ch, begin_position=start, line_position=self.line_position,
+                      column_position=start - self.line_start + 1)
+        if self.keep_tokens:
+            self.tokens.append(token)
         return token
 
 
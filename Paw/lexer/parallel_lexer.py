@@ -0,0 +1,167 @@
+from __future__ import annotations
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+from lexer.buffer_lexer import BufferLexer
+from tokens.token_buffer import TokenBuffer
+from tokens.tokens import *
+
+# Below this many characters per chunk starting worker processes costs more than it saves
+MIN_CHUNK_SIZE = 256 * 1024
+
+# The only spans a newline can hide in: comments (their closing newline excluded) and complete strings.
+# No other token can contain '//' or '"', so scanning for just these two stays in step with the lexer.
+UNSPLITTABLE = re.compile(r'//[^\n]*|"[^\W_][^"\0]*"')
+
+
+def split_points(source: str, parts: int) -> list[tuple[int, int]]:
+    """
+    Picks up to parts chunk starts for source, as (position, line_position) pairs.
+
+    Every chunk but the first starts right after a newline that is neither inside a string nor
+    inside a comment, which is a state the sequential lexer passes through as well. Its
+    line_position is the one that lexer would have there: newlines inside strings are not counted.
+    """
+    length = len(source)
+    step = max(length // max(parts, 1), 1)
+    points = [(0, 1)]
+    spans = UNSPLITTABLE.finditer(source)
+    span = next(spans, None)
+    # Newlines the lexer counts up to counted_to
+    counted_to, lines = 0, 0
+
+    target = step
+    while target < length:
+        cut = source.find('\n', target)
+        while cut != -1 and span is not None:
+            start, end = span.span()
+            if end <= cut:
+                lines += source.count('\n', counted_to, end)
+                if source[start] == '"':
+                    lines -= source.count('\n', start, end)
+                counted_to = end
+                span = next(spans, None)
+            elif start <= cut:
+                cut = source.find('\n', end)
+            else:
+                break
+        if cut == -1 or cut + 1 >= length:
+            break
+        position = cut + 1
+        lines += source.count('\n', counted_to, position)
+        counted_to = position
+        points.append((position, lines + 1))
+        target = position + step
+    return points
+
+
+def lex_chunk(chunk: str, offset: int, line_position: int) -> tuple[array, array, array, array]:
+    """
+    Worker side of the ParallelLexer: lexes one chunk into TokenBuffer columns with absolute offsets.
+    """
+    buffer = BufferLexer(chunk, line_position=line_position).tokenize()
+    starts = array('I', [start + offset for start in buffer.starts])
+    ends = array('I', [end + offset for end in buffer.ends])
+    return buffer.kinds, starts, ends, buffer.lines
+
+
+class ParallelLexer:
+    """
+    Lexes a large source in chunks on a ProcessPoolExecutor and merges the results into one TokenBuffer.
+
+    The source is split at newlines outside of strings and comments (see split_points), each chunk is
+    lexed from the line_position the sequential lexer would have there, and the chunks come back as
+    buffer columns so no Token objects cross process boundaries. The merged stream is the same as the
+    one of ``lexer.Lexer``, including an early EOF at a stray quote or NUL character: chunks after it
+    are dropped, errors they raise included.
+    """
+
+    def __init__(self, character_stream: str, max_workers: int | None = None, min_chunk_size: int = MIN_CHUNK_SIZE):
+        self.character_stream = character_stream
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_chunk_size = min_chunk_size
+        self.tokens: TokenBuffer = TokenBuffer(character_stream)
+        self._scanner: Iterator[Token] | None = None
+        self._done = False
+
+    # Get the next token, the whole source is tokenized on the first call
+    def next_token(self) -> Token:
+        if self._scanner is None:
+            self._scanner = iter(self)
+        return next(self._scanner)
+
+    # Yield the tokens up to and including the EOF token
+    def __iter__(self) -> Iterator[Token]:
+        return iter(self.tokenize())
+
+    def tokenize(self) -> TokenBuffer:
+        if self._done:
+            return self.tokens
+        source = self.character_stream
+        parts = min(self.max_workers, max(len(source) // self.min_chunk_size, 1))
+        points = split_points(source, parts)
+        bounds = [(start, end, line) for (start, line), (end, _) in zip(points, points[1:] + [(len(source), 0)])]
+
+        if len(bounds) == 1:
+            self._merge([lex_chunk(source, 0, 1)], bounds)
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(bounds))) as pool:
+                futures = [pool.submit(lex_chunk, source[start:end], start, line) for start, end, line in bounds]
+                self._merge((future.result() for future in futures), bounds)
+                pool.shutdown(cancel_futures=True)
+        self._done = True
+        return self.tokens
+
+    def _merge(self, results, bounds: list[tuple[int, int, int]]):
+        buffer = self.tokens
+        last = len(bounds) - 1
+        # Results are pulled one chunk at a time, so chunks after an early EOF are never waited on
+        for index, (kinds, starts, ends, lines) in enumerate(results):
+            # A chunk always ends with an EOF token. It only ends the stream for the last chunk or when
+            # it came before the end of the chunk (a stray quote or NUL), otherwise the next chunk goes on.
+            stop = index == last or starts[-1] < bounds[index][1]
+            if not stop:
+                for column in (kinds, starts, ends, lines):
+                    column.pop()
+            buffer.kinds.extend(kinds)
+            buffer.starts.extend(starts)
+            buffer.ends.extend(ends)
+            buffer.lines.extend(lines)
+            if stop:
+                break
+
+
+def benchmark(source: str, worker_counts: list[int], repeat: int = 3) -> list[tuple[int, float, float]]:
+    """
+    Times the ParallelLexer on source for every worker count, best of repeat runs.
+    Returns (workers, seconds, speedup over a single process) rows.
+    """
+    rows = []
+    single = None
+    for workers in worker_counts:
+        best = float('inf')
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            ParallelLexer(source, max_workers=workers, min_chunk_size=1).tokenize()
+            best = min(best, time.perf_counter() - start_time)
+        single = single or best
+        rows.append((workers, best, single / best))
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m lexer.parallel_lexer [source file] [copies], run from the Paw directory
+    filename = sys.argv[1] if len(sys.argv) > 1 else "parser/source_parser.txt"
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with open(filename) as f:
+        text = f.read()
+    corpus = (text if text.endswith('\n') else text + '\n') * copies
+    cores = os.cpu_count() or 1
+    counts = sorted({1, cores} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores})
+    print(f"{len(corpus) / 1e6:.1f} MB, {cores} cores")
+    for workers, seconds, speedup in benchmark(corpus, counts):
+        print(f"{workers:>3} workers  {seconds:8.3f}s  {speedup:5.2f}x")
@@ -0,0 +1,181 @@
+from __future__ import annotations
+import re
+from collections import deque
+from typing import Iterator
+from tokens.tokens import *
+
+
+def build_master_pattern() -> re.Pattern:
+    """
+    Compiles the single master pattern used by the PatternLexer.
+
+    The alternatives are tried in order, so comments come before the SLASH operator
+    and the operator table (longest lexemes first) comes after literals and identifiers.
+    Each alternative is a named group and the lexer dispatches on ``match.lastgroup``.
+    """
+    operator_lexemes = sorted(operators, key=len, reverse=True)
+    alternatives = [
+        ('WS', r'[ \t\n\r]+'),
+        ('COMMENT', r'//[^\n]*\n?'),
+        # The classic lexer only accepts strings whose first character is alphanumeric
+        ('STR', r'"(?P<STR_BODY>[^\W_][^"\0]*)"'),
+        ('UNTERMINATED', r'"[^\W_]'),
+        ('QUOTE', r'"'),
+        # A dot that is not followed by a digit makes the whole number invalid
+        ('NUMBER', r'\d+(?:\.\d+)*(?P<BAD_FLOAT>\.)?'),
+        ('IDENT', r'[^\W\d]\w*'),
+        ('OP', '|'.join(re.escape(op) for op in operator_lexemes)),
+        ('NUL', r'\0'),
+        ('ILLEGAL', r'.'),
+    ]
+    return re.compile('|'.join(f'(?P<{name}>{regex})' for name, regex in alternatives), re.DOTALL)
+
+
+MASTER_PATTERN = build_master_pattern()
+
+
+class PatternLexer:
+    """
+    Single-pass lexer driven by one compiled master pattern.
+
+    It produces the same Token stream as ``lexer.Lexer`` (types, lexemes, begin_position
+    and line_position), including its quirks: newlines inside strings are not counted,
+    a trailing comment always bumps the line, and a quote that is not followed by an
+    alphanumeric character yields an EOF token. Identifier and digit classes follow the
+    ``re`` Unicode classes, which only differ from ``str.isalpha``/``str.isdigit`` on
+    exotic Unicode input.
+    """
+
+    def __init__(self, character_stream: str, keep_tokens: bool = True,
+                 position: int = 0, line_position: int = 1):
+        self.character_stream = character_stream
+        # Scanning can resume from any (position, line_position) state the lexer has been in before
+        self.position = position
+        self.line_position = line_position
+        # Offset at which the real line holding position starts, for the columns of the tokens
+        self.line_start = character_stream.rfind('\n', 0, position) + 1
+        # A zero length deque drops every token, the stream is then only available through __iter__
+        self.tokens: deque[Token] = deque() if keep_tokens else deque(maxlen=0)
+        self._buffer = character_stream
+        self._scanner = self.scan()
+
+    # Hand the pattern more source text, an empty string means the input is exhausted.
+    # The whole source is already buffered here so there is never more to read.
+    def read_chunk(self) -> str:
+        return ''
+
+    # Get the next token from the character_stream, None for comments
+    def next_token(self) -> Token | None:
+        return next(self._scanner)
+
+    # Yield the real tokens (comments are skipped) up to and including the EOF token
+    def __iter__(self) -> Iterator[Token]:
+        for tok in self._scanner:
+            if tok is None:
+                continue
+            yield tok
+            if tok.type == EOF:
+                return
+
+    # Tokenize the whole character_stream in one go, stopping at the first EOF token
+    def tokenize(self) -> deque[Token]:
+        for _ in self:
+            pass
+        return self.tokens
+
+    def scan(self) -> Iterator[Token | None]:
+        append = self.tokens.append
+        for raw in self.scan_raw():
+            if raw is None:
+                yield None
+                continue
+            type_, lexeme, begin, line, column = raw
+            tok = Token(type_, lexeme, begin_position=begin, line_position=line, column_position=column)
+            append(tok)
+            yield tok
+
+    def scan_raw(self) -> Iterator[tuple[str, str, int, int, int] | None]:
+        """
+        Runs the master pattern over the source and yields (type, lexeme, begin_position, line_position,
+        column_position) tuples, or None for a comment, without building Token objects.
+        """
+        match = MASTER_PATTERN.match
+        lookup = keywords.get
+        line, line_start = self.line_position, self.line_start
+        # buffer holds the unconsumed source starting at the absolute offset base
+        buffer, base, pos = self._buffer, 0, self.position
+        length = len(buffer)
+        exhausted = False
+
+        while True:
+            m = match(buffer, pos) if pos < length else None
+            # A match touching the end of the buffer might still grow (identifiers, '=' vs '==', comments,
+            # strings), so pull in more source before committing to it
+            if not exhausted and (m is None or m.end() == length or m.lastgroup == 'UNTERMINATED'):
+                chunk = self.read_chunk()
+                if chunk:
+                    buffer, base, pos = buffer[pos:] + chunk, base + pos, 0
+                    length = len(buffer)
+                else:
+                    exhausted = True
+                continue
+
+            if m is None:
+                # End of input, the classic lexer keeps handing out EOF tokens
+                self.position, self.line_position, self.line_start = base + pos, line, line_start
+                yield EOF, '', base + pos, line, base + pos - line_start + 1
+                continue
+
+            kind = m.lastgroup
+            end = m.end()
+            if kind == 'WS':
+                newlines = buffer.count('\n', pos, end)
+                if newlines:
+                    line += newlines
+                    line_start = base + buffer.rfind('\n', pos, end) + 1
+                pos = end
+                continue
+            elif kind == 'COMMENT':
+                line += 1
+                # A comment running into the end of input leaves the classic lexer one past it
+                if buffer[end - 1] == '\n':
+                    pos, line_start = end, base + end
+                else:
+                    pos = end + 1
+                self.position, self.line_position, self.line_start = base + pos, line, line_start
+                yield None
+                continue
+
+            begin = base + pos
+            column = begin - line_start + 1
+            if kind == 'IDENT':
+                lexeme = m.group()
+                raw = lookup(lexeme, IDENT), lexeme, begin, line, column
+            elif kind == 'OP':
+                lexeme = m.group()
+                raw = operators[lexeme], lexeme, begin, line, column
+            elif kind == 'NUMBER':
+                if m.group('BAD_FLOAT'):
+                    raise ValueError("Invalid float literal!")
+                lexeme = m.group()
+                raw = FLOAT if '.' in lexeme else INT, lexeme, begin, line, column
+            elif kind == 'STR':
+                raw = STR, m.group('STR_BODY'), begin + 1, line, column + 1
+                # Newlines inside a string do not bump the line, but its columns still start over
+                newline = buffer.rfind('\n', pos, end)
+                if newline != -1:
+                    line_start = base + newline + 1
+            elif kind == 'UNTERMINATED':
+                raise ValueError("Unterminated string literal")
+            elif kind == 'QUOTE':
+                raw = EOF, '', begin, line, column
+            elif kind == 'NUL':
+                # A NUL character reads as the end of input and is never consumed
+                end = pos
+                raw = EOF, '', begin, line, column
+            else:
+                raw = ILLEGAL, m.group(), begin, line, column
+
+            pos = end
+            self.position, self.line_position, self.line_start = base + pos, line, line_start
+            yield raw
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import codecs
+import io
+import mmap
+import os
+from collections import deque
+from typing import IO
+from lexer.pattern_lexer import PatternLexer
+
+# Characters (or bytes for binary sources) pulled from the source per read
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamLexer(PatternLexer):
+    """
+    PatternLexer fed from a file object or an mmap in fixed-size chunks.
+
+    Only the unconsumed tail of the current chunk is kept in memory, so tokens, strings and
+    comments that straddle a chunk boundary are completed from the next chunk. Binary sources
+    (files opened with 'rb' and mmaps) are decoded incrementally, so begin_position stays a
+    character offset exactly as with the in-memory lexers.
+
+    token_history bounds the tokens deque. The default None keeps every token, as the other
+    lexers do with keep_tokens=True, since compile_source and the benchmarks read the whole
+    token list from tokens. That grows with the source: to stream without keeping the
+    tokens, pass 0 (as STREAMING_LEXERS in compiler/pipeline.py and open_lexer in main.py
+    with streaming do) so peak memory stays flat regardless of the source size.
+    """
+
+    def __init__(self,
+                 character_stream: IO | mmap.mmap | str,
+                 chunk_size: int = CHUNK_SIZE,
+                 encoding: str = 'utf-8',
+                 token_history: int | None = None):
+        if isinstance(character_stream, str):
+            character_stream = io.StringIO(character_stream)
+        super().__init__('')
+        self.character_stream = character_stream
+        self.chunk_size = chunk_size
+        self.tokens = deque(maxlen=token_history)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._handles: list = []
+
+    @classmethod
+    def open(cls, filename: str, use_mmap: bool = True, **kwargs) -> StreamLexer:
+        """
+        Opens filename for streaming. The lexer owns the handles, so use it as a
+        context manager or call close() when done.
+        """
+        f = open(filename, 'rb')
+        source = f
+        # An empty file cannot be mapped, it is simply read as an empty stream
+        if use_mmap and os.fstat(f.fileno()).st_size:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        lexer = cls(source, **kwargs)
+        lexer._handles = [source, f] if source is not f else [f]
+        return lexer
+
+    def read_chunk(self) -> str:
+        while True:
+            data = self.character_stream.read(self.chunk_size)
+            if isinstance(data, str):
+                return data
+            # A chunk can end in the middle of a multibyte character, which decodes to nothing yet
+            text = self._decoder.decode(data, final=not data)
+            if text or not data:
+                return text
+
+    def close(self):
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
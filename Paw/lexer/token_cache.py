@@ -0,0 +1,193 @@
+from __future__ import annotations
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Iterable, Iterator
+from tokens.token_buffer import TokenBuffer
+from tokens.tokens import Token
+
+# Bump whenever the token stream any lexer engine produces changes, old cache entries are then never hit again
+LEXER_VERSION = 1
+
+# Once the entries hold more than this many bytes in total the least recently used ones are evicted
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Entry layout: magic, format version, token count, then the kinds, starts, ends and lines columns of a
+# TokenBuffer, little-endian. Lexemes are not stored, they are sliced out of the source the key was made from.
+MAGIC = b'MPTC'
+HEADER = struct.Struct('<4sHI')
+FORMAT_VERSION = 1
+
+
+def default_directory() -> str:
+    return os.environ.get("MONKE_TOKEN_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "monkepaw",
+                                                                 "tokens")
+
+
+class CachedLexer:
+    """
+    Stands in for a lexer whose tokens were loaded from the cache: tokens is the cached TokenBuffer.
+    """
+
+    def __init__(self, character_stream: str, tokens: TokenBuffer):
+        self.character_stream = character_stream
+        self.tokens = tokens
+        self._scanner: Iterator[Token] = iter(tokens)
+
+    def next_token(self) -> Token:
+        return next(self._scanner)
+
+    def __iter__(self) -> Iterator[Token]:
+        return iter(self.tokens)
+
+
+class DirectoryCache:
+    """
+    Entries in files of a directory, named by their key. Every entry is written to a temporary file and
+    moved into place with os.replace, so processes filling the cache at the same time never see half
+    written entries; the last writer of a key wins with identical content. A read refreshes the entry's
+    mtime and writes evict the least recently used entries once the cache holds more than max_bytes.
+    """
+    suffix = '.entry'
+
+    def __init__(self, directory: str, max_bytes: int = MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def read(self, key: str) -> bytes | None:
+        try:
+            with open(self.path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return data
+
+    def write(self, key: str, data: bytes):
+        # The cache is only an optimization, a cache that cannot be written to is skipped
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.path(key))
+        except OSError:
+            self._remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self, max_bytes: int | None = None):
+        """
+        Removes the least recently used entries until at most max_bytes (default self.max_bytes) are left.
+        Entries another process removed in the meantime are skipped.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(self.suffix):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        entries.sort()
+        for _, size, name in entries:
+            if total <= max_bytes:
+                break
+            self._remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        self.evict(0)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class TokenCache(DirectoryCache):
+    """
+    Content-addressed on-disk cache of token streams.
+
+    Entries are keyed by the SHA-256 of LEXER_VERSION and the source, so an edited source or a changed
+    lexer simply misses. Writing and evicting entries is up to DirectoryCache.
+    """
+    suffix = '.tok'
+
+    def __init__(self, directory: str | None = None, max_bytes: int = MAX_CACHE_BYTES):
+        super().__init__(directory or default_directory(), max_bytes)
+
+    @staticmethod
+    def key(source: str) -> str:
+        digest = hashlib.sha256(str(LEXER_VERSION).encode())
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def load(self, source: str) -> TokenBuffer | None:
+        """
+        The cached tokens of source, None on a miss. Unreadable or damaged entries count as misses.
+        """
+        key = self.key(source)
+        data = self.read(key)
+        if data is None:
+            return None
+        buffer = self.decode(source, data)
+        if buffer is None:
+            self._remove(self.path(key))
+        return buffer
+
+    def store(self, source: str, tokens: TokenBuffer | Iterable[Token]):
+        if not isinstance(tokens, TokenBuffer):
+            tokens = TokenBuffer.from_tokens(source, tokens)
+        self.write(self.key(source), self.encode(tokens))
+
+    @staticmethod
+    def encode(buffer: TokenBuffer) -> bytes:
+        columns = [buffer.kinds, buffer.starts, buffer.ends, buffer.lines]
+        if sys.byteorder == 'big':
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        return HEADER.pack(MAGIC, FORMAT_VERSION, len(buffer)) + b''.join(column.tobytes() for column in columns)
+
+    @staticmethod
+    def decode(source: str, data: bytes) -> TokenBuffer | None:
+        if len(data) < HEADER.size:
+            return None
+        magic, version, count = HEADER.unpack_from(data)
+        buffer = TokenBuffer(source)
+        columns = [buffer.kinds, buffer.starts, buffer.ends, buffer.lines]
+        if magic != MAGIC or version != FORMAT_VERSION or \
+                len(data) != HEADER.size + count * sum(column.itemsize for column in columns):
+            return None
+        view = memoryview(data)
+        offset = HEADER.size
+        for column in columns:
+            end = offset + count * column.itemsize
+            column.frombytes(view[offset:end])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            offset = end
+        return buffer
@@ -1,40 +1,78 @@
 import getpass
 import time
 import sys
-from lexer.lexer import Lexer
+from lexer.engines import LEXER_ENGINES, DEFAULT_ENGINE
+from lexer.stream_lexer import StreamLexer
+from lexer.token_cache import TokenCache, CachedLexer
+from compiler.pipeline import STREAMING_LEXERS
+from tokens.token_file import write_token_file, TokenFile
 from repl import repl
 from tokens import tokens
+from tracing.tracing import trace, CHANNELS
 from parser.parser import *
 from parser.LL1 import *
 
 sys.path.append("..")
 
 
-def scan(source: str | None = None, filename: str | None = None):
+token_cache = TokenCache()
+
+
+def open_lexer(source: str | None = None, filename: str | None = None, engine: str = DEFAULT_ENGINE,
+               use_cache: bool = True, streaming: bool = False, echo: bool = True):
+    """
+    The lexer for source or the file filename as the engine chosen with lexer_engine reads it, tokens of an
+    unchanged source come from the token cache. With streaming the engine hands its tokens out without
+    keeping them (see STREAMING_LEXERS), echo prints the file read. Returns (lexer, source, cached tokens
+    or None), None when the file does not exist.
+    """
+    options = STREAMING_LEXERS.get(engine, {}) if streaming else {}
+    cached = None
+    if filename and engine == "stream":
+        # Read the file in chunks (through mmap) instead of loading it into memory first
+        try:
+            return StreamLexer.open(filename, **options), None, None
+        except FileNotFoundError:
+            print("Error: File not found.")
+            return None
     if filename:
         try:
             with open(filename, 'r', encoding='utf-8') as f:
-                content = f.read()
-                print(content)
-                source = content
+                source = f.read()
+                if echo:
+                    print(source)
         except FileNotFoundError:
             print("Error: File not found.")
+            return None
+
+    # Unchanged sources are not lexed again, their tokens come straight from the cache
+    if use_cache:
+        cached = token_cache.load(source)
+    if cached is not None:
+        return CachedLexer(source, cached), source, cached
+    return LEXER_ENGINES[engine](character_stream=source, **options), source, None
 
-    lexer = Lexer(character_stream=source)
+
+def scan(source: str | None = None, filename: str | None = None, engine: str = DEFAULT_ENGINE,
+         use_cache: bool = True):
+    opened = open_lexer(source, filename, engine, use_cache)
+    if opened is None:
+        return None
+    lexer, source, cached = opened
     start_time = time.time()
 
-    while True:
-        tok = lexer.next_token()
-        try:
-            if tok.type == tokens.EOF:
-                break
-            print(f'token found-> {tok}\n'
-                  f'\ntokens -> {lexer.tokens}\n')
-        except AttributeError:
-            continue
+    for tok in lexer:
+        if tok.type == tokens.EOF:
+            break
+        print(f'token found-> {tok}\n'
+              f'\ntokens -> {lexer.tokens}\n')
 
     end_time = time.time()
     print(f"Total runtime is {round(end_time - start_time, 8)}\n")
+    if isinstance(lexer, StreamLexer):
+        lexer.close()
+    elif use_cache and cached is None:
+        token_cache.store(source, lexer.tokens)
     return lexer
 
 def main():
@@ -57,6 +95,7 @@ def main():
     print(monke_logo)
     print(f"Hello, {username}! Welcome to the Monke compiler!")
     print("Type in commands to get started (or 'help' for options):")
+    engine = DEFAULT_ENGINE
 
     while True:
         command = input("(MonkePaw)> ").lower()
@@ -65,7 +104,24 @@ def main():
             break  # Exit after starting the REPL
         elif command in ["scan_file", "sf"]:
             filename = input("Enter the full path of the file: ")
-            l = scan(filename=filename)
+            l = scan(filename=filename, engine=engine)
+        elif command in ["lexer_engine", "le"]:
+            choice = input(f"Choose a lexer engine {list(LEXER_ENGINES)}: ").lower()
+            if choice in LEXER_ENGINES:
+                engine = choice
+                print(f"Using the {engine} lexer engine\n")
+            else:
+                print(f"Unknown lexer engine, still using {engine}\n")
+        elif command in ["trace", "tr"]:
+            choice = input(f"Trace channels to enable {list(CHANNELS)}, 'all' or 'none': ").lower()
+            names = [name.strip() for name in choice.split(",") if name.strip()]
+            try:
+                trace.disable()
+                if names and names != ["none"]:
+                    trace.enable(*([] if names == ["all"] else names))
+                print(f"Tracing {trace.enabled() or 'nothing'}\n")
+            except ValueError as e:
+                print(f"{e}\n")
         elif command in ["show_tokens", "st"]:
             try:
                 if l.tokens:
@@ -75,29 +131,71 @@ def main():
                     print("You have no tokens!\n")
             except UnboundLocalError:
                 print("You need to scan some Monke first!\n")
+        elif command in ["write_tokens", "wt"]:
+            try:
+                filename = input("Enter the path of the token file to write: ")
+                write_token_file(filename, l.tokens)
+                print(f"Wrote {len(l.tokens)} tokens to {filename}\n")
+            except UnboundLocalError:
+                print("You need to scan some Monke first!\n")
         elif command in ["parser", "prs"]:
             while True:
                 parser_command = input("(Parser)> ").lower()
 
                 if parser_command in ["parse_directly", "pd"]:
                     statement = input("Enter your statement: ")
-                    parser_lexer = scan(source=statement)
+                    parser_lexer = scan(source=statement, engine=engine)
                     print(f'TOKENS - {parser_lexer.tokens}')
                     p = Parser(parser_lexer.tokens)
                     p.parse()
 
                 elif parser_command in ["parse_file", "pf"]:
                     filename = input("Enter the full path of the file: ")
-                    parser_lexer = scan(filename=filename)
-                    p = Parser(parser_lexer.tokens)
-                    p.parse()
+                    opened = open_lexer(filename=filename, engine=engine, streaming=True, echo=False)
+                    if opened is not None:
+                        # The parser pulls tokens as it goes and forgets them once their statement is parsed,
+                        # neither it nor the lexer keeps the token list
+                        file_lexer = opened[0]
+                        try:
+                            p = Parser(file_lexer)
+                            p.parse(release=True)
+                        finally:
+                            if isinstance(file_lexer, StreamLexer):
+                                file_lexer.close()
+
+                elif parser_command in ["parse_token_file", "ptf"]:
+                    filename = input("Enter the full path of the token file: ")
+                    try:
+                        with TokenFile(filename) as token_file:
+                            p = Parser(token_file)
+                            p.parse()
+                    except (OSError, ValueError) as e:
+                        print(f"Error: {e}")
 
                 elif parser_command in ["show_ast", "sa"]:
                     try:
+                        depth = input("Levels to show (empty for all): ").strip()
+                        path = input("Node path, child indexes like 0.2 (empty for the program): ").strip()
+                        max_depth = int(depth) if depth else None
+                        node_path = [int(index) for index in path.split('.')] if path else []
                         print(f'\nHERE IS THE Parse Tree\n')
-                        p.show_ast()
+                        p.show_ast(max_depth, node_path)
                     except UnboundLocalError:
                         print("\nPlease parse tokens before displaying Concrete Syntax Tree")
+                    except (ValueError, IndexError) as e:
+                        print(f"Error: {e}")
+
+                elif parser_command in ["export_ast", "ea"]:
+                    try:
+                        export_format = input("Format, jsonl or dot: ").strip() or "jsonl"
+                        filename = input("Enter the full path of the file to write: ")
+                        with open(filename, "w", encoding="utf-8") as export_file:
+                            count = p.export_ast(export_file, export_format)
+                        print(f"Wrote {count} nodes to {filename}")
+                    except UnboundLocalError:
+                        print("\nPlease parse tokens before exporting the Abstract Syntax Tree")
+                    except (OSError, ValueError) as e:
+                        print(f"Error: {e}")
 
                 elif parser_command in ["show_symbol_table", "sst"]:
                     try:
@@ -156,6 +254,9 @@ Available Commands:
 - start: Start the interactive REPL for tokenizing code.
 - scan_file or sf: Read code from a file and tokenize it.
 - show_tokens or st: Show the tokens generated from the Lexical Analysis.
+- write_tokens or wt: Write the scanned tokens to a binary token file.
+- lexer_engine or le: Choose the lexer engine (classic, pattern, stream, buffer or parallel) used for scanning.
+- trace or tr: Choose the trace channels (lexer, parser, symbols, ast) printed while compiling.
 - parser or prs: Enter the parser submenu.
 - keywords: List the reserved keywords in the Monke language.
 - about: Display information about the MonkePaw compiler.
@@ -165,7 +266,9 @@ Parser Submenu Commands:
 
 - parse_directly or pd: Parse statements directly from the user.
 - parse_file or pf: Parse a source file.
-- show_ast or sa: Show the Abstract Syntax Tree.
+- parse_token_file or ptf: Parse a binary token file written by write_tokens or another frontend.
+- show_ast or sa: Show the Abstract Syntax Tree, optionally only some levels of it or the subtree at a path of child indexes.
+- export_ast or ea: Write the Abstract Syntax Tree to a file as JSON Lines or Graphviz DOT.
 - show_symbol_table or sst: Show the symbol table.
 - exit: Exit the parser submenu.
 
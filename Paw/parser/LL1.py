@@ -7,22 +7,92 @@ from symbol_table.symbol_table import *
 
 
 class Node:
+    # Every node class has slots for what it adds and nothing it can read from its token, an AST has
+    # a node for about every token and a dict for each would outweigh the source (see parser/benchmark.py)
+    __slots__ = ('token', '_type', 'value')
+
     def __init__(self, token: Token, value: Node | Deque | Dict | int | str | bool | float | None):
         self.token = token
         self._type = token.type
-        self.name = token.lexeme
-        self.begin_position = token.begin_position
-        self.line_position = token.line_position
         self.value = value
 
+    # The lexeme of the token, the nodes named otherwise have a name slot of their own
+    @property
+    def name(self):
+        return self.token.lexeme
+
+    # Read from the token, so a node moves along with its tokens (see compiler/incremental.py)
+    @property
+    def begin_position(self):
+        return self.token.begin_position
+
+    @property
+    def line_position(self):
+        return self.token.line_position
+
     def __repr__(self):
         return f"\n{self.__class__.__name__}\n" \
                f"(type::= '{self._type}',\n" \
                f"name::= '{self.name}',\n" \
                f"value::= ('{self.value}')\n"
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method, which in (('__str__', _STR), ('__repr__', _REPR)):
+            if method in cls.__dict__:
+                setattr(cls, method, _rendered(cls.__dict__[method], which))
+
+
+# The str and repr of the nodes under the one being rendered, by id, see _rendered. None between renderings.
+_STR, _REPR = 0, 1
+_RENDERED: tuple[dict[int, str], dict[int, str]] | None = None
+_renderer = None
+
+
+def _rendered(method, which: int):
+    """
+    Wraps the __str__ or __repr__ of a node class. Those put the str and repr of the nodes under them in
+    their own, for a long chain of operators that would recurse once per node. The outermost call first
+    renders every node under its node with a NodeVisitor, children before their parent, so what a method
+    asks of the nodes under it is already made and nothing recurses past one level.
+    """
+
+    def render(self):
+        global _RENDERED, _renderer
+        if _RENDERED is not None:
+            done = _RENDERED[which].get(id(self))
+            return method(self) if done is None else done
+        if _renderer is None:
+            # parser.visitor imports this module
+            from parser.visitor import NodeVisitor
+
+            class Renderer(NodeVisitor):
+                def exit_node(self, node: Node):
+                    for render_one, rendered in zip((str, repr), _RENDERED):
+                        try:
+                            rendered[id(node)] = render_one(node)
+                        except Exception:
+                            # Left to the call that asks for it, it raises there as it did before
+                            pass
+
+            _renderer = Renderer()
+        _RENDERED = ({}, {})
+        try:
+            _renderer.visit(self)
+            done = _RENDERED[which].get(id(self))
+            return method(self) if done is None else done
+        finally:
+            _RENDERED = None
+
+    return render
+
+
+Node.__repr__ = _rendered(Node.__repr__, _REPR)
+
 
 class ProgramNode(Node):
+    __slots__ = ('name', 'statements')
+
     def __init__(self, token: Token, value: StatementListNode):
         super().__init__(token, value)
         self.name = "Monke_beta_0.1"
@@ -42,6 +112,8 @@ class ProgramNode(Node):
 
 
 class StatementListNode(Node):
+    __slots__ = ('statements',)
+
     def __init__(self,
                  token: Token,
                  statements: Deque[StatementNode]):
@@ -63,6 +135,8 @@ class StatementListNode(Node):
 
 
 class StatementNode(Node):
+    __slots__ = ()
+
     def __str__(self):
         string = f'\n***START {self.__class__.__name__} ***\n' \
                  f'\nname::= {self.name}\n'
@@ -78,6 +152,8 @@ class StatementNode(Node):
 
 
 class LetStatementNode(StatementNode):
+    __slots__ = ('name',)
+
     def __init__(self, token: Token, name, value: Node | Deque[Node] | None = None):
         super().__init__(token, value)
         self.name = name
@@ -98,11 +174,14 @@ class LetStatementNode(StatementNode):
 
 
 class ExpressionStatementNode(StatementNode):
+    __slots__ = ('expression', 'name')
+
     def __init__(self,
                  token: Token,
                  expression: Node,
                  value: Node | Deque[Node | int | str | bool | float] | int | str | bool | float | None = None):
         super().__init__(token, value)
+        self.name = token.lexeme
         self.expression = expression
         self.value = value
         self._type = expression._type
@@ -127,6 +206,8 @@ class ExpressionStatementNode(StatementNode):
 
 
 class IfStatementNode(StatementNode):
+    __slots__ = ('conditions', 'alternative')
+
     def __init__(self, token: Token,
                  conditions: IfConditionNode | Deque[IfConditionNode | StatementListNode] = None,
                  alternative: Node | None = None,
@@ -159,6 +240,8 @@ class IfStatementNode(StatementNode):
 
 
 class IfConditionNode(Node):
+    __slots__ = ('left', 'right', 'operator', 'consequence')
+
     def __init__(self,
                  left: IdentifierNode | IntegerLiteralNode | StringLiteralNode | FloatLiteralNode | BooleanLiteralNode,
                  right: IdentifierNode | IntegerLiteralNode | StringLiteralNode | FloatLiteralNode | BooleanLiteralNode,
@@ -191,6 +274,8 @@ class IfConditionNode(Node):
 
 
 class PrintStatementNode(StatementNode):
+    __slots__ = ('expression', 'parameters')
+
 
     def __init__(self, token: Token, expression: StatementListNode | ArgumentsListNode, value: int | str | float | bool | None):
         super().__init__(token, value)
@@ -226,6 +311,8 @@ class PrintStatementNode(StatementNode):
 
 
 class ClockStatementNode(StatementNode):
+    __slots__ = ('function',)
+
     def __init__(self, token: Token, function, value):
         super().__init__(token, value)
         self.function = function
@@ -242,6 +329,8 @@ class ClockStatementNode(StatementNode):
 
 
 class ClockFunctionNode(Node):
+    __slots__ = ()
+
     def __init__(self, token: Token, value):
         super().__init__(token, value)
         self.value = value  # Modify based on your grammar's clock_function definition
@@ -258,6 +347,8 @@ class ClockFunctionNode(Node):
 
 
 class CustomContextNode(Node):
+    __slots__ = ('name', 'parent', 'statement_list')
+
     def __init__(self,
                  token: Token,
                  statement_list: StatementListNode,
@@ -282,6 +373,8 @@ class CustomContextNode(Node):
 
 
 class ExpressionNode(Node):
+    __slots__ = ()
+
     def __init__(self, token, value, _type: str):
         super().__init__(token, value)
         self.token = token
@@ -307,6 +400,8 @@ class ExpressionNode(Node):
 
 
 class ExpressionList(Node):
+    __slots__ = ('expressions',)
+
     def __init__(self, token: Token, expressions: Deque[ExpressionNode], value):
         super().__init__(token, value)
         self.expressions = expressions
@@ -325,6 +420,8 @@ class ExpressionList(Node):
 
 
 class IntegerLiteralNode(ExpressionNode):
+    __slots__ = ()
+
     def __init__(self, token: Token, value):
         self._type = INT
         super().__init__(token, value, self._type)
@@ -332,6 +429,8 @@ class IntegerLiteralNode(ExpressionNode):
 
 
 class FloatLiteralNode(ExpressionNode):
+    __slots__ = ()
+
     def __init__(self, token: Token, value):
         self._type = FLOAT
         super().__init__(token, value, self._type)
@@ -339,6 +438,8 @@ class FloatLiteralNode(ExpressionNode):
 
 
 class StringLiteralNode(ExpressionNode):
+    __slots__ = ()
+
     def __init__(self, token: Token, value):
         self._type = STR
         super().__init__(token, value, self._type)
@@ -346,6 +447,8 @@ class StringLiteralNode(ExpressionNode):
 
 
 class BooleanLiteralNode(ExpressionNode):
+    __slots__ = ()
+
     def __init__(self, token: Token, value):
         self._type = BOOL
         super().__init__(token, value, self._type)
@@ -353,8 +456,9 @@ class BooleanLiteralNode(ExpressionNode):
 
 
 class IdentifierNode(ExpressionNode):
+    __slots__ = ()
+
     def __init__(self, token: Token, value):
-        self.name = token.lexeme
         self._type = IDENT
         super().__init__(token, value, self._type)
         self.value = value
@@ -372,6 +476,8 @@ class IdentifierNode(ExpressionNode):
 
 
 class FunctionLiteralNode(ExpressionNode):
+    __slots__ = ('_return_type', 'parameters', 'body')
+
     def __init__(self, token: Token, parameters: ParametersNode,
                  body: StatementListNode,
                  return_node: ReturnStatementNode,
@@ -401,6 +507,8 @@ class FunctionLiteralNode(ExpressionNode):
                f'***END {self.__class__.__name__}***\n'
 
 class ParameterNode(Node):
+    __slots__ = ('child', 'position')
+
     def __init__(self, token: Token, child: Node, position: int):
         super().__init__(token, None)
         self.child = child
@@ -423,6 +531,8 @@ class ParameterNode(Node):
                f'***END {self.__class__.__name__}***\n'
 
 class ParametersNode(Node):
+    __slots__ = ('parameters',)
+
     def __init__(self, token: Token, parameters: Deque[Node]):
         super().__init__(token, parameters)
         self.parameters = parameters
@@ -440,6 +550,8 @@ class ParametersNode(Node):
                f'***END {self.__class__.__name__}***\n'
 
 class CallExpressionNode(ExpressionNode):
+    __slots__ = ('function_node', 'name', 'arguments', 'symbol_table')
+
     def __init__(self, token: Token, function: FunctionLiteralNode, arguments: ArgumentsListNode,
                  symbol_table: SymbolTable,
                  value: Node | int | str | float | bool | None = None):
@@ -464,6 +576,8 @@ class CallExpressionNode(ExpressionNode):
                f'***END {self.__class__.__name__}***\n'
 
 class ArgumentsListNode(Node):
+    __slots__ = ('arguments',)
+
     def __init__(self, token: Token, arguments: Deque[ExpressionNode | None] = deque([])):
         super().__init__(token, arguments)
         self.arguments = arguments
@@ -490,6 +604,8 @@ class ArgumentsListNode(Node):
 
 
 class ReturnStatementNode(StatementNode):
+    __slots__ = ('expression',)
+
     def __init__(self, token: Token, expression: ExpressionNode,
                  value: Any | Node | None = None):
         self.expression: ExpressionNode = expression
@@ -508,6 +624,8 @@ class ReturnStatementNode(StatementNode):
 
 
 class PrefixExpressionNode(ExpressionNode):
+    __slots__ = ('operator', 'left', 'right')
+
     def __init__(self,
                  token,
                  operator,
@@ -541,6 +659,8 @@ class PrefixExpressionNode(ExpressionNode):
 
 
 class InfixOperatorNode(Node):
+    __slots__ = ('left', 'right', 'operator')
+
     def __init__(self, token: Token, operator: str | Node, left: Node = None, right: Node = None,
                  value: Any | Node | None = None):
         super().__init__(token, value)
@@ -652,7 +772,7 @@ class InfixOperatorNode(Node):
                f"(type::= '{self._type}'\n" \
                f"name::= '{self.name}\n'" \
                f"left::= ('{self.left}')\n" \
-               f"operator::= ('{self.operator.name}')\n" \
+               f"operator::= ('{self.operator}')\n" \
                f"right::= ('{self.right}')\n" \
                f"value::= ('{self.value}')\n" \
                f'***END {self.__class__.__name__}***\n'
@@ -662,12 +782,14 @@ class InfixOperatorNode(Node):
                f"type::= {self._type}\n" \
                f"name::= {self.name}\n" \
                f"left::= {repr(self.left)} " \
-               f"operator::= {self.operator.name} " \
+               f"operator::= {self.operator} " \
                f"right::= {repr(self.right)}\n" \
                f"value::= ('{self.value}')\n" \
                f'***END {self.__class__.__name__}***\n'
 
 class AssignStatementNode(InfixOperatorNode):
+    __slots__ = ('name',)
+
     def __init__(self, token: Token,
                  left: Node,
                  right: Node,
@@ -704,6 +826,8 @@ class AssignStatementNode(InfixOperatorNode):
 
 
 class GroupedExpressionNode(ExpressionNode):
+    __slots__ = ('expression',)
+
     def __init__(self, token,
                  expression: ExpressionStatementNode |
                              PrefixOperatorNode |
@@ -734,6 +858,8 @@ class GroupedExpressionNode(ExpressionNode):
 
 
 class PrefixOperatorNode(Node):
+    __slots__ = ('operator', 'left', 'right')
+
     def __init__(self, token: Token,
                  operator: str | Node,
                  left: Node = None,
@@ -751,7 +877,7 @@ class PrefixOperatorNode(Node):
                f"(type::= '{self._type}'\n" \
                f"name::= '{self.name}\n'" \
                f"left::= ('{self.left}')\n" \
-               f"operator::= ('{self.operator.token.lexeme}')\n" \
+               f"operator::= ('{self.operator}')\n" \
                f"right::= ('{self.right}')\n" \
                f"value::= ('{self.value}')\n" \
                f'***END {self.__class__.__name__}***\n'
@@ -761,7 +887,7 @@ class PrefixOperatorNode(Node):
                f"type::= {self._type}\n" \
                f"name::= {self.name}\n" \
                f"left::= {repr(self.left)} " \
-               f"operator::= {self.operator.token.lexeme} " \
+               f"operator::= {self.operator} " \
                f"right::= {repr(self.right)}\n" \
                f"value::= ('{self.value}')\n" \
                f'***END {self.__class__.__name__}***\n'
@@ -0,0 +1,467 @@
+from __future__ import annotations
+import argparse
+import gc
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from typing import Any, Iterator
+from tabulate import tabulate
+# The symbol table has to be imported before parser.LL1, the two modules import each other
+from symbol_table.symbol_table import SymbolTable
+from parser.LL1 import *
+from parser.visitor import node_fields
+from tokens.tokens import Token
+from compiler.compiler import compile_source, CompileOptions
+from parser.benchmark import generate_source
+
+# The node classes by kind, the number stored for a node in AstArena.kind. New classes go at the end.
+NODE_KINDS = (
+    Node, ProgramNode, StatementListNode, StatementNode, LetStatementNode, ExpressionStatementNode,
+    IfStatementNode, IfConditionNode, PrintStatementNode, ClockStatementNode, ClockFunctionNode,
+    CustomContextNode, ExpressionNode, ExpressionList, IntegerLiteralNode, FloatLiteralNode,
+    StringLiteralNode, BooleanLiteralNode, IdentifierNode, FunctionLiteralNode, ParameterNode,
+    ParametersNode, CallExpressionNode, ArgumentsListNode, ReturnStatementNode, PrefixExpressionNode,
+    InfixOperatorNode, AssignStatementNode, GroupedExpressionNode, PrefixOperatorNode,
+)
+KIND_OF = {cls: kind for kind, cls in enumerate(NODE_KINDS)}
+
+# Kind of a row standing for a node that already has a row, its value is the index of that row
+REFERENCE = 255
+
+NO_ROW = -1
+
+
+FIELDS = {cls: node_fields(cls) for cls in NODE_KINDS}
+
+
+class Layout:
+    """
+    What a field of a node holds when it is not a literal: the child row with its field number (CHILD),
+    a deque or list of the child rows with its field number (DEQUE, LIST), the very object of an earlier
+    field (Layout(ALIAS, field)), or nothing, the slot was never set (UNSET).
+    """
+    __slots__ = ('code', 'field')
+
+    def __init__(self, code: str, field: int = 0):
+        self.code = code
+        self.field = field
+
+    def __eq__(self, other):
+        return isinstance(other, Layout) and self.code == other.code and self.field == other.field
+
+    def __hash__(self):
+        return hash((self.code, self.field))
+
+    def __reduce__(self):
+        return Layout, (self.code, self.field)
+
+    def __repr__(self):
+        return f"Layout({self.code!r}, {self.field})" if self.code == ALIAS else self.code
+
+
+ALIAS = 'ALIAS'
+CHILD, DEQUE, LIST, UNSET = Layout('CHILD'), Layout('DEQUE'), Layout('LIST'), Layout('UNSET')
+
+# Field values that are always literals
+_SCALARS = frozenset((str, int, float, bool))
+
+# Steps of the plans AstArena.fill sets the fields of a node by
+_LITERAL, _CHILD, _DEQUE, _LIST, _ALIAS, _COPY = range(6)
+
+
+class AstArena:
+    """
+    An AST in parallel arrays, one row per node in preorder, instead of linked node objects:
+
+        kind          the class of the node, its index in NODE_KINDS, REFERENCE for a node seen before
+        token         index of the token of the node in tokens
+        first_child   row of the first child, NO_ROW for none
+        next_sibling  row of the next child of the same parent, NO_ROW for the last one
+        field         which field of the parent the node is in, an index in FIELDS of the parent's class
+        value         index in literals of the node's fields, the row a REFERENCE stands for
+
+    A literals entry is a tuple with an entry per field of the class: the value of the field or a Layout
+    saying where its nodes are. Equal tuples are stored once, so a run of '+' nodes or of equal numbers
+    costs four bytes per column and node. Nodes found under more than one parent, an assigned expression
+    is both the value of the statement and of its identifier, have a row where they are met first and
+    REFERENCE rows elsewhere, to_nodes gives them back as one object again.
+
+    Rows are read through NodeView, root is the view of row 0.
+    """
+
+    def __init__(self):
+        self.kind = array('B')
+        self.token = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.field = array('B')
+        self.value = array('i')
+        self.tokens: list[Token] = []
+        self.literals: list[tuple] = []
+
+    @classmethod
+    def from_nodes(cls, root: Node, rows: dict[int, int] | None = None) -> AstArena:
+        """
+        The arena of the tree under root, read with an explicit stack so deep trees do not recurse.
+        rows, when given, is filled with the row of every node by its id.
+        """
+        arena = cls()
+        rows = {} if rows is None else rows
+        kind, token, field_column, value = arena.kind, arena.token, arena.field, arena.value
+        first_child, next_sibling = arena.first_child, arena.next_sibling
+        # What is in tokens and literals already, only needed while building
+        token_index: dict[int, int] = {}
+        literal_index: dict[tuple, int] = {}
+        last_child: list[int] = []
+        # (node, parent row, field in the parent)
+        stack: list[tuple[Any, int, int]] = [(root, NO_ROW, 0)]
+        while stack:
+            node, parent, field = stack.pop()
+            row = len(kind)
+            seen = rows.get(id(node))
+            if seen is not None:
+                kind.append(REFERENCE)
+                token.append(NO_ROW)
+                value.append(seen)
+            else:
+                rows[id(node)] = row
+                layout = []
+                children = []
+                # The nodes and containers of the node by id, statements and value of a StatementListNode are
+                # one deque and have to stay one
+                held: dict[int, int] = {}
+                for index, name in enumerate(FIELDS[type(node)]):
+                    item = getattr(node, name, UNSET)
+                    if item is None or type(item) in _SCALARS:
+                        layout.append(item)
+                    elif id(item) in held:
+                        layout.append(Layout(ALIAS, held[id(item)]))
+                    elif isinstance(item, Node):
+                        held[id(item)] = index
+                        layout.append(CHILD)
+                        children.append((item, row, index))
+                    elif isinstance(item, (deque, list)) and all(isinstance(element, Node) for element in item):
+                        held[id(item)] = index
+                        layout.append(DEQUE if isinstance(item, deque) else LIST)
+                        children.extend((element, row, index) for element in item)
+                    else:
+                        layout.append(item)
+                kind.append(KIND_OF[type(node)])
+                token.append(arena._intern_token(node.token, token_index))
+                value.append(arena._intern(tuple(layout), literal_index))
+                # Pushed last to first, so they are taken off in order
+                stack.extend(reversed(children))
+            first_child.append(NO_ROW)
+            next_sibling.append(NO_ROW)
+            field_column.append(field)
+            last_child.append(NO_ROW)
+            if parent != NO_ROW:
+                if last_child[parent] == NO_ROW:
+                    first_child[parent] = row
+                else:
+                    next_sibling[last_child[parent]] = row
+                last_child[parent] = row
+        return arena
+
+    def _intern_token(self, token: Token, token_index: dict[int, int]) -> int:
+        index = token_index.get(id(token))
+        if index is None:
+            index = token_index[id(token)] = len(self.tokens)
+            self.tokens.append(token)
+        return index
+
+    def _intern(self, literals: tuple, literal_index: dict[tuple, int]) -> int:
+        try:
+            index = literal_index.get(literals)
+        except TypeError:
+            # An unhashable literal, a symbol table or a deque of values, is kept as it is
+            self.literals.append(literals)
+            return len(self.literals) - 1
+        if index is None:
+            index = literal_index[literals] = len(self.literals)
+            self.literals.append(literals)
+        return index
+
+    def to_nodes(self) -> Node | None:
+        """
+        The LL1 node tree of the arena, its nodes made afresh around the same tokens.
+        """
+        if not self.kind:
+            return None
+        nodes = self.shells()
+        self.fill(nodes)
+        return nodes[0]
+
+    def shells(self) -> list[Node]:
+        """
+        A node per row with only its token set, a REFERENCE row has the node of the row it stands for.
+        fill sets the rest, in between they can already be handed out (see compiler/serialization.py).
+        """
+        kind, token, value, tokens = self.kind, self.token, self.value, self.tokens
+        nodes: list[Any] = [None] * len(kind)
+        for row in range(len(kind)):
+            if kind[row] != REFERENCE:
+                node_class = NODE_KINDS[kind[row]]
+                node = nodes[row] = node_class.__new__(node_class)
+                node.token = tokens[token[row]]
+        for row in range(len(kind)):
+            if kind[row] == REFERENCE:
+                nodes[row] = nodes[value[row]]
+        return nodes
+
+    def fill(self, nodes: list[Node]):
+        # Sets the fields of the shells, children are in the order of the fields so they are taken in turn
+        kind, value, field = self.kind, self.value, self.field
+        first_child, next_sibling = self.first_child, self.next_sibling
+        plans: dict[int, tuple] = {}
+        for row in range(len(kind)):
+            node_kind = kind[row]
+            if node_kind == REFERENCE:
+                continue
+            key = value[row] << 8 | node_kind
+            plan = plans.get(key)
+            if plan is None:
+                plan = plans[key] = self._plan(node_kind, value[row])
+            node = nodes[row]
+            child = first_child[row]
+            for name, code, item in plan:
+                if code == _LITERAL:
+                    setattr(node, name, item)
+                elif code == _CHILD:
+                    setattr(node, name, nodes[child])
+                    child = next_sibling[child]
+                elif code == _ALIAS:
+                    setattr(node, name, getattr(node, item))
+                elif code == _COPY:
+                    # Containers of values are not shared with the tree the arena was made from
+                    setattr(node, name, type(item)(item))
+                else:
+                    elements = deque() if code == _DEQUE else []
+                    while child != NO_ROW and field[child] == item:
+                        elements.append(nodes[child])
+                        child = next_sibling[child]
+                    setattr(node, name, elements)
+
+    def _plan(self, kind: int, value: int) -> tuple:
+        # (field name, what to do, literal, index of the field of the elements or name of the aliased field)
+        fields = FIELDS[NODE_KINDS[kind]]
+        plan = []
+        for index, (name, layout) in enumerate(zip(fields, self.literals[value])):
+            if not isinstance(layout, Layout):
+                plan.append((name, _COPY if isinstance(layout, (deque, list, dict)) else _LITERAL, layout))
+            elif layout.code == ALIAS:
+                plan.append((name, _ALIAS, fields[layout.field]))
+            elif layout.code == CHILD.code:
+                plan.append((name, _CHILD, index))
+            elif layout.code != UNSET.code:
+                plan.append((name, _DEQUE if layout.code == DEQUE.code else _LIST, index))
+        return tuple(plan)
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    @property
+    def root(self) -> NodeView | None:
+        return NodeView(self, 0) if self.kind else None
+
+    def walk(self) -> Iterator[NodeView]:
+        # Every node once in preorder, which is the order of the rows, references left out
+        kind = self.kind
+        for row in range(len(kind)):
+            if kind[row] != REFERENCE:
+                yield NodeView(self, row)
+
+    def nbytes(self) -> int:
+        # Bytes of the columns, the tokens and literals tables not included
+        return sum(column.itemsize * len(column) for column in
+                   (self.kind, self.token, self.first_child, self.next_sibling, self.field, self.value))
+
+    def __repr__(self):
+        return f"AstArena({len(self.kind)} rows, {len(self.tokens)} tokens, {len(self.literals)} literals)"
+
+
+class NodeView:
+    """
+    Read-only view of one node of an AstArena, with about what walkers read of an LL1 node: its class,
+    token, name and positions, its children in field order and its fields by name. A view of a
+    REFERENCE row reads the row it stands for.
+    """
+    __slots__ = ('arena', 'row')
+
+    def __init__(self, arena: AstArena, row: int):
+        if arena.kind[row] == REFERENCE:
+            row = arena.value[row]
+        self.arena = arena
+        self.row = row
+
+    @property
+    def node_class(self) -> type:
+        return NODE_KINDS[self.arena.kind[self.row]]
+
+    @property
+    def token(self) -> Token:
+        return self.arena.tokens[self.arena.token[self.row]]
+
+    @property
+    def name(self) -> str:
+        fields = FIELDS[self.node_class]
+        if 'name' in fields:
+            return self.field('name')
+        return self.token.lexeme
+
+    @property
+    def begin_position(self) -> int | None:
+        return self.token.begin_position
+
+    @property
+    def line_position(self) -> int | None:
+        return self.token.line_position
+
+    def children(self) -> Iterator[NodeView]:
+        arena = self.arena
+        child = arena.first_child[self.row]
+        while child != NO_ROW:
+            yield NodeView(arena, child)
+            child = arena.next_sibling[child]
+
+    def field(self, name: str) -> Any:
+        """
+        The field called name: a NodeView for a node, a list of them for a deque or list of nodes,
+        the value itself otherwise. Raises AttributeError for a field the class does not have or that
+        was never set.
+        """
+        fields = FIELDS[self.node_class]
+        if name not in fields:
+            raise AttributeError(f"{self.node_class.__name__} has no field '{name}'")
+        index = fields.index(name)
+        literals = self.arena.literals[self.arena.value[self.row]]
+        layout = literals[index]
+        while isinstance(layout, Layout) and layout.code == ALIAS:
+            index = layout.field
+            layout = literals[index]
+        if not isinstance(layout, Layout):
+            return layout
+        if layout.code == UNSET.code:
+            raise AttributeError(f"The field '{name}' of {self.node_class.__name__} was never set")
+        children = [child for child in self._rows() if self.arena.field[child] == index]
+        if layout.code == CHILD.code:
+            return NodeView(self.arena, children[0])
+        return [NodeView(self.arena, child) for child in children]
+
+    def _rows(self) -> Iterator[int]:
+        arena = self.arena
+        child = arena.first_child[self.row]
+        while child != NO_ROW:
+            yield child
+            child = arena.next_sibling[child]
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and self.arena is other.arena and self.row == other.row
+
+    def __hash__(self):
+        return hash((id(self.arena), self.row))
+
+    def __repr__(self):
+        return f"NodeView({self.node_class.__name__} {self.name!r} at row {self.row})"
+
+
+def walk_nodes(root: Node) -> int:
+    # The object tree counterpart of AstArena.walk for the benchmark, every node once with an explicit stack
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        for name in FIELDS[type(node)]:
+            item = getattr(node, name, None)
+            if isinstance(item, Node):
+                stack.append(item)
+            elif isinstance(item, (deque, list)):
+                stack.extend(element for element in item if isinstance(element, Node))
+    return len(seen)
+
+
+def walk_views(arena: AstArena) -> int:
+    # The same walk through the views, from the root down by children
+    seen = set()
+    stack = [arena.root]
+    while stack:
+        view = stack.pop()
+        if view.row in seen:
+            continue
+        seen.add(view.row)
+        stack.extend(view.children())
+    return len(seen)
+
+
+def allocated(build) -> tuple[Any, int]:
+    # What build() returns and the bytes it leaves allocated while the result is alive
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def best_of(repeat: int, function, *args) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def measure(source: str, repeat: int = 3) -> dict:
+    """
+    The object tree of source against its arena: seconds to build one from the other, to walk every
+    node, and the bytes each keeps allocated. Both share the tokens, which are not counted.
+    """
+    ast = compile_source(source, CompileOptions(engine="pattern", redefinition='shadow')).ast
+    arena, arena_bytes = allocated(lambda: AstArena.from_nodes(ast))
+    # The object tree made afresh by to_nodes, so nothing of the parse, symbols or journal, is counted
+    tree, tree_bytes = allocated(arena.to_nodes)
+    nodes = walk_nodes(tree)
+    return {
+        "nodes": nodes,
+        "rows": len(arena),
+        "from_nodes": best_of(repeat, AstArena.from_nodes, tree),
+        "to_nodes": best_of(repeat, arena.to_nodes),
+        "walk_nodes": best_of(repeat, walk_nodes, tree),
+        "walk_views": best_of(repeat, walk_views, arena),
+        "walk_rows": best_of(repeat, lambda: sum(1 for _ in arena.walk())),
+        "tree_bytes": tree_bytes / nodes,
+        "arena_bytes": arena_bytes / nodes,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare the AST arena with the object tree.")
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[1, 16, 256],
+                            help="nesting depths of the generated expressions, see parser/benchmark.py")
+    arg_parser.add_argument("--statements", type=int, default=200, help="statements per source")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    rows = []
+    for depth in args.depths:
+        r = measure(generate_source(depth, args.statements), args.repeat)
+        rows.append([f"depth {depth}", r["nodes"], r["rows"],
+                     f"{r['from_nodes'] * 1e3:.1f}", f"{r['to_nodes'] * 1e3:.1f}",
+                     f"{r['walk_nodes'] * 1e3:.1f}", f"{r['walk_views'] * 1e3:.1f}", f"{r['walk_rows'] * 1e3:.1f}",
+                     round(r["tree_bytes"]), round(r["arena_bytes"])])
+    print(tabulate(rows, headers=["Source", "Nodes", "Rows", "from_nodes ms", "to_nodes ms", "Walk tree ms",
+                                  "Walk views ms", "Walk rows ms", "Tree B/node", "Arena B/node"],
+                   tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    # python -m parser.arena --depths 1 16 256, run from the Paw directory
+    main()
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import argparse
+import ast
+import gc
+import pprint
+import random
+import time
+import tracemalloc
+from tabulate import tabulate
+from lexer.benchmark import compare
+from lexer.pattern_lexer import PatternLexer
+from symbol_table.symbol_table import SymbolTable
+from parser.LL1 import Node
+from parser.parser import Parser
+from tokens.tokens import Token
+
+OPERATORS = ["+", "-", "*", "/"]
+
+
+def nested_expression(depth: int, rng: random.Random) -> str:
+    """
+    Arithmetic nested depth parentheses deep, e.g. (3 * -(1 + 2)) - 4 for depth 2. Every level adds
+    one operator and one number on a random side, a quarter of the levels are negated.
+    """
+    expression = str(rng.randrange(1, 100))
+    for _ in range(depth):
+        operand = str(rng.randrange(1, 100))
+        operator = rng.choice(OPERATORS)
+        grouped = f"-({expression})" if rng.random() < 0.25 else f"({expression})"
+        expression = f"{grouped} {operator} {operand}" if rng.random() < 0.5 else f"{operand} {operator} {grouped}"
+    return expression
+
+
+def generate_source(depth: int, statements: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n".join(f"let v{i} = {nested_expression(depth, rng)};" for i in range(statements)) + "\n"
+
+
+def parse(tokens: list[Token]) -> int:
+    """
+    Parses tokens with a fresh symbol table, returns the number of top level statements.
+    """
+    parser = Parser(tokens, SymbolTable(redefinition='shadow'), verbose=False)
+    statements = parser.parse()
+    if parser.errors:
+        raise ValueError(f"The benchmark source does not parse: {parser.errors[0]}")
+    return len(statements)
+
+
+def retained(tokens: list[Token]) -> tuple[int, int]:
+    """
+    Bytes a parse of tokens leaves allocated while its statements and symbol tables are alive, and the
+    number of AST nodes it made. The tokens are lexed beforehand and not counted.
+    """
+    gc.collect()
+    before = sum(isinstance(o, Node) for o in gc.get_objects())
+    tracemalloc.start()
+    try:
+        table = SymbolTable(redefinition='shadow')
+        statements = Parser(tokens, table, verbose=False).parse()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    nodes = sum(isinstance(o, Node) for o in gc.get_objects()) - before
+    del statements, table
+    return size, nodes
+
+
+def measure(source: str, repeat: int = 3) -> dict:
+    """
+    Best of repeat timed parses of source, lexed once beforehand, plus one parse under tracemalloc
+    for the peak memory and one for what the AST and symbol tables keep, per node.
+    """
+    tokens = list(PatternLexer(source))
+    best = float("inf")
+    statements = 0
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        statements = parse(tokens)
+        best = min(best, time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    try:
+        parse(tokens)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    size, nodes = retained(tokens)
+
+    return {
+        "tokens": len(tokens),
+        "statements": statements,
+        "seconds": best,
+        "tokens_per_sec": len(tokens) / best,
+        "us_per_statement": best / statements * 1e6,
+        "peak_mb": peak / 1e6,
+        "nodes": nodes,
+        "bytes_per_node": size / nodes,
+    }
+
+
+def run(depths: list[int], statements: int, seed: int = 0, repeat: int = 3) -> dict[str, dict]:
+    return {f"depth {depth}": measure(generate_source(depth, statements, seed), repeat) for depth in depths}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the expression parser on nested arithmetic.")
+    # Parentheses are parsed recursively, a few hundred levels stay well inside the default recursion limit
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[1, 4, 16, 64, 256],
+                            help="nesting depths of the generated expressions")
+    arg_parser.add_argument("--statements", type=int, default=200, help="statements per source")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--save", metavar="FILE", help="save the results as a baseline")
+    arg_parser.add_argument("--baseline", metavar="FILE", help="compare the results with a saved baseline")
+    args = arg_parser.parse_args()
+
+    corpus = {"depths": args.depths, "statements": args.statements, "seed": args.seed}
+    results = run(args.depths, args.statements, args.seed, args.repeat)
+
+    print(tabulate([[name, r["tokens"], f"{r['seconds']:.3f}", round(r["tokens_per_sec"]),
+                     f"{r['us_per_statement']:.1f}", f"{r['peak_mb']:.2f}", r["nodes"], round(r["bytes_per_node"])]
+                    for name, r in results.items()],
+                   headers=["Source", "Tokens", "Seconds", "Tokens/sec", "us/statement", "Peak MB", "Nodes",
+                            "Bytes/node"],
+                   tablefmt="grid"))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = ast.literal_eval(f.read())
+        if saved["corpus"] != corpus:
+            print(f"\nWarning: the baseline was measured on other sources {saved['corpus']}")
+        print(f"\nCompared with {args.baseline}\n")
+        print(tabulate(compare(results, saved["results"]),
+                       headers=["Source", "Tokens/sec", "Baseline", "Speedup", "Peak MB", "Baseline MB"],
+                       tablefmt="grid"))
+
+    if args.save:
+        # A Python literal rather than JSON, see lexer/benchmark.py
+        with open(args.save, "w") as f:
+            f.write(pprint.pformat({"corpus": corpus, "results": results}))
+        print(f"\nSaved the results to {args.save}")
+
+
+if __name__ == "__main__":
+    # python -m parser.benchmark --depths 1 16 256 --save baseline.txt, run from the Paw directory
+    main()
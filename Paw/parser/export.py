@@ -0,0 +1,211 @@
+from __future__ import annotations
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from typing import Iterator, TextIO
+from tabulate import tabulate
+from symbol_table.symbol_table import SymbolTable
+from parser.LL1 import Node, StatementNode, StatementListNode, AssignStatementNode, IdentifierNode, \
+    FunctionLiteralNode, ParametersNode, ParameterNode
+from parser.visitor import fields_of, iter_child_slots
+
+# Formats export writes
+JSONL = 'jsonl'
+DOT = 'dot'
+FORMATS = (JSONL, DOT)
+
+# What later statements can point back to, the statements and what declares a name, their ids are kept for
+# the whole export. Those of the other nodes only until the top level statement they are in is written.
+_DECLARATIONS = (StatementNode, StatementListNode, AssignStatementNode, IdentifierNode, FunctionLiteralNode,
+                 ParametersNode, ParameterNode)
+
+_JSON_ESCAPES = {i: f'\\u{i:04x}' for i in range(0x20)}
+_JSON_ESCAPES.update({ord('"'): '\\"', ord('\\'): '\\\\', ord('\n'): '\\n', ord('\r'): '\\r', ord('\t'): '\\t'})
+
+_DOT_ESCAPES = {ord('"'): '\\"', ord('\\'): '\\\\', ord('\n'): '\\n', ord('\r'): '', ord('\t'): ' '}
+
+
+def records(root: Node) -> Iterator[tuple[int | None, int | None, str | None, int | None, Node, int | None]]:
+    """
+    (id, parent id, field, index, node, ref) for every node under root in preorder, ids counting up from 0
+    for root, so the same AST always gets the same ids. field and index say where in the parent the node
+    is held, index None for a node held in the field itself. A node reached again, an identifier's value
+    is the statement that declared it, has id None and the id it was given as ref, its children are not
+    given again.
+
+    The walk keeps an iterator over the children of every open node, the ids of the nodes of the top level
+    statement being walked and those of the statements and declarations, so what it needs grows with the
+    largest statement and by a dict entry per statement and name, not with the number of nodes.
+    """
+    next_id = 0
+    declarations: dict[int, int] = {}
+    nodes: dict[int, int] = {}
+    open_statements = 0
+    # Frames of (id, is it a statement, iterator over its children)
+    stack = [(None, False, iter(((root, None, None),)))]
+    while stack:
+        parent_id, statement, slots = stack[-1]
+        slot = next(slots, None)
+        if slot is None:
+            stack.pop()
+            if statement:
+                open_statements -= 1
+                if not open_statements:
+                    nodes.clear()
+            continue
+        node, field, index = slot
+        statement = isinstance(node, StatementNode)
+        ids = declarations if isinstance(node, _DECLARATIONS) else nodes
+        known = ids.get(id(node))
+        if known is not None:
+            yield None, parent_id, field, index, node, known
+            continue
+        ids[id(node)] = next_id
+        yield next_id, parent_id, field, index, node, None
+        if statement:
+            open_statements += 1
+        stack.append((next_id, statement, iter_child_slots(node)))
+        next_id += 1
+
+
+def attributes(node: Node) -> dict[str, str | int | float | bool]:
+    # The fields of node holding a string, number or bool, what it has besides its children and token
+    values = {}
+    for name in fields_of(type(node)):
+        if name == '_type':
+            continue
+        value = getattr(node, name, None)
+        if isinstance(value, (str, int, float, bool)):
+            values[name] = value
+    return values
+
+
+def json_value(value) -> str:
+    if value is None:
+        return 'null'
+    if value is True or value is False:
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{json_value(str(key))}: {json_value(item)}' for key, item in value.items()) + '}'
+    return '"' + str(value).translate(_JSON_ESCAPES) + '"'
+
+
+def export_jsonl(root: Node, stream: TextIO) -> int:
+    """
+    Writes the AST under root to stream as JSON Lines, a node per line as it is walked (see records):
+
+        {"id": 2, "parent": 1, "field": "value", "index": 0, "kind": "LetStatementNode", "type": "IDENT",
+         "lexeme": "a", "line": 1, "column": 5, "fields": {"name": "a"}}
+
+    A node reached again is a line {"parent": ..., "field": ..., "index": ..., "ref": <its id>}.
+    Returns the number of nodes written.
+    """
+    written = 0
+    write = stream.write
+    for node_id, parent_id, field, index, node, ref in records(root):
+        place = f'"parent": {json_value(parent_id)}, "field": {json_value(field)}, "index": {json_value(index)}'
+        if ref is not None:
+            write(f'{{{place}, "ref": {ref}}}\n')
+            continue
+        token = node.token
+        write(f'{{"id": {node_id}, {place}, "kind": "{type(node).__name__}", '
+              f'"type": {json_value(getattr(node, "_type", None))}, '
+              f'"lexeme": {json_value(getattr(token, "lexeme", None))}, '
+              f'"line": {json_value(getattr(token, "line_position", None))}, '
+              f'"column": {json_value(getattr(token, "column_position", None))}, '
+              f'"fields": {json_value(attributes(node))}}}\n')
+        written += 1
+    return written
+
+
+def export_dot(root: Node, stream: TextIO) -> int:
+    """
+    Writes the AST under root to stream as a Graphviz digraph, a statement per node and per edge as the
+    AST is walked. Nodes are labelled with their class and lexeme, edges with the field and index they
+    are held in, a node reached again gets a dashed edge. Returns the number of nodes written.
+    """
+    written = 0
+    write = stream.write
+    write('digraph AST {\n  node [shape=box, fontname="monospace"];\n')
+    for node_id, parent_id, field, index, node, ref in records(root):
+        target = node_id if ref is None else ref
+        if ref is None:
+            lexeme = getattr(node.token, 'lexeme', None)
+            label = type(node).__name__ if lexeme is None else f'{type(node).__name__}\n{lexeme}'
+            write(f'  n{node_id} [label="{label.translate(_DOT_ESCAPES)}"];\n')
+            written += 1
+        if parent_id is not None:
+            edge = field if index is None else f'{field}[{index}]'
+            style = '' if ref is None else ', style=dashed'
+            write(f'  n{parent_id} -> n{target} [label="{edge.translate(_DOT_ESCAPES)}"{style}];\n')
+    write('}\n')
+    return written
+
+
+def export(root: Node, stream: TextIO, format: str = JSONL) -> int:
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format {format!r}, expected one of {', '.join(FORMATS)}")
+    return export_jsonl(root, stream) if format == JSONL else export_dot(root, stream)
+
+
+def _discard(text: str) -> int:
+    return len(text)
+
+
+def peak_bytes(root: Node, format: str) -> int:
+    # Peak memory exporting root to a stream that keeps nothing
+    sink = io.StringIO()
+    sink.write = _discard
+    tracemalloc.start()
+    try:
+        export(root, sink, format)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    from compiler.compiler import compile_source, CompileOptions
+    from parser.benchmark import generate_source
+
+    arg_parser = argparse.ArgumentParser(description="Export the AST of a source as JSON Lines or Graphviz DOT.")
+    arg_parser.add_argument("source", nargs="?", help="source file, without it generated programs of growing "
+                                                      "size are exported to compare the memory used")
+    arg_parser.add_argument("--format", choices=FORMATS, default=JSONL)
+    arg_parser.add_argument("--output", "-o", help="file to write, standard output without it")
+    arg_parser.add_argument("--statements", type=int, nargs="+", default=[50, 200, 800],
+                            help="statements of the generated programs")
+    args = arg_parser.parse_args()
+
+    options = CompileOptions(engine="pattern", redefinition='shadow')
+    if args.source is not None:
+        with open(args.source, encoding='utf-8') as source_file:
+            result = compile_source(source_file.read(), options, args.source)
+        if result.ast is None:
+            for diagnostic in result.diagnostics:
+                print(diagnostic, file=sys.stderr)
+            sys.exit(1)
+        if args.output is None:
+            export(result.ast, sys.stdout, args.format)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                export(result.ast, output, args.format)
+        return
+
+    rows = []
+    for statements in args.statements:
+        result = compile_source(generate_source(16, statements), options)
+        start_time = time.perf_counter()
+        nodes = export(result.ast, io.StringIO(), args.format)
+        elapsed = time.perf_counter() - start_time
+        rows.append([statements, nodes, f"{elapsed * 1e3:.1f}", peak_bytes(result.ast, args.format)])
+    print(tabulate(rows, headers=["Statements", "Nodes", "Export ms", "Peak bytes"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    # python -m parser.export [source] --format jsonl|dot -o out, run from the Paw directory
+    main()
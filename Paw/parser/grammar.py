@@ -0,0 +1,428 @@
+from __future__ import annotations
+import argparse
+import ast
+import hashlib
+import os
+import pprint
+import tempfile
+from tabulate import tabulate
+from tokens.tokens import TokenKind, kind_names
+
+# Grammar of Monke statements, parsed by the table driven Parser.statement.
+#
+# Nonterminals are CamelCase and terminals are TokenKind names. '@name' is an action: the engine calls
+# Parser.build_name with the values read so far in the production, which builds the node. Actions match
+# the empty string, FIRST/FOLLOW and the parse table do not see them. '&KIND' looks at the current token
+# without consuming it, it matches the empty string in front of a KIND token and counts as KIND for
+# FIRST/FOLLOW. An empty production is ().
+#
+# The value of a production is the return value of its last action. Without actions it is the value of its
+# first nonterminal, or for productions of terminals only the token of the last one.
+START = 'Statement'
+# Braced list of statements, error recovery stops at the closing brace of an open one
+BLOCK = 'Block'
+
+# Nonterminals parsed by Parser methods instead of the table. Expressions are left to the Pratt parser,
+# a table could only express their precedence with a nonterminal per level. Their productions below are
+# still needed so FIRST/FOLLOW and the conflict check know how they start and what may follow them.
+EXTERNAL = {
+    'Expression': 'parse_expression',
+    'PlainExpression': 'parse_expression',
+    'ExpressionAfterIdent': 'parse_expression_after_ident',
+    'Arguments': 'parse_arguments',
+}
+
+GRAMMAR: dict[str, tuple[tuple[str, ...], ...]] = {
+    'Statement': (
+        ('LET', 'IDENT', 'LetTail', 'End'),
+        # a = 1; or an expression starting with an identifier, a call or a context access
+        ('IDENT', 'IdentTail', 'End'),
+        ('PlainExpression', '@expression_statement', 'End'),
+        ('PRINT', 'Arguments', '@print_statement', 'End'),
+        ('CLOCK', 'DOT', 'ClockFunction', 'LPAREN', 'RPAREN', '@clock_statement', 'End'),
+        ('CONTEXT', 'IDENT', '@enter_context', 'Block', '@exit_context', 'End'),
+        ('@enter_context', 'Block', '@exit_context', 'End'),
+        ('RETURN', 'Expression', '@return_statement', 'End'),
+        ('FUNCTION', 'IDENT', 'LPAREN', 'Parameters', 'RPAREN', '@enter_function', 'Block', '@function_statement',
+         'End'),
+        ('IF', 'Condition', 'Block', 'ElseTail', '@if_statement', 'End'),
+    ),
+    'LetTail': (
+        ('ASSIGN', 'Expression', '@let_statement'),
+        ('VarList', '@var_declaration'),
+    ),
+    'VarList': (
+        ('COMMA', 'IDENT', 'VarList', '@cons'),
+        ('@empty',),
+    ),
+    'IdentTail': (
+        ('ASSIGN', 'Expression', '@assign_statement'),
+        ('ExpressionAfterIdent', '@expression_statement'),
+    ),
+    'ClockFunction': (
+        ('CLOCK',),
+        ('IDENT',),
+    ),
+    'Parameters': (
+        ('IDENT', 'MoreParameters', '@cons'),
+        ('@empty',),
+    ),
+    'MoreParameters': (
+        ('COMMA', 'IDENT', 'MoreParameters', '@cons'),
+        ('@empty',),
+    ),
+    'Block': (
+        ('LBRACE', 'Statements', 'RBRACE', '@block'),
+    ),
+    'Statements': (
+        ('Statement', 'Statements', '@cons'),
+        ('@empty',),
+    ),
+    'Condition': (
+        ('LPAREN', 'Expression', 'RPAREN', '@condition'),
+    ),
+    'ElseTail': (
+        ('ELSE', 'ElseBranch'),
+        (),
+    ),
+    'ElseBranch': (
+        ('IF', 'Condition', 'Block', 'ElseTail', '@else_if'),
+        ('Block', '@else_block'),
+    ),
+    # Statements end in a semicolon, any semicolons after it are empty statements: let a, b;;
+    # The last statement of a block may leave it out: { let d = 20 };
+    'End': (
+        ('SEMICOLON', 'Semicolons'),
+        ('&RBRACE',),
+    ),
+    'Semicolons': (
+        ('SEMICOLON', 'Semicolons'),
+        (),
+    ),
+
+    # Expressions, see EXTERNAL
+    'Expression': (
+        ('Unary', 'InfixTail'),
+    ),
+    # An expression statement that does not start with an identifier, those are told apart from
+    # assignments after the identifier (IdentTail)
+    'PlainExpression': (
+        ('MINUS', 'Unary', 'InfixTail'),
+        ('BANG', 'Unary', 'InfixTail'),
+        ('Literal', 'InfixTail'),
+        ('LPAREN', 'Expression', 'RPAREN', 'InfixTail'),
+    ),
+    'ExpressionAfterIdent': (
+        ('IdentSuffix', 'InfixTail'),
+    ),
+    'Unary': (
+        ('MINUS', 'Unary'),
+        ('BANG', 'Unary'),
+        ('Primary',),
+    ),
+    'Primary': (
+        ('Literal',),
+        ('LPAREN', 'Expression', 'RPAREN'),
+        ('IDENT', 'IdentSuffix'),
+    ),
+    'Literal': (
+        ('INT',), ('FLOAT',), ('STR',), ('BOOL',), ('TRUE',), ('FALSE',),
+    ),
+    'IdentSuffix': (
+        ('Arguments',),
+        ('DOUBLE_COLON', 'IDENT', 'CallSuffix'),
+        (),
+    ),
+    'CallSuffix': (
+        ('Arguments',),
+        (),
+    ),
+    'InfixTail': (
+        ('InfixOperator', 'Unary', 'InfixTail'),
+        (),
+    ),
+    'InfixOperator': (
+        ('PLUS',), ('MINUS',), ('ASTERISK',), ('SLASH',),
+        ('LT',), ('LT_EQ',), ('GT',), ('GT_EQ',), ('EQ',), ('NOT_EQ',),
+    ),
+    'Arguments': (
+        ('LPAREN', 'ArgumentList', 'RPAREN'),
+    ),
+    'ArgumentList': (
+        ('Expression', 'MoreArguments'),
+        (),
+    ),
+    'MoreArguments': (
+        ('COMMA', 'Expression', 'MoreArguments'),
+        (),
+    ),
+}
+
+# Marks the end of the input in FOLLOW sets
+END_OF_INPUT = TokenKind.EOF.name
+
+# Bump when the layout of the cached table changes
+TABLE_FORMAT = 1
+
+# Kinds of the steps of a compiled production, see compile_production
+TERMINAL, NONTERMINAL, CALL, ACTION, LOOKAHEAD = range(5)
+
+
+class GrammarError(Exception):
+    """
+    The grammar is malformed or not LL(1). Raised when the parse table is built, with every problem found.
+    """
+
+    def __init__(self, problems: list[str]):
+        super().__init__("\n".join(problems))
+        self.problems = problems
+
+
+def is_action(symbol: str) -> bool:
+    return symbol.startswith('@')
+
+
+def is_lookahead(symbol: str) -> bool:
+    return symbol.startswith('&')
+
+
+def is_terminal(symbol: str) -> bool:
+    # Lookaheads included, see terminal_name
+    return symbol not in GRAMMAR and not is_action(symbol)
+
+
+def terminal_name(symbol: str) -> str:
+    # The token kind a terminal or lookahead stands for
+    return symbol[1:] if is_lookahead(symbol) else symbol
+
+
+def check_grammar():
+    problems = []
+    if START not in GRAMMAR:
+        problems.append(f"The start symbol {START} has no productions")
+    for nonterminal in EXTERNAL:
+        if nonterminal not in GRAMMAR:
+            problems.append(f"The external nonterminal {nonterminal} has no productions")
+    for nonterminal, productions in GRAMMAR.items():
+        for production in productions:
+            for symbol in production:
+                if is_terminal(symbol) and terminal_name(symbol) not in TokenKind.__members__:
+                    problems.append(f"{nonterminal} -> {' '.join(production)}: '{symbol}' is neither "
+                                    f"a nonterminal nor a token kind")
+    if problems:
+        raise GrammarError(problems)
+
+
+def first_of(symbols: tuple[str, ...], first: dict[str, set[str]], nullable: set[str]) -> tuple[set[str], bool]:
+    """
+    FIRST of a sequence of symbols, and whether the whole sequence can match the empty string.
+    """
+    result = set()
+    for symbol in symbols:
+        if is_action(symbol):
+            continue
+        if is_terminal(symbol):
+            result.add(terminal_name(symbol))
+            return result, False
+        result |= first[symbol]
+        if symbol not in nullable:
+            return result, False
+    return result, True
+
+
+def first_sets() -> tuple[dict[str, set[str]], set[str]]:
+    """
+    FIRST of every nonterminal and the set of nullable nonterminals, iterated to a fixed point.
+    """
+    first: dict[str, set[str]] = {nonterminal: set() for nonterminal in GRAMMAR}
+    nullable: set[str] = set()
+    changed = True
+    while changed:
+        changed = False
+        for nonterminal, productions in GRAMMAR.items():
+            for production in productions:
+                symbols, empty = first_of(production, first, nullable)
+                if not symbols <= first[nonterminal]:
+                    first[nonterminal] |= symbols
+                    changed = True
+                if empty and nonterminal not in nullable:
+                    nullable.add(nonterminal)
+                    changed = True
+    return first, nullable
+
+
+def follow_sets(first: dict[str, set[str]], nullable: set[str]) -> dict[str, set[str]]:
+    follow: dict[str, set[str]] = {nonterminal: set() for nonterminal in GRAMMAR}
+    follow[START].add(END_OF_INPUT)
+    changed = True
+    while changed:
+        changed = False
+        for nonterminal, productions in GRAMMAR.items():
+            for production in productions:
+                for position, symbol in enumerate(production):
+                    if symbol not in GRAMMAR:
+                        continue
+                    symbols, empty = first_of(production[position + 1:], first, nullable)
+                    if empty:
+                        symbols = symbols | follow[nonterminal]
+                    if not symbols <= follow[symbol]:
+                        follow[symbol] |= symbols
+                        changed = True
+    return follow
+
+
+def build_table() -> dict[tuple[str, str], int]:
+    """
+    The LL(1) parse table: (nonterminal, terminal) mapped to the index of the production of the nonterminal
+    to expand. Raises GrammarError listing every conflict, i.e. every pair two productions claim.
+    """
+    check_grammar()
+    first, nullable = first_sets()
+    follow = follow_sets(first, nullable)
+    table: dict[tuple[str, str], int] = {}
+    conflicts = []
+    for nonterminal, productions in GRAMMAR.items():
+        for index, production in enumerate(productions):
+            terminals, empty = first_of(production, first, nullable)
+            if empty:
+                terminals = terminals | follow[nonterminal]
+            for terminal in sorted(terminals):
+                claimed = table.setdefault((nonterminal, terminal), index)
+                if claimed != index:
+                    conflicts.append(f"{nonterminal} on {terminal}: "
+                                     f"{nonterminal} -> {' '.join(productions[claimed]) or 'ε'} and "
+                                     f"{nonterminal} -> {' '.join(production) or 'ε'}")
+    if conflicts:
+        raise GrammarError(conflicts)
+    return table
+
+
+def grammar_key() -> str:
+    digest = hashlib.sha256(repr((TABLE_FORMAT, START, EXTERNAL, GRAMMAR)).encode())
+    return digest.hexdigest()
+
+
+def default_table_path() -> str:
+    return os.environ.get("MONKE_PARSE_TABLE") or os.path.join(os.path.expanduser("~"), ".cache", "monkepaw",
+                                                                 "parse_table.txt")
+
+
+def cached_table(path: str | None = None) -> dict[tuple[str, str], int]:
+    """
+    build_table, cached in path (default ~/.cache/monkepaw/parse_table.txt or $MONKE_PARSE_TABLE). The cache
+    is keyed by a hash of the grammar, so editing the grammar rebuilds the table and reports its conflicts.
+    """
+    path = path or default_table_path()
+    key = grammar_key()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            # A Python literal rather than JSON, the json package of this repo shadows the standard library one
+            saved = ast.literal_eval(f.read())
+        if isinstance(saved, dict) and saved.get('key') == key:
+            return saved['table']
+    except (OSError, ValueError, SyntaxError, KeyError):
+        pass
+
+    table = build_table()
+    # The cache is only an optimization, a cache that cannot be written to is skipped
+    try:
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    except OSError:
+        return table
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(pprint.pformat({'key': key, 'table': table}))
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    return table
+
+
+def compile_production(production: tuple[str, ...]) -> tuple[tuple[tuple[int, object], ...], int | None]:
+    """
+    The steps the engine runs for a production and the index of the step whose value is the production's:
+        (TERMINAL, TokenKind)      match and consume the token
+        (NONTERMINAL, name)        expand the nonterminal
+        (CALL, method name)        parse an external nonterminal with its Parser method
+        (ACTION, method name)      call the Parser method build_<action>
+        (LOOKAHEAD, TokenKind)     check the token without consuming it
+    """
+    steps = []
+    for symbol in production:
+        if is_action(symbol):
+            steps.append((ACTION, 'build_' + symbol[1:]))
+        elif symbol in EXTERNAL:
+            steps.append((CALL, EXTERNAL[symbol]))
+        elif symbol in GRAMMAR:
+            steps.append((NONTERMINAL, symbol))
+        elif is_lookahead(symbol):
+            steps.append((LOOKAHEAD, TokenKind[terminal_name(symbol)]))
+        else:
+            steps.append((TERMINAL, TokenKind[symbol]))
+    actions = [index for index, symbol in enumerate(production) if is_action(symbol)]
+    nonterminals = [index for index, symbol in enumerate(production) if symbol in GRAMMAR]
+    if actions:
+        result = actions[-1]
+    elif nonterminals:
+        result = nonterminals[0]
+    else:
+        result = len(production) - 1 if production else None
+    return tuple(steps), result
+
+
+def load_table(path: str | None = None) -> dict[tuple[str, TokenKind], tuple]:
+    """
+    The cached parse table compiled for the engine: (nonterminal, TokenKind) mapped to compiled productions.
+    """
+    compiled = {(nonterminal, index): compile_production(GRAMMAR[nonterminal][index])
+                for nonterminal, productions in GRAMMAR.items() for index in range(len(productions))}
+    return {(nonterminal, TokenKind[terminal]): compiled[nonterminal, index]
+            for (nonterminal, terminal), index in cached_table(path).items()}
+
+
+def expected_terminals(table: dict[tuple[str, TokenKind], tuple]) -> dict[str, list[str]]:
+    """
+    The token types each nonterminal can start with, for error messages. Tokens a production only looks at
+    are left out, a statement is still told it misses its ';' and not that a '}' would do.
+    """
+    expected: dict[str, list[str]] = {}
+    for (nonterminal, kind), (steps, _) in sorted(table.items()):
+        if steps and steps[0][0] == LOOKAHEAD:
+            continue
+        expected.setdefault(nonterminal, []).append(kind_names.get(kind, kind.name))
+    return expected
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Build the parse table of the Monke grammar and show it.")
+    arg_parser.add_argument("--nonterminal", nargs="+", help="only show these nonterminals")
+    args = arg_parser.parse_args()
+
+    try:
+        table = build_table()
+    except GrammarError as e:
+        print(f"The grammar is not LL(1), {len(e.problems)} problems:\n")
+        for problem in e.problems:
+            print(f"  {problem}")
+        raise SystemExit(1)
+
+    first, nullable = first_sets()
+    follow = follow_sets(first, nullable)
+    shown = args.nonterminal or list(GRAMMAR)
+    print(tabulate([[nonterminal, ' '.join(sorted(first[nonterminal])), 'yes' if nonterminal in nullable else '',
+                     ' '.join(sorted(follow[nonterminal]))] for nonterminal in shown],
+                   headers=["Nonterminal", "FIRST", "Nullable", "FOLLOW"], tablefmt="grid"))
+    print()
+    print(tabulate([[nonterminal, terminal, ' '.join(GRAMMAR[nonterminal][index]) or 'ε']
+                    for (nonterminal, terminal), index in sorted(table.items()) if nonterminal in shown],
+                   headers=["Nonterminal", "Token", "Production"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    # python -m parser.grammar, run from the Paw directory
+    main()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from collections import deque
-from typing import Deque, List
+from typing import Any, Deque, List, Sequence
+from tracing.tracing import trace
 from .LL1 import Node, ProgramNode, LetStatementNode, StatementListNode, ExpressionStatementNode, IfStatementNode, \
     IfConditionNode, AssignStatementNode, IdentifierNode, FunctionLiteralNode, CallExpressionNode, ArgumentsListNode, ParametersNode, \
     ParameterNode, PrintStatementNode, InfixOperatorNode, PrefixOperatorNode, GroupedExpressionNode, CustomContextNode,  \
@@ -8,59 +9,85 @@ from .LL1 import Node, ProgramNode, LetStatementNode, StatementListNode, Express
 
 
 class Tree:
+    """
+    A node of the tree show_ast draws. Its children are made on first access, by get_children or nodes,
+    so drawing the top levels of a large program costs what is drawn and not the whole program.
+    depth counts the levels from the root of the tree.
+    """
+
     def __init__(self,
                  node: Node | deque[Node] | ProgramNode | str | int | float | bool,
                  parent: Tree | None = None):
 
         self.node = node
-        if isinstance(self.node, Node):
-            self.name = f'{self.node}'
-        else:
-            self.name = f'{str(self.node)}'
-
         self.parent: Tree | None = parent
-        self.nodes = self.populate_children()
+        self.depth: int = parent.depth + 1 if parent is not None else 0
+        self._nodes: Deque[Tree] | None = None
+        self._populated = False
 
-        print(f"\nI am at node :-> {self.node}\n")
-        print(f"\nSELF.NODES {self.nodes}\n")
-        if isinstance(self.node, str):
-            print(f"\nTREE NODE VALUE {self.node}\n")
-        elif isinstance(self.node, Node):
-            print(f"\nTREE NODE VALUE {self.node.value}\n")
-        elif isinstance(self.node, deque):
-            print(f"\nTREE NODE VALUE {self.node}\n")
+    @property
+    def name(self) -> str:
+        # The str of a node renders everything under it, only made when asked for
+        return f'{self.node}' if isinstance(self.node, Node) else f'{str(self.node)}'
+
+    @property
+    def nodes(self) -> Deque[Tree] | None:
+        if not self._populated:
+            self._populated = True
+            self._nodes = self.populate_children()
+            if trace.ast:
+                trace.ast("I am at node :-> %s", self.node)
+                trace.ast("SELF.NODES %s", self._nodes)
+                if isinstance(self.node, str):
+                    trace.ast("TREE NODE VALUE %s", self.node)
+                elif isinstance(self.node, Node):
+                    trace.ast("TREE NODE VALUE %s", self.node.value)
+                elif isinstance(self.node, deque):
+                    trace.ast("TREE NODE VALUE %s", self.node)
+        return self._nodes
+
+    def find(self, path: Sequence[int]) -> Tree:
+        """
+        The tree at path, indexes of children from this tree down. IndexError when there is no such child.
+        """
+        tree = self
+        for step, index in enumerate(path):
+            children = tree.get_children() or ()
+            if not 0 <= index < len(children):
+                at = '.'.join(str(i) for i in path[:step]) or 'the root'
+                raise IndexError(f"No child {index} at {at}, it has {len(children)}")
+            tree = children[index]
+        return tree
 
     def populate_children(self):
         """
         This custom function helps to customize how each node is represented
         within the tree. The type of node heavily dictates the structure of the tree.
         """
-        if isinstance(self.node, Node):
-            print(f"\nI am at node :-> {self.node}\n"
-                  f"\nNODE VALUE {self.node.value}\n")
-        else:
-            print(f"\nELSE BLOCK\n"
-                  f"I am at tree :-> {self.node}\n"
-                  "\nTREE VALUE {self.node.value}\n")
+        if trace.ast:
+            if isinstance(self.node, Node):
+                trace.ast("I am at node :-> %s NODE VALUE %s", self.node, self.node.value)
+            else:
+                trace.ast("ELSE BLOCK I am at tree :-> %s", self.node)
 
         if isinstance(self.node, ProgramNode):
             # Create a copy of the deque to avoid mutation during iteration
             prog_stmts: StatementListNode = self.node.value
-            self.nodes: Deque = deque([])
+            nodes: Deque = deque([])
             children_nodes = iter(prog_stmts.statements)
             try:
                 child_node = next(children_nodes)
                 while True:
                     child_tree = Tree(child_node, self)
-                    self.nodes.append(child_tree)
+                    nodes.append(child_tree)
                     child_node = next(iter(children_nodes))
             except StopIteration as e:
-                print(f"\nReached end! {child_node}\n{e}\n")
-            return self.nodes
+                if trace.ast:
+                    trace.ast("Reached end! %s %s", child_node, e)
+            return nodes
         elif isinstance(self.node, LetStatementNode):
-            if isinstance(self.node.value, (InfixOperatorNode, ExpressionStatementNode,
-                                            GroupedExpressionNode, LetStatementNode,
-                                            IntegerLiteralNode)):
+            # Any expression node, var declarations hold a deque of identifiers instead
+            if isinstance(self.node.value, Node):
                 node_tree = Tree(self.node.value, self)
                 child_tree = deque([node_tree])
                 return child_tree
@@ -73,8 +100,8 @@ class Tree:
                 for child_node in self.node.value:
                     child_tree = Tree(child_node, self)
                     children_trees.append(child_tree)
-                print("\nCHILDREN TREES\n"
-                      f"{children_trees}\n")
+                if trace.ast:
+                    trace.ast("CHILDREN TREES %s", children_trees)
                 return children_trees
         elif isinstance(self.node, (AssignStatementNode, InfixOperatorNode, PrefixOperatorNode)):
             operator = Tree(self.node.operator, self)
@@ -106,7 +133,8 @@ class Tree:
             return statement_tree
 
         elif isinstance(self.node, str):
-            print(f'\nHERE IS THE node {self.node}\n')
+            if trace.ast:
+                trace.ast("HERE IS THE node %s", self.node)
             try:
                 if self.parent and isinstance(self.parent.node, (AssignStatementNode, InfixOperatorNode)):
                     left = Tree(self.parent.node.left, self)
@@ -121,7 +149,8 @@ class Tree:
                     return deque([])
 
             except UnboundLocalError:
-                print("\nABOUT TO BREAK\n")
+                if trace.ast:
+                    trace.ast("ABOUT TO BREAK")
                 breakpoint()
 
         elif isinstance(self.node, PrintStatementNode):
@@ -164,7 +193,8 @@ class Tree:
                 return f'{self.node.value}'
 
         elif isinstance(self.node, ExpressionStatementNode):
-            print(f'EXPR NODE: {type(self.node.expression)}')
+            if trace.ast:
+                trace.ast("EXPR NODE: %s", type(self.node.expression))
             if isinstance(self.node.expression, IntegerLiteralNode):
                 return f'{self.node.expression.token.type}: {self.node.expression.value}'
             elif isinstance(self.node.expression, InfixOperatorNode):
@@ -181,9 +211,8 @@ class Tree:
         elif isinstance(self.node, IdentifierNode):
             return f'{self.node.token.type}: {self.node.token.lexeme}'
         elif isinstance(self.node, IntegerLiteralNode):
-            print(f"\nBROKE HERE "
-                  f"\n{self.node}"
-                  f"\ntype {type(self.node)}")
+            if trace.ast:
+                trace.ast("BROKE HERE %s type %s", self.node, type(self.node))
             return f'{self.node._type}: {self.node.value}'
         elif isinstance(self.node, InfixOperatorNode):
             return f'INFIX EXPR: {self.node.left.name} {self.node.operator} {self.node.right.name}'
@@ -221,23 +250,21 @@ class Tree:
                         string += f'{len(node)} inner stmts, '
                 except StopIteration:
                     temp = string.split(', ')
-                    print(temp)
+                    if trace.ast:
+                        trace.ast("Value parts %s", temp)
                     if len(temp) < 3:
                         string = temp[0]
                     else:
                         string = ','.join(i for i in temp)
                     string += ')'
                     break
-            print('\n')
-            print(f'{self.node}\n')
-            print(f'{self.nodes}\n'
-                  f'\n{temp}\n')
-            print(f'{string}')
-            print('\nBREAK')
+            if trace.ast:
+                trace.ast("Value of %s with children %s from %s is %s", self.node, self.nodes, temp, string)
             return string
 
         else:
-            print(self.node)
+            if trace.ast:
+                trace.ast("Value of %s", self.node)
             return f'{self.node}'
 
     def add_child(self, child):
@@ -285,16 +312,14 @@ def gen_tree(tree: Tree):
     while True:
         try:
             node: Tree = next(prog_stmts)
+            if not trace.ast:
+                continue
             if isinstance(node, Tree):
-                print(f"\n*GEN TREE STARTS*\n"
-                      f"\nI am at a tree node: -> {node}\n" 
-                      "\nNODE.NODES check children of current tree node"
-                      f" {node.nodes}\n"
-                      f"\nOVERALL TREE.NODES {tree.nodes}\n"
-                      )
+                trace.ast("*GEN TREE STARTS* I am at a tree node: -> %s "
+                          "NODE.NODES check children of current tree node %s OVERALL TREE.NODES %s",
+                          node, node.nodes, tree.nodes)
             else:
-                print(f"\nALTERNATIVE {node}\n")
-                continue
+                trace.ast("ALTERNATIVE %s", node)
         except StopIteration:
             break
     return tree
@@ -1,17 +1,70 @@
+from __future__ import annotations
 from tokens.tokens import Token
 
+# Diagnostic severities
+ERROR = 'error'
+WARNING = 'warning'
+
+# Compiler stages a diagnostic can come from
+LEX = 'lex'
+PARSE = 'parse'
+SYMBOLS = 'symbols'
+
 
 class ParseError:
     def __init__(self,
                  token: Token,
                  message: str
                  ):
+        self.token = token
+        self.reason = message
+        # Tokens the parser makes up itself have no column
+        column = f", column {token.column_position}" if token.column_position is not None else ""
         self.error_info = f"Unexpected token {token} with lexeme '{token.lexeme}' at position {token.begin_position} " \
-                          f"on line {token.line_position}."
+                          f"on line {token.line_position}{column}."
         self.message = ''.join(info + '\n' for info in [message, self.error_info])
 
     def __str__(self):
         return self.error_info
 
     def __repr__(self):
-        return self.message
\ No newline at end of file
+        return self.message
+
+
+class Diagnostic:
+    """
+    An error or warning about the compiled source, reported by the stage (lex, parse or symbols)
+    that found it instead of being printed or asked about.
+    """
+
+    def __init__(self,
+                 severity: str,
+                 message: str,
+                 token: Token | None = None,
+                 stage: str | None = None
+                 ):
+        self.severity = severity
+        self.message = message
+        self.token = token
+        self.stage = stage
+
+    @classmethod
+    def from_parse_error(cls, error: ParseError) -> Diagnostic:
+        return cls(ERROR, error.message.strip(), error.token, PARSE)
+
+    @property
+    def line(self) -> int | None:
+        return self.token.line_position if self.token is not None else None
+
+    @property
+    def column(self) -> int | None:
+        return self.token.column_position if self.token is not None else None
+
+    def __str__(self):
+        location = ""
+        if self.line is not None:
+            location = f" (line {self.line}" + (f", column {self.column})" if self.column is not None else ")")
+        return f"{self.severity}: {self.message}{location}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.severity!r}, {self.message!r}, stage={self.stage!r})"
@@ -1,95 +1,147 @@
 import sys
-import time
 from collections import deque
-from typing import Iterator
+from typing import Iterable, Iterator, Sequence, TextIO
 from PrettyPrint import PrettyPrintTree
 from symbol_table.symbol_table import SymbolTable
 from symbol_table.symbol_table import Symbol
+from tokens.token_cursor import TokenCursor
+from tracing.tracing import trace
 
 from .LL1 import *
+from .grammar import START, BLOCK, TERMINAL, NONTERMINAL, CALL, ACTION, LOOKAHEAD, load_table, expected_terminals
 from .p_err import ParseError
 from .p_ast import *
+from .export import export, JSONL
 
 sys.path.append("..")
-# Initialize the global symbol table
-symbol_table = SymbolTable()
+
+# Left and right binding power of the infix operators handled by Parser.parse_expression. The higher the
+# power the tighter the operator binds, a right power above the left one makes the operator left-associative.
+INFIX_BINDING_POWER = {
+    TokenKind.EQ: (10, 11), TokenKind.NOT_EQ: (10, 11),
+    TokenKind.LT: (20, 21), TokenKind.LT_EQ: (20, 21), TokenKind.GT: (20, 21), TokenKind.GT_EQ: (20, 21),
+    TokenKind.PLUS: (30, 31), TokenKind.MINUS: (30, 31),
+    TokenKind.ASTERISK: (40, 41), TokenKind.SLASH: (40, 41),
+}
+
+# Binding power of the operand of a prefix operator, so -a * b is (-a) * b
+PREFIX_BINDING_POWER = 50
+
+# LL(1) table of the statement grammar (parser/grammar.py), built once and cached on disk.
+# A grammar that is not LL(1) fails here, on import, with every conflict listed.
+PARSE_TABLE = load_table()
+EXPECTED = expected_terminals(PARSE_TABLE)
+
+# Parser methods the table calls, for external nonterminals and actions
+HANDLER_NAMES = sorted({name for steps, _ in PARSE_TABLE.values() for kind, name in steps
+                        if kind in (CALL, ACTION)})
 
 
 class Parser:
-    def __init__(self, token_stream: deque):
-        self.token_stream: Iterator = iter(token_stream)
-        self.current_token: Token | None = None
-        self.next_token: Token | None = next(self.token_stream)
-        self.symbol_table: SymbolTable | Dict = symbol_table
-
-        # Critical Section flags for each construct as required
-        self.function_flag = None
-        self.call_flag: bool | None = None
-        self.print_flag: bool | None = None
-        self.expression_flag: bool | None = None
-        self.if_parse_flag: bool = False
-        self.else_if_flag: bool = False
-        self.else_flag: bool = False
-        self.var_declaration_flag: bool = False
-        self.operator_lookup_flag: bool = False
-        self.context_access_flag: bool = False
-        self.args_flag: bool = False
-
-        self.critical_flags = [self.call_flag,
-                               self.expression_flag,
-                               self.if_parse_flag,
-                               self.else_if_flag,
-                               self.else_flag,
-                               self.var_declaration_flag,
-                               self.operator_lookup_flag,
-                               self.context_access_flag,
-                               self.args_flag,
-                               self.print_flag,
-                               ]
+    def __init__(self, token_stream: Iterable[Token], symbol_table: SymbolTable | None = None, verbose: bool = True,
+                 statement_cache=None):
+        # Any iterable of tokens works, including a Lexer built with keep_tokens=False
+        self.tokens = TokenCursor(token_stream)
+        self.current_token: Token = self.tokens.current
+        # Bound once, it runs for every token. Where the kind of the current token has been checked
+        # already the hot paths call it directly instead of going through _consume.
+        self._advance = self.tokens.advance
+        # Every parse gets its own global symbol table unless one is handed in
+        self.symbol_table: SymbolTable | Dict = symbol_table if symbol_table is not None else SymbolTable()
+        # Print the status report when parse is done, compile_source turns it off
+        self.verbose = verbose
+        # Frames of the statement being parsed, see statement
+        self.frames: list[list] = []
+        # Statements of an earlier parse to reuse instead of parsing them again, see compiler/incremental.py
+        self.statement_cache = statement_cache
+        self.handlers = {name: getattr(self, name) for name in HANDLER_NAMES}
 
         self.pst: deque[Node] | None = None
         self.errors: deque[ParseError] = deque([])
-        self._consume()
 
-    def show_ast(self):
-        pt = PrettyPrintTree(lambda x: x.get_children(),
-                             lambda x: x.get_val(),
-                             orientation=PrettyPrintTree.Vertical
-                             )
+    def show_ast(self, max_depth: int | None = None, path: Sequence[int] = ()):
+        """
+        Draws the tree at path, indexes of children from the program down, and at most max_depth levels
+        under it. Only the drawn part of the tree is built, a node with more below it than is drawn ends
+        in '...'.
+        """
         program_symbol, error = self.symbol_table.lookup('PROGRAM')
         program_node: ProgramNode = program_symbol.node
-        pst = Tree(program_node)
+        pst = Tree(program_node).find(path)
+
+        def cut(tree: Tree) -> bool:
+            return max_depth is not None and tree.depth - pst.depth >= max_depth
+
+        pt = PrettyPrintTree(lambda x: [] if cut(x) else x.get_children(),
+                             lambda x: f'{x.get_val()} ...' if cut(x) and x.get_children() else x.get_val(),
+                             orientation=PrettyPrintTree.Vertical
+                             )
         print('\nDone generating tree...\n')
         return pt(pst)
 
+    def export_ast(self, stream: TextIO, format: str = JSONL) -> int:
+        """
+        Writes the AST to stream as JSON Lines or Graphviz DOT as it is walked, see parser/export.py.
+        Returns the number of nodes written.
+        """
+        program_symbol, error = self.symbol_table.lookup('PROGRAM')
+        return export(program_symbol.node, stream, format)
+
+    @property
+    def next_token(self) -> Token:
+        return self.tokens.peek()
+
     def _consume(self, expected_type: str | None = None):
-        try:
-            if expected_type:
-                assert (self.current_token.type == expected_type)
-                self.current_token = self.next_token
-                self.next_token = next(self.token_stream)
-            else:
-                self.current_token = self.next_token
-                self.next_token = next(self.token_stream)
-        except (AssertionError, StopIteration) as e:
-            if isinstance(e, AssertionError):
-                print(f'\nSaved error {str(e)}\n')
-                print(f'\n{expected_type}\n')
-                self._error(message=str(e))
-            self.next_token: bool = False
-
-    def parse(self) -> Deque:
+        if expected_type is not None and self.current_token.type != expected_type:
+            if trace.parser:
+                trace.parser("Saved error, expected %s", expected_type)
+            self._error(message=f"Expected '{expected_type}', found '{self.current_token.lexeme}'")
+            return
+        self.current_token = self._advance()
+
+    def _made_from(self, token: Token, source: Token) -> Token:
+        # A token the parser made up at the position of source. The symbol table's journal records it, a
+        # statement cache moves it along with source when it reuses the statement.
+        journal = self.symbol_table.journal
+        if journal is not None:
+            journal.append(('move', token, source))
+        return token
+
+    def mark(self) -> int:
+        # Where to come back to after trying a parse that may not work out, see reset
+        return self.tokens.mark()
+
+    def reset(self, mark: int):
+        self.current_token = self.tokens.reset(mark)
+
+    def parse(self, release: bool = False) -> Deque:
         """
             This function works is triggered when the parse tree is initialized the token stream consumption.
             The function takes an initial statement and parses up till it reaches
             1. the statement node to ensure that it starts parsing a new line
             2. the program node to ensure that it has parsed the first statement then the entire program
+            With release the tokens of each statement are forgotten once it is parsed (see statements).
         """
-        # Begin consuming the tokens from the beginning
-        if not self.current_token:
-            self._consume()
+        for _ in self.statements(release=release):
+            pass
+
+        if self.verbose:
+            self.report()
 
+        return self.pst
+
+    def statements(self, keep: bool = True, release: bool | None = None) -> Iterator[Node]:
+        """
+        Parses the program a top level statement at a time and yields every statement as soon as it is
+        parsed, tokens are pulled from the stream only as far as that statement needs. With keep the
+        statements are collected in the program's statement list as parse does, without it the parser holds
+        on to none of them and forgets the tokens of each (see TokenCursor.release), what is left of a
+        statement once its consumer lets go is what the symbol tables refer to. A statement_cache refers to
+        tokens by position, with one they are kept. release forgets the tokens while keeping the statements,
+        it defaults to not keep.
+        """
         pst = deque([])
+        self.pst = pst
 
         # Don't enter a new context here
         stmt_list_node = StatementListNode(Token('GLOBAL_STATEMENTS', 'MONKE_GLOBAL_STATEMENTS',
@@ -104,21 +156,25 @@ class Parser:
         program_symbol = Symbol(program_node, 0)
         self.symbol_table.define('PROGRAM', program_symbol)
 
-        print(f'\nInitializing Parser...\nWorking from => {self.current_token} then {self.next_token}\n')
-        time.sleep(5)
-        print(f"\n{pst}\n")
-
-        while self.current_token and self.current_token.type != EOF:
-            if self.current_token.lexeme == EOF:
-                break
+        if trace.parser:
+            trace.parser("Initializing Parser... Working from => %s then %s", self.current_token, self.next_token)
+            trace.parser("Statements %s", pst)
 
+        if release is None:
+            release = not keep
+        release = release and self.statement_cache is None
+        while self.current_token.kind != TokenKind.EOF:
             stmt = self.statement()
+            if release:
+                self.tokens.release()
             if stmt is not None:
-                print("\nRETURNED THIS STMT\n"
-                      f"**\n{stmt}\n**")
-                pst.append(stmt)
-            self.pst = pst
+                if trace.parser:
+                    trace.parser("RETURNED THIS STMT ** %s **", stmt)
+                if keep:
+                    pst.append(stmt)
+                yield stmt
 
+    def report(self):
         print("\nPARSE COMPLETED\n")
         if self.errors:
             print("\nSTATUS: ❌ You have some errors you should attend to!\n")
@@ -130,111 +186,141 @@ class Parser:
                   "\nYou can now evaluate ("
                   "Run Semantic Analysis on) the Parse Tree to create an Abstract Syntax Tree\n")
 
-        return pst
-
     def statement(self):
-        print(f'\n------------------------------------------------------------------------------'
-              f'\nParsing {self.current_token}\n'
-              f'Next is {self.next_token}\n'
-              f'\nSTATEMENTS AND SYMBOL TABLE\n'
-              f'\n{self.symbol_table}\n'
-              f'\n{self.pst}\n')
-        if self.current_token.type == LET and self.next_token.type == IDENT:  # type: ignore
-            self._consume(LET)
-            if self.next_token.type == ASSIGN:
-                return self.let_statement()
-            elif self.next_token.type in [COMMA, SEMICOLON]:
-                return self.var_declaration()
-            else:
-                self._error()
-
-        elif self.current_token.type == IF:
-            return self.if_statement()
-
-        elif self.current_token.type == PRINT:
-            return self.print_statement()
-
-        elif self.current_token.type == CLOCK:
-            return self.clock_statement()
+        """
+        Parses one statement with the LL(1) table of parser/grammar.py. A nonterminal is expanded with a single
+        lookup of (nonterminal, kind of the current token), terminals are matched and consumed, external
+        nonterminals are parsed by their Parser methods and actions build the nodes from the values read.
 
-        elif self.current_token.type in (CONTEXT, LBRACE):  # Left curly brace (new context)
-            context_name = None
-            context_token = None
+        Every frame on the stack is [nonterminal, steps, values, result index, symbol table on entry, cache
+        entry], values holds the value of each step run so far. Returns the statement node, None after a
+        syntax error, the parser has then recovered to the next statement.
 
-            if self.current_token.type == CONTEXT:
-                self._consume(CONTEXT)
-                context_token = self.current_token
-                context_name = context_token.lexeme
-                if context_name in keywords:
-                    self._error(token=None, message=(f'Invalid context name {context_name}\n' +
-                                                     f'Usage of reserved words to create a new scope is not allowed\n'))
-                self._consume(IDENT)
+        With a statement_cache every statement, nested ones included, is first looked up in the cache, which
+        either replays it or hands out an entry to record it under once it has been parsed.
+        """
+        if trace.parser:
+            trace.parser("Parsing %s Next is %s STATEMENTS AND SYMBOL TABLE %s %s",
+                         self.current_token, self.next_token, self.symbol_table, self.pst)
+        stack: list[list] = []
+        self.frames = stack
+        lookup, handlers, cache = PARSE_TABLE.get, self.handlers, self.statement_cache
+        expand = START
+        while True:
+            if expand is not None:
+                entry = None
+                if expand == START and cache is not None:
+                    reused, value, entry = cache.enter(self)
+                    if reused:
+                        expand = None
+                        if not stack:
+                            return value
+                        stack[-1][2].append(value)
+                        continue
+                production = lookup((expand, self.current_token.kind))
+                if production is None:
+                    token = self.current_token
+                    found = token.lexeme or token.type
+                    if expand == START:
+                        self._error(token, f"Unexpected '{found}' at the start of a statement")
+                    elif len(EXPECTED[expand]) == 1:
+                        self._error(token, f"Expected '{EXPECTED[expand][0]}', found '{found}'")
+                    else:
+                        self._error(token, f"Expected one of {' '.join(EXPECTED[expand])}, found '{found}'")
+                    # A statement that cannot start is skipped, anything else aborts the statement it is in
+                    if stack and expand == START and token.kind != TokenKind.EOF:
+                        stack[-1][2].append(None)
+                    elif not self._abort(stack):
+                        return None
+                else:
+                    stack.append([expand, production[0], [], production[1], self.symbol_table, entry])
+                expand = None
+                continue
+
+            frame = stack[-1]
+            steps, values = frame[1], frame[2]
+            if len(values) == len(steps):
+                stack.pop()
+                value = values[frame[3]] if frame[3] is not None else None
+                if frame[5] is not None:
+                    cache.leave(self, frame[5], value)
+                if not stack:
+                    return value
+                stack[-1][2].append(value)
+                continue
+
+            kind, argument = steps[len(values)]
+            if kind == TERMINAL:
+                token = self.current_token
+                if token.kind != argument:
+                    self._error(token, f"Expected '{kind_names[argument]}', found '{token.lexeme or token.type}'")
+                    if not self._abort(stack):
+                        return None
+                    continue
+                values.append(token)
+                self.current_token = self._advance()
+            elif kind == LOOKAHEAD:
+                # The table only picks the production in front of the token, it is there
+                values.append(self.current_token)
+            elif kind == NONTERMINAL:
+                expand = argument
+            elif kind == CALL:
+                # External nonterminals return None after an error they already recovered from
+                value = handlers[argument]()
+                if value is None:
+                    if not self._abort(stack):
+                        return None
+                    continue
+                values.append(value)
             else:
-                try:
-                    context_name = f'{self.symbol_table.context_name}_inner_{self.symbol_table.inners.popleft()}'
-                    context_token = Token(context_name,
-                                          context_name,
-                                          self.current_token.line_position,
-                                          self.current_token.begin_position,
-                                          None)
-                except IndexError:
-                    self._error(token=self.current_token,
-                                message=f"You've reached the limit of inner scopes for this particular parent -> " +
-                                        f"{self.symbol_table.name}")
-
-        elif Parser.is_ident(self.current_token):
-            if self.next_token.type == ASSIGN:
-                return self.assign_statement()
-            elif self.next_token.type == LPAREN:
-                return self.parse_call_statement(self.current_token, self.symbol_table)
-
-            context_token.type = "CONTEXT"
-            self._consume(LBRACE)
-            self.symbol_table, new_context_symbol = self.symbol_table.enter_context(context_name,
-                                                                                    context_token
-                                                                                    )
-            block_stmt = self.block_statement()
-            context_node = StatementListNode(context_token, block_stmt)
-            self._consume(RBRACE)
-            self._consume(SEMICOLON)
-            print(f'\nChild symbol table {self.symbol_table}\n')
-            print(f'\nThis is block stmt {block_stmt}\n')
-            # Exit context after block
-            self.symbol_table = self.symbol_table.exit_context()
-            print(f'\nOld symbol table {self.symbol_table}\n')
-            return context_node
-
-        elif self.current_token.type == RETURN:
-            return self.return_statement()
-
-        elif self.current_token.type == FUNCTION:
-            self.function_flag = True
-            func_statement_node: FunctionLiteralNode = self.function_statement()
-            self.function_flag = False
-            return func_statement_node
-        elif self.current_token.type == EOF:
-            return None
-        else:
-            return self.expression_statement()
+                values.append(handlers[argument](values, stack[-2][2] if len(stack) > 1 else None))
 
-    def block_statement(self):
+    def _abort(self, stack: list[list]) -> bool:
         """
-        Parses a block of statements within a context (delimited by curly braces).
+        Drops the frames of the innermost statement after a syntax error, whose tokens _error has already
+        skipped, and goes back to the symbol table the statement started in. At the end of the input all
+        statements are dropped. Returns whether an enclosing statement goes on, with None as the value of
+        the dropped one.
         """
-        statements = deque([])
-        while self.current_token is not None and self.current_token.type != RBRACE:
-            stmt = self.statement()
-            if stmt is not None:
-                statements.append(stmt)
-                self._consume(SEMICOLON)  # Optional semicolon handling
-        return statements
+        if not stack:
+            return False
+        index = len(stack) - 1
+        if self.current_token.kind == TokenKind.EOF:
+            index = 0
+        else:
+            while stack[index][0] != START:
+                index -= 1
+        self.symbol_table = stack[index][4]
+        del stack[index:]
+        if not stack:
+            return False
+        stack[-1][2].append(None)
+        return True
 
-    def let_statement(self):
-        name = self.current_token.lexeme
-        node_token = self.current_token
-        self._consume(IDENT)
-        self._consume(ASSIGN)
-        child = self.expression()
+    # Actions of the statement grammar. Each one gets the values of the production read so far and those
+    # of the production it was expanded from, and returns the value of its step.
+    @staticmethod
+    def build_cons(values: list, inherited: list):
+        # Item, List -> the list with the item in front, items that failed to parse are left out
+        items = values[-1]
+        if values[-2] is not None:
+            items.appendleft(values[-2])
+        return items
+
+    @staticmethod
+    def build_empty(values: list, inherited: list):
+        return deque([])
+
+    @staticmethod
+    def build_block(values: list, inherited: list):
+        # LBRACE Statements RBRACE
+        return values[1]
+
+    def build_let_statement(self, values: list, inherited: list):
+        # LET IDENT (ASSIGN Expression)
+        node_token = inherited[1]
+        name = node_token.lexeme
+        child = values[1]
 
         # Create an identifier/variable definition node
         # Carries entire stmts like let a = 10;
@@ -245,78 +331,36 @@ class Parser:
                         context_level=self.symbol_table.context_level)
 
         # DEBUG
-        print(f'\nThis is saved symbol from let_stmt {symbol}\n'
-              f'Here is the child {child}\n'
-              f'Here is the name {name}\n')
+        if trace.parser:
+            trace.parser("This is saved symbol from let_stmt %s Here is the child %s Here is the name %s",
+                         symbol, child, name)
         self.symbol_table.define(name, symbol)  # Add the symbol to the symbol table
-        print(f'\nThis is saved symbol_table from let_stmt\n{self.symbol_table}\n')
-
-        self.check_hanging()
+        if trace.parser:
+            trace.parser("This is saved symbol_table from let_stmt %s", self.symbol_table)
         return ident_def_node
 
-    def var_declaration(self):
-        node_token = self.current_token
-        children: Deque[IdentifierNode] | IdentifierNode = deque([])
-
-        while self.current_token.type != SEMICOLON:
-            if Parser.is_ident(self.current_token):
-                self.var_declaration_flag = True
-                expr: IdentifierNode = self.parse_primary()
-                if not isinstance(expr, IdentifierNode):
-                    self._error(token=self.current_token,
-                                message='Wrong variable declaration statement')
-                    return None
-                children.append(expr)
-                print(f'\nCHILD {children}\n')
-                print(f'\n{self.current_token} {self.next_token}\n')
-                self._consume(IDENT)
-                print(f'\n{self.current_token} {self.next_token}\n')
-                if self.current_token.type == COMMA:
-                    print(f'\nIN COMMA\n{self.current_token} {self.next_token}\n')
-                    self._consume(COMMA)
-                    print(f'\nIN COMMA\n{self.current_token} {self.next_token}\n')
-            else:
-                self._error(self.current_token,
-                            message=(f"Erroneous usage of LET declaration statement: " +
-                                     f"Unexpected token {self.current_token}" +
-                                     f"encountered!"))
-                return None
-        if not children:
-            self._error(message="Used keyword: 'let' without identifiers!")
-
-        node_name: str = ''
-        if len(children) > 1:
-            for child_node in children:
-                node_name = node_name + '_' + child_node.name
-                let_symbol = Symbol(child_node,
-                                    self.symbol_table.context_level)
-                self.symbol_table.define(child_node.name,
-                                         let_symbol)
-        elif len(children) == 1:
-            child_node = children[-1]
-            node_name = child_node.name
+    def build_var_declaration(self, values: list, inherited: list):
+        # LET IDENT (VarList)
+        node_token = inherited[1]
+        children: Deque[IdentifierNode] = deque(IdentifierNode(token, None) for token in (node_token, *values[0]))
+
+        for child_node in children:
             let_symbol = Symbol(child_node,
                                 self.symbol_table.context_level)
             self.symbol_table.define(child_node.name,
                                      let_symbol)
-        let_node = LetStatementNode(node_token,
-                                    node_name,
-                                    children)
-        self.check_hanging()
-        self.var_declaration_flag = False
-        del node_token, node_name, children
-        return let_node
-
-    def assign_statement(self):
-        node_token = self.current_token
+        node_name = ''.join('_' + child_node.name for child_node in children) if len(children) > 1 \
+            else node_token.lexeme
+        return LetStatementNode(node_token,
+                                node_name,
+                                children)
+
+    def build_assign_statement(self, values: list, inherited: list):
+        # IDENT (ASSIGN Expression)
+        node_token = inherited[0]
         name = node_token.lexeme
-        self._consume(IDENT)
-        self._consume(ASSIGN)
-        child = self.expression_statement()
-        if not child:
-            self._error(self.current_token,
-                        f"ASSIGN STATEMENT SYNTAX ERROR: Unexpected token used within assignment -> {self.current_token}")
-            return None
+        expr = values[1]
+        child = ExpressionStatementNode(expr.token, expr, expr)
         symbol, error = self.symbol_table.lookup(name)
         ident_node = IdentifierNode(node_token, value=child)
         ident_node.value.name = ident_node.name
@@ -326,685 +370,408 @@ class Parser:
                                           child)
 
         if symbol is None:
-            self._error(node_token,
-                        f'Undeclared identifier used! {error}')
+            self._report(node_token,
+                         f'Undeclared identifier used! {error}')
             assign_symbol = Symbol(assign_node, self.symbol_table.context_level)
             self.symbol_table.define(name, assign_symbol)
         else:
-            symbol.node = assign_node
-            symbol.value = assign_node.value
-            symbol.line_declared = f'{assign_node.token.line_position}:{assign_node.token.begin_position}'
+            self.symbol_table.reassign(symbol, assign_node)
         return assign_node
 
-    def expression_statement(self):
-        # Since the Shunting-yard algorithm returns the complete expression,
-        # we no longer need to loop until a semicolon is encountered.
-        expr = self.expression()
-        print(f'\nThis is the expr\n'
-              f'\n{expr}\n'
-              f'\n{self.current_token}\n')
-
-        self.check_hanging()
-
-        expression_stmt_node = ExpressionStatementNode(expr.token,
-                                                       expr,
-                                                       expr)
-        try:
-            return expression_stmt_node
-        except AttributeError:
-            return None
+    @staticmethod
+    def build_expression_statement(values: list, inherited: list):
+        expr = values[0]
+        if trace.parser:
+            trace.parser("This is the expr %s", expr)
+        return ExpressionStatementNode(expr.token,
+                                       expr,
+                                       expr)
 
-    def print_statement(self):
-        print_token = self.current_token
-        self._consume(PRINT)
-        self.print_flag = True
-        print_node: PrintStatementNode = self.parse_call_statement(print_token,
-                                                             self.symbol_table)
-        self.print_flag = False
-        if self.current_token.lexeme == SEMICOLON:
-            self._consume(SEMICOLON)
-        return print_node
-
-    def clock_statement(self):
-        print('\nIN CLOCK STATEMENT\n'
-              f'\n{self.current_token}\n'
-              f'\n{self.next_token}\n')
-        self._consume(CLOCK)
-        self._consume(DOT)
-        function_token = self.current_token
+    @staticmethod
+    def build_print_statement(values: list, inherited: list):
+        # PRINT Arguments
+        return PrintStatementNode(values[0],
+                                  values[1],
+                                  None
+                                  )
+
+    def build_clock_statement(self, values: list, inherited: list):
+        # CLOCK DOT ClockFunction LPAREN RPAREN
+        # The clock functions DO NOT take any arguments
+        # They should not be interfaced with any other functions except maybe print
+        function_token = values[2]
         function_name = function_token.lexeme
-        if function_name not in ("CLOCK", "NOW"):
-            self._error(function_token,
-                        f"ClockUsageError: The method '{function_name}' does not exist!")
+        if function_name.upper() not in ("CLOCK", "NOW"):
+            self._report(function_token,
+                         f"ClockUsageError: The method '{function_name}' does not exist!")
             return None
-
-        # Consume the function name
-        self._consume()
-        # Then consume the left and right parentheses
-        # They clock functions DO NOT take any arguments
-        # They should not be interfaced with any other functions except maybe print
-        self._consume(LPAREN)
-        self._consume(RPAREN)
-        self._consume(SEMICOLON)
         return ClockStatementNode(token=Token(CLOCK, 'clock'),
                                   function=function_name,
                                   value=None)
 
-    def function_statement(self):
-        self._consume()
-        function_node = self.parse_function()
-        return function_node
+    def build_return_statement(self, values: list, inherited: list):
+        # RETURN Expression
+        return ReturnStatementNode(Token(RETURN, 'return'), values[1])
 
-    def return_statement(self):
-        self._consume()
-        expr = self.expression()
-        self._consume(SEMICOLON)
-        return ReturnStatementNode(Token(RETURN, 'return'), expr)
-
-    def expression(self):
-        if self.current_token.type == IDENT and self.next_token.type == DOUBLE_COLON:
-            self.context_access_flag = True
-            context_value = self.parse_context_access()
-            self.context_access_flag = False
-            return context_value
-        elif self.call_flag or self.print_flag:
-            return self.parse_primary()
-        elif self.if_parse_flag and (not self.call_flag):
-            return self.shunting_yard_if()
+    def build_enter_context(self, values: list, inherited: list):
+        # CONTEXT IDENT, or nothing in front of the block of an inner context
+        if values:
+            # The IDENT is left as it was lexed, the statement may be parsed again (see compiler/incremental.py)
+            name_token = values[1]
+            context_name = name_token.lexeme
         else:
-            return self.shunting_yard()
+            name_token = self.current_token
+            context_name = self.symbol_table.inner_context_name()
+            if context_name is None:
+                self._report(name_token,
+                             f"You've reached the limit of inner scopes for this particular parent -> " +
+                             f"{self.symbol_table.context_name}")
+                # Still give the block a scope of its own so its statements can be checked
+                context_name = f'{self.symbol_table.context_name}_inner_{name_token.begin_position}'
+        context_token = Token(CONTEXT,
+                              context_name,
+                              name_token.begin_position,
+                              name_token.line_position,
+                              None,
+                              name_token.column_position)
+
+        self.symbol_table, new_context_symbol = self.symbol_table.enter_context(context_name,
+                                                                                context_token
+                                                                                )
+        return context_token
+
+    def build_exit_context(self, values: list, inherited: list):
+        # ... context token Block
+        context_token, block_stmt = values[-2], values[-1]
+        context_node = StatementListNode(context_token, block_stmt)
+        if trace.parser:
+            trace.parser("Child symbol table %s", self.symbol_table)
+            trace.parser("This is block stmt %s", block_stmt)
+        # Exit context after block
+        self.symbol_table = self.symbol_table.exit_context()
+        if trace.parser:
+            trace.parser("Old symbol table %s", self.symbol_table)
+        return context_node
+
+    def build_enter_function(self, values: list, inherited: list):
+        # FUNCTION IDENT LPAREN Parameters RPAREN, the body gets a context of its own with the parameters in it
+        function_token, param_tokens = values[1], values[3]
+        function_name = function_token.lexeme
+        if trace.parser:
+            trace.parser("FUNCTION NAME: %s", function_name)
+
+        params_node: ParametersNode = ParametersNode(Token('PARAMETERS',
+                                                           f'{function_name}_parameters'),
+                                                     parameters=deque([])
+                                                     )
+        context_token = Token(CONTEXT,
+                              f'fn_{function_name}',
+                              function_token.begin_position,
+                              function_token.line_position,
+                              None,
+                              function_token.column_position)
+        self.symbol_table, _ = self.symbol_table.enter_context(context_token.lexeme, context_token, define=False)
+        for param_token in param_tokens:
+            param_child = IdentifierNode(param_token, None)
+            params_node.parameters.append(ParameterNode(param_token,
+                                                        param_child,
+                                                        len(params_node.parameters) + 1))
+            self.symbol_table.define(param_token.lexeme, Symbol(param_child, self.symbol_table.context_level))
+        return params_node
+
+    def build_function_statement(self, values: list, inherited: list):
+        # FUNCTION IDENT LPAREN Parameters RPAREN parameters Block
+        function_token, params_node, function_body = values[1], values[5], values[6]
+        function_name = function_token.lexeme
+        # Exit the function's context after the block
+        self.symbol_table = self.symbol_table.exit_context()
 
-    def parse_context_access(self):
-        context_token = self.current_token
-        context_name = context_token.lexeme
-        self._consume(IDENT)
-        self._consume(DOUBLE_COLON)
+        return_node = next((stmt for stmt in function_body if isinstance(stmt, ReturnStatementNode)), None)
+        if return_node is None:
+            self._report(function_token, f"Function '{function_name}' has no return statement")
+            return None
 
-        context_symbol_table: SymbolTable | None = None
-        context_symbol_table, error = self.symbol_table.lookup(context_name)
+        function_body_node = StatementListNode(
+            self._made_from(Token("FUNCTION_BODY", f"fn_{function_name} body",
+                                  self.current_token.begin_position,
+                                  self.current_token.line_position),
+                            self.current_token),
+            statements=function_body)
+
+        function_node = FunctionLiteralNode(token=function_token,
+                                            parameters=params_node,
+                                            body=function_body_node,
+                                            return_node=return_node
+                                            )
+        function_symbol = Symbol(function_node,
+                                 self.symbol_table.context_level)
+        self.symbol_table.define(function_name, function_symbol)
+        if trace.parser:
+            trace.parser("UPDATES %s %s %s %s", self.symbol_table, function_name, function_symbol, function_node)
+        return function_node
 
-        if error:
-            self._error(context_token, f"UnboundLocalError: This context -> '{context_name}' does not exist or has"
-                                       "not been defined!.")
+    def build_condition(self, values: list, inherited: list):
+        # LPAREN Expression RPAREN
+        condition = values[1]
+        # A condition is a comparison, its operands can be any expression
+        if not (isinstance(condition, InfixOperatorNode) and condition.token.kind in BOOL_OP_KINDS):
+            self._report(token=condition.token,
+                         message=f"\nUnidentified operator "
+                                 f"'{condition.token.lexeme}' used in IF statement\n"
+                                 f"Expected one in: {bool_ops}\n"
+                                 f"\n")
             return None
-        elif self.current_token != IDENT:
-            self._error(self.current_token,
-                        f"ContextAccessError: Contexts can only be interfaced through identifiers!\n"
-                        f"Using '{self.current_token.type}' with context interface not allowed! ")
+        if trace.parser:
+            trace.parser("THIS IS THE CONDITION %s %s %s", condition.left, condition.token, condition.right)
+        return condition
 
-        else:
-            ident_to_check = self.current_token
-            ident_symbol: Symbol | None = None
-            ident_symbol, error = context_symbol_table.lookup(ident_to_check.lexeme)
-            ident_node = ident_symbol.node
-            if error:
-                self._error(ident_to_check,
-                            f"LookupError: The identifier '{ident_to_check.lexeme}' not in context "
-                            f"'{context_name}'")
-            else:
-                self._consume(IDENT)
-                print(f'\nTHE NODE WAS FOUND\n'
-                      f'\n{ident_node}\n')
-                if self.current_token == SEMICOLON:
-                    try:
-                        if isinstance(ident_node, (IdentifierNode, IntegerLiteralNode, FloatLiteralNode,
-                                                   AssignStatementNode, ExpressionStatementNode, StringLiteralNode,
-                                                   BooleanLiteralNode)):
-                            return ident_node.value
-                        else:
-                            self._error(ident_node,
-                                        f"RetrivalError: Cannot use value of {ident_node} from"
-                                        f"CONTEXT '{context_name}'")
-                    except AttributeError as e:
-                        self._error(ident_to_check, str(e))
-
-                # For situations where a context access is for a function call -> my_context::add(1,2);
-                elif self.current_token == LPAREN:
-                    self.call_flag = True
-                    call = self.parse_call_statement(ident_to_check, context_symbol_table)
-                    print(f'\n**THE CALL FROM CONTEXT**\n'
-                          f'\nCONTEXT: {context_name}\n'
-                          f'\nCALL: {call}\n')
-                    self.call_flag = False
-                    return call
-
-    def if_statement(self):
-        if_token = self.current_token
-        self._consume(IF)
-        conditions = deque([])
-        # At this point, the output stack should contain IfConditionNodes and alternatives
-        if_statement_node = self.build_if_statement_node(if_token, conditions)
-        # Parse the condition using the shunting yard
-        # algorithm for 'if'
-        self.shunting_yard_if(if_statement_node)
-        # print(if_statement_node)
-        return if_statement_node
-
-    def build_condition_node(self):
-        self.args_flag: bool = True
-        self._consume(LPAREN)
-        left_operand = self.parse_primary()
-        print('\nTHIS IS THE LEFT OPERAND'
-              f'\n{left_operand}\n'
-              f'\n{self.current_token} {self.next_token}\n')
-        # Consume the first operand
-        self._consume()
-        if self.current_token.lexeme in bool_ops:
-            operator_token = self.current_token
-            self._consume()
-        else:
-            self._error(token=self.current_token,
-                        message=f"\nUnidentified operator "
-                                f"'{self.current_token.lexeme}' used in IF statement\n"
-                                f"Expected one in: {bool_ops}\n"
-                                f"\n")
-            return None
-        right_operand = self.parse_primary()
-        print('\nTHIS IS THE RIGHT OPERAND'
-              f'\n{right_operand}\n')
-        # Consume the second operand
-        self._consume()
-        if self.current_token.lexeme == RPAREN:
-            self._consume(RPAREN)
-        self._consume(LBRACE)
-        condition_statements = deque([])
-        while self.current_token.type != RBRACE:
-            condition_statements.append(self.statement())
-            if self.current_token.lexeme == SEMICOLON:
-                self._consume(SEMICOLON)
-
-        condition_node = IfConditionNode(left_operand,
-                                         right_operand,
-                                         operator_token,
-                                         condition_statements)
-        self._consume(RBRACE)
-        self.args_flag: bool = False
-        return condition_node
-
-    def shunting_yard_if(self,
-                         if_statement: IfStatementNode | None = None
-                         ):
-        while self.current_token.type not in (SEMICOLON, EOF):
-            token = self.current_token
-            if token.type == LPAREN:
-                if self.if_parse_flag:
-                    pass
-                else:
-                    # Flip the if parse flag to indicate that we are parsing an if statement
-                    self.if_parse_flag = not self.if_parse_flag
-                condition_node = self.build_condition_node()
-
-                if_statement.conditions.append(condition_node)
-
-            elif token.type == ELSE and self.next_token.type == IF:
-                self._consume(ELSE)
-                self._consume(IF)
-                condition_node = self.build_condition_node()
-                # Create an IfConditionNode and append it to the output stack
-                if_statement.conditions.append(condition_node)
-
-            # TODO: NEED TO TEST WHETHER THESE CODE BLOCKS CORRECTLY CLOSE THE IF BLOCK
-            elif token.type == ELSE and self.next_token.type == LBRACE:
-                alternative = StatementListNode(self.current_token, deque())
-                self._consume(ELSE)
-                self._consume(LBRACE)
-                while self.current_token.type not in (RBRACE, EOF):
-                    alternative.statements.append(self.statement())
-                if self.current_token.type == RBRACE:
-                    self._consume(RBRACE)
-                if_statement.alternative = alternative
-            else:
-                # Handle other tokens or errors
-                print(if_statement)
-                breakpoint()
-                self._error(self.current_token)
-
-        # Done parsing the if, else if or else blocks
-        if self.current_token.type == SEMICOLON:
-            self._consume(SEMICOLON)  # Move to the next token
-        self.if_parse_flag = not self.if_parse_flag
-        return True
+    @staticmethod
+    def if_branches(values: list) -> tuple[Deque[IfConditionNode], StatementListNode | None]:
+        # IF Condition Block ElseTail -> the conditions of the if and else if branches, and the else branch
+        condition, statements, else_tail = values[1], values[2], values[3]
+        conditions, alternative = else_tail if else_tail is not None else (deque([]), None)
+        if condition is not None:
+            conditions.appendleft(IfConditionNode(condition.left,
+                                                  condition.right,
+                                                  condition.token,
+                                                  statements))
+        return conditions, alternative
+
+    def build_else_if(self, values: list, inherited: list):
+        return self.if_branches(values)
 
     @staticmethod
-    def build_if_statement_node(if_token, conditions: IfConditionNode | Deque[IfConditionNode | StatementListNode]):
-        conditions = conditions
-        alternative = None
-
-        # Create the IfStatementNode with the conditions and alternative while empty
-        if_statement_node = IfStatementNode(
-            token=if_token,
-            conditions=conditions,
-            alternative=alternative
-        )
-        return if_statement_node
-
-    def shunting_yard(self):
-        parsed_start: bool = False
-        precedence = {
-            PLUS: 2, MINUS: 2,
-            ASTERISK: 3, SLASH: 3,
-            '(': 0,
-        }
-
-        operator_stack = deque([])  # Operator stack
-        output_stack = deque([])  # Output queue
-        operator_node: GroupedExpressionNode | InfixOperatorNode | PrefixOperatorNode | None = None
-        while self.current_token.type != SEMICOLON:
-            if operator_stack or output_stack:
-                parsed_start = True
-            print(f'\nCURRENT TOKEN -> {self.current_token}\n'
-                  f'\nNEXT TOKEN -> {self.next_token}\n'
-                  f'\nSHUNTING ON TOP {self.expression_flag, parsed_start}')
-            token = self.current_token
-
-            if self.next_token.type in [SEMICOLON, COMMA] and not self.expression_flag:
-                self.expression_flag = None
-                if self.next_token.type == COMMA:
-                    return self.var_declaration()
-            else:
-                self.expression_flag = True
+    def build_else_block(values: list, inherited: list):
+        # ELSE (Block)
+        return deque([]), StatementListNode(inherited[0], values[0])
 
-            print(f'\nCHANGES TO FLAGS {self.expression_flag, parsed_start}')
+    def build_if_statement(self, values: list, inherited: list):
+        conditions, alternative = self.if_branches(values)
+        return IfStatementNode(token=values[0],
+                               conditions=conditions,
+                               alternative=alternative)
 
-            if token.type in (INT, FLOAT, STR, IDENT):
-                atom = self.parse_primary()
-                if self.expression_flag:
-                    self.operator_lookup_flag = True
-                    output_stack.append(atom)
-                else:
-                    print('\n'
-                          'This is the returned atom from non-expression_flag\n'
-                          f'{atom}'
-                          '\n')
-                    if self.next_token.type == SEMICOLON:
-                        self._consume()
-                        self._consume(SEMICOLON)
-                    return atom
-                print(f'\n**MURKY**\n{atom}\n{token}\n{self.current_token}\n{self.next_token}\n**\n')
-                print(f'\nPARSE SHUNTING\nOPERATOR STACK \n{operator_stack}'
-                      f'\nOUTPUT STACK\n{output_stack}\n')
-                if self.current_token.type in [IDENT, INT, FLOAT, STR]:
-                    self._consume()
-                elif self.current_token.type in [SEMICOLON, EOF]:
-                    break
-                elif self.current_token.type not in [BANG, MINUS, PLUS, ASTERISK, SLASH]:
-                    self._error(self.current_token,
-                                message=(f'❌ Usage of {self.current_token.type} in' +
-                                         f' expressions is not allowed.'))
-                    self.expression_flag = parsed_start = False
-                    del operator_stack, output_stack, operator_node
-                    return None
-            elif token.type in precedence:
-                try:
-                    if (type(operator_stack[-1]) == GroupedExpressionNode) or token.type == LPAREN:
-                        pass
-                    elif precedence[(operator_stack[-1]).operator] >= precedence[token.type]:
-                        temp_node: InfixOperatorNode | PrefixOperatorNode = operator_stack.pop()
-                        temp_node.right = output_stack.pop()
-                        temp_node.left = output_stack.pop()
-                        output_stack.append(temp_node)
-                        print('\nREPLACEMENTS STARTED'
-                              f'\nLower: {temp_node}'
-                              f'\nRight: {temp_node.right}'
-                              f'\nLeft: {temp_node.left}\n')
-                except (IndexError, AttributeError):
-                    pass
-
-                if token.type in [PLUS, ASTERISK, SLASH, MINUS] and parsed_start:
-                    operator_node = InfixOperatorNode(token, token.lexeme)
-                elif token.type in [BANG, MINUS] and not parsed_start:
-                    operator_node = PrefixOperatorNode(token, token.lexeme)
-                elif token.type is LPAREN:
-                    operator_node = GroupedExpressionNode(token, token.lexeme)
-
-                operator_stack.append(operator_node)
-                print(f'\nPRECEDENCE\n'
-                      f'OPERATOR STACK {operator_stack}\n')
-                print(f'\nOUTPUT STACK {output_stack}\n')
-                self._consume()
-
-            elif token.type == RPAREN:
-                while type(operator_stack[-1]) != GroupedExpressionNode:
-                    operator_node: InfixOperatorNode | PrefixOperatorNode | GroupedExpressionNode = operator_stack.pop()
-                    if type(operator_node) == InfixOperatorNode:
-                        operator_node.right = output_stack.pop()
-                        operator_node.left = output_stack.pop()
-                        output_stack.append(operator_node)
-
-                    elif type(operator_node) == PrefixOperatorNode:
-                        operator_node.right = output_stack.pop()
-                        if operator_node.operator == MINUS:
-                            operator_node.left = IntegerLiteralNode(
-                                token=Token(INT, '0'),
-                                value=0
-                            )
-                        elif operator_node.operator == BANG:
-                            operator_node.left = None
-                            operator_node.right = output_stack.pop()
-
-                grouped_node: GroupedExpressionNode = operator_stack.pop()
-                grouped_node.expression = output_stack.pop()
-                grouped_node.name = f'({grouped_node.expression.left.name} {grouped_node.expression.operator} ' \
-                                    f'{grouped_node.expression.right.name})'
-                output_stack.append(grouped_node)
-                self._consume(RPAREN)
-            else:
+    def parse_expression(self, min_binding_power: int = 0):
+        """
+        Pratt parser for every expression: literals, identifiers, calls, context access, grouping,
+        prefix '-' and '!', and the infix operators of INFIX_BINDING_POWER, comparisons included.
+        The LL1 nodes are built while the tokens are read.
+
+        Parsing stops in front of the first token that cannot continue the expression (';', ',',
+        ')', '{', ...), which is left for the caller. Returns None when an error was recorded, the
+        parser has then already recovered to the next statement.
+        """
+        return self.parse_infix(self.parse_prefix(), min_binding_power)
+
+    def parse_expression_after_ident(self):
+        # The statement grammar has matched the identifier the expression starts with already
+        return self.parse_infix(self.parse_identifier_expression(self.tokens.peek(-1)))
+
+    def parse_infix(self, left: Node | None, min_binding_power: int = 0):
+        while left is not None:
+            binding_power = INFIX_BINDING_POWER.get(self.current_token.kind)
+            if binding_power is None or binding_power[0] < min_binding_power:
                 break
-            print(f'\nDONE ALL EXPRESSION ATOMS'
-                  f'\nOPERATOR STACK: {operator_stack}\n')
-            print(f'OUTPUT STACK: {output_stack}\n')
-
-        while operator_stack:
-            temp_node: InfixOperatorNode | PrefixOperatorNode | GroupedExpressionNode = operator_stack.pop()
-            if type(temp_node) == InfixOperatorNode:
-                temp_node.right = output_stack.pop()
-                temp_node.left = output_stack.pop()
-            elif type(temp_node) == PrefixOperatorNode:
-                operator_node.right = output_stack.pop()
-                if operator_node.operator == MINUS:
-                    operator_node.left = IntegerLiteralNode(
-                        token=Token(INT, '0'),
-                        value=0
-                    )
-                elif operator_node.operator == BANG:
-                    operator_node.left = None
-                    operator_node.right = output_stack.pop()
-
-            elif type(temp_node) == GroupedExpressionNode:
-                temp_node.expression = output_stack.pop()
-
-            output_stack.append(temp_node)
-
-            print(f'\nSHIFT-REDUCE\nTEMP NODE: {temp_node}\n')
-
-            print(f'\nSHIFT-REDUCE\nOPERATOR STACK: {operator_stack}\n')
-            print(f'\nOUTPUT STACK: {output_stack}\n')
-            del temp_node
-
-        print(f'\nCLEAR OPS STACK\nOPERATOR STACK {operator_stack}\n')
-        print(f'\nOUTPUT STACK {output_stack}\n')
-
-        self._consume(SEMICOLON)
-        self.expression_flag, parsed_start = False, False
-        del parsed_start, operator_stack, operator_node
-        return output_stack[-1] if output_stack else None  # The infix node queue
-
-    def parse_function(self):
-        function_token = self.current_token
-        function_name = function_token.lexeme
-        print(f'\nFUNCTION NAME: {function_name}\n')
+            operator_token = self.current_token
+            self.current_token = self._advance()
+            right = self.parse_expression(binding_power[1])
+            if right is None:
+                return None
+            left = InfixOperatorNode(operator_token, operator_token.lexeme, left, right)
+            if trace.parser:
+                trace.parser("INFIX %s %s %s", left.left, operator_token, left.right)
+        return left
+
+    def parse_prefix(self):
+        token = self.current_token
+        kind = token.kind
+        if kind in LITERAL_KINDS or kind in (TokenKind.TRUE, TokenKind.FALSE):
+            self.current_token = self._advance()
+            return Parser.literal_node(token)
+
+        elif kind == TokenKind.IDENT:
+            self.current_token = self._advance()
+            return self.parse_identifier_expression(token)
+
+        elif kind in PREFIX_KINDS:
+            self._consume()
+            operand = self.parse_expression(PREFIX_BINDING_POWER)
+            if operand is None:
+                return None
+            # -a is kept as 0 - a, !a has no left operand
+            left = IntegerLiteralNode(Token(INT, '0'), 0) if kind == TokenKind.MINUS else None
+            return PrefixOperatorNode(token, token.lexeme, left, operand)
+
+        elif kind == TokenKind.LPAREN:
+            self._consume(LPAREN)
+            expression = self.parse_expression()
+            if expression is None:
+                return None
+            if self.current_token.kind != TokenKind.RPAREN:
+                self._error(self.current_token, f"Expected ')' to close the '(' on line {token.line_position}")
+                return None
+            self._consume(RPAREN)
+            return GroupedExpressionNode(token, expression)
 
-        try:
-            assert (Parser.is_ident(self.current_token))
-            assert (function_name not in keywords)
-            self._consume(IDENT)
+        self._error(token, f'❌ Usage of {token.type} in expressions is not allowed.')
+        return None
 
-        except AssertionError as e:
-            self._error(f'{e}: {function_name} is a Monke keyword! Oop!')
+    def parse_identifier_expression(self, token: Token):
+        # An identifier that has been consumed: a call, a context access or a name
+        if self.current_token.kind == TokenKind.LPAREN:
+            return self.parse_call(token, self.symbol_table)
+        elif self.current_token.kind == TokenKind.DOUBLE_COLON:
+            # context::name(...) calls a function of the context, two tokens of lookahead tell it apart
+            return self.parse_context_access(token,
+                                             call=self.tokens.peek(1).kind == TokenKind.IDENT and
+                                             self.tokens.peek(2).kind == TokenKind.LPAREN)
+        return self.parse_identifier(token)
+
+    def parse_identifier(self, token: Token):
+        symbol, error = self.symbol_table.lookup(token.lexeme)
+        if error:
+            # Define it anyway so later uses of the same name are not reported again
+            ident_node = IdentifierNode(token, None)
+            self.symbol_table.define(ident_node.name, Symbol(ident_node, self.symbol_table.context_level))
+            self._error(token, f"NameError: Usage of the undeclared identifier '{token.lexeme}'")
             return None
+        if trace.parser:
+            trace.parser("Lookup returned this node %s", symbol.node)
+        return symbol.node
 
-        if self.current_token.type == LPAREN:
-            if self.function_flag and not self.call_flag:
-                print(f'\nTRIGGERED PARAMETER NODE CREATION\n')
-                self._consume()
-                return_node: ReturnStatementNode | None = None
-                params_node: ParametersNode = ParametersNode(Token('PARAMETERS',
-                                                                   f'{function_name}_parameters'),
-                                                             parameters=deque([])
-                                                             )
-
-                while self.current_token.type != RPAREN:
-                    print(
-                        f'\nReading parameter -> {self.current_token}\n'
-                        f'Param node parameters {params_node.parameters}\n')
-                    print(f'\nPARAM TYPE {self.current_token.type}\n')
-                    param_token = self.current_token
-                    param_child = self.expression()
-                    print(f'\nAFTER FUNCTION LITERAL EXPR TOKEN: {self.current_token}\n'
-                          f'Param node params{params_node.parameters}\n')
-                    param = ParameterNode(param_token,
-                                          param_child,
-                                          len(params_node.parameters) + 1)
-
-                    params_node.parameters.append(param)
-                    print(f'\nAFTER APPEND\n Param node params{params_node.parameters}\n')
-                    if self.current_token.type == COMMA:
-                        self._consume(COMMA)
-                        continue
+    @staticmethod
+    def literal_node(token: Token):
+        if token.kind == TokenKind.INT:
+            return IntegerLiteralNode(token, token.lexeme)
+        elif token.kind == TokenKind.FLOAT:
+            return FloatLiteralNode(token, token.lexeme)
+        elif token.kind == TokenKind.STR:
+            return StringLiteralNode(token, token.lexeme)
+        return BooleanLiteralNode(token, token.lexeme)
+
+    def parse_context_access(self, context_token: Token, call: bool = False):
+        context_name = context_token.lexeme
+        self._consume(DOUBLE_COLON)
 
-                # Consume the RPAREN indicating the end of parameter definitions
-                self._consume(RPAREN)
-
-                function_body = deque([])
-                if self.current_token.type == LBRACE:
-                    self._consume(LBRACE)
-                    while self.next_token.type != RBRACE:
-                        stmt = self.statement()
-                        function_body.append(stmt)
-                        if isinstance(stmt, ReturnStatementNode):
-                            return_node = stmt
-                            break
-                else:
-                    self._error(self.current_token, "Expected '{' to indicate the opening of the function body!")
-                    return None
-
-                # Complete parsing the function body
-                self._consume(RBRACE)
-                self._consume(SEMICOLON)
-
-                function_body_node = StatementListNode(
-                    Token("FUNCTION_BODY", f"fn_{function_name} body",
-                          self.current_token.begin_position,
-                          self.current_token.line_position),
-                    statements=function_body)
-
-                function_node = FunctionLiteralNode(token=function_token,
-                                                    parameters=params_node,
-                                                    body=function_body_node,
-                                                    return_node=return_node
-                                                    )
-                function_symbol = Symbol(function_node,
-                                         self.symbol_table.context_level)
-                self.symbol_table.define(function_name, function_symbol)
-                print(f'\nUPDATES\n{self.symbol_table}\n'
-                      f'\n{function_name}'
-                      f'\n{function_symbol}'
-                      f'\n{function_node}\n')
-
-                return function_node
-        else:
-            self._error()
+        context_symbol, error = self.symbol_table.lookup(context_name)
+        if error or not isinstance(context_symbol.node, SymbolTable):
+            self._error(context_token, f"UnboundLocalError: This context -> '{context_name}' does not exist or has"
+                                       " not been defined!.")
             return None
+        context_symbol_table: SymbolTable = context_symbol.node
 
-        self.function_flag, self.call_flag = False, False
+        ident_to_check = self.current_token
+        if ident_to_check.kind != TokenKind.IDENT:
+            self._error(ident_to_check,
+                        f"ContextAccessError: Contexts can only be interfaced through identifiers!\n"
+                        f"Using '{ident_to_check.type}' with context interface not allowed! ")
+            return None
+        self._consume(IDENT)
 
-    def parse_call_statement(self, call_token: Token, context_table: SymbolTable):
-        call_token = call_token
-        function_name = call_token.lexeme
+        # For situations where a context access is for a function call -> my_context::add(1,2);
+        if call:
+            call_node = self.parse_call(ident_to_check, context_symbol_table)
+            if trace.parser:
+                trace.parser("**THE CALL FROM CONTEXT** CONTEXT: %s CALL: %s", context_name, call_node)
+            return call_node
 
-        # Assuming the parse function was not called as part of an inner context
-        if self.current_token.type == IDENT:
-            self._consume()
+        ident_symbol, error = context_symbol_table.lookup(ident_to_check.lexeme)
+        if error:
+            self._error(ident_to_check,
+                        f"LookupError: The identifier '{ident_to_check.lexeme}' not in context "
+                        f"'{context_name}'")
+            return None
+        ident_node = ident_symbol.node
+        if trace.parser:
+            trace.parser("THE NODE WAS FOUND %s", ident_node)
+        if isinstance(ident_node, (IdentifierNode, IntegerLiteralNode, FloatLiteralNode,
+                                   AssignStatementNode, ExpressionStatementNode, StringLiteralNode,
+                                   BooleanLiteralNode, LetStatementNode)) and ident_node.value is not None:
+            return ident_node.value
+        self._error(ident_to_check,
+                    f"RetrivalError: Cannot use value of {ident_to_check.lexeme} from "
+                    f"CONTEXT '{context_name}'")
+        return None
 
-        if (self.call_flag or self.print_flag) and self.current_token.type == LPAREN:
-            self._consume(LPAREN)
-            args = deque([])
-
-            if self.next_token.type == COMMA:
-                while True:
-                    args = self.parse_arguments()
-                    if Parser.is_ident(self.current_token):
-                        self._consume(IDENT)
-
-                    if self.current_token.type == RPAREN:
-                        self._consume(RPAREN)
-                        break
-                    elif self.current_token.type in (SEMICOLON, RBRACE):
-                        if function_name == 'print':
-                            self.print_flag = True
-                        if self.current_token.type == SEMICOLON:
-                            self._consume(SEMICOLON)
-                        elif self.current_token.type == RBRACE:
-                            self._consume(RBRACE)
-
-                        break
-                    elif self.current_token.type == COMMA:
-                        self._consume(COMMA)
-                    else:
-                        print(f"***DID NOT MAKE **** {self.print_flag}, {self.if_parse_flag}")
-                        self._error(self.current_token)
-                        return None
-            else:
-                while True:
-                    if self.current_token.type in (IDENT, INT, STR, FLOAT, TRUE, FALSE) and \
-                            self.next_token.type == RPAREN:
-                        args.append(self.parse_primary())
-                        break
-                    elif Parser.is_ident(self.current_token) \
-                            and self.next_token.type == LPAREN:
-                        args.append(self.parse_call_statement(self.current_token,
-                                                              self.symbol_table))
-                        break
-                    elif self.next_token.lexeme in (ASTERISK, SLASH, PLUS, MINUS):
-                        args = self.shunting_yard()
-                        break
-                    else:
-                        self._error(call_token)
-                        return None
+    def parse_call(self, call_token: Token, context_table: SymbolTable):
+        # The function name has been consumed, the arguments are next
+        function_name = call_token.lexeme
+        args = self.parse_arguments()
+        if args is None:
+            return None
 
-                # Find the functional symbol in the current symbol table or its ancestors
-            if self.print_flag:
-                self.print_flag = False
-                return PrintStatementNode(call_token,
-                                          args,
-                                          None
-                                          )
-            function_symbol, error = context_table.lookup(function_name)
-            if error:
-                self._error(call_token,
-                            f"Function '{function_name}' is not defined")
-                return None
+        # Find the functional symbol in the current symbol table or its ancestors
+        function_symbol, error = context_table.lookup(function_name)
+        if error:
+            self._error(call_token,
+                        f"Function '{function_name}' is not defined")
+            return None
 
-            # Ensure the symbol is a function
-            elif not isinstance(function_symbol.node, FunctionLiteralNode):
-                self._error(call_token,
-                            f"'{function_name}' of type {function_symbol._type} is not a function.")
-                return None
+        # Ensure the symbol is a function
+        elif not isinstance(function_symbol.node, FunctionLiteralNode):
+            self._error(call_token,
+                        f"'{function_name}' of type {function_symbol._type} is not a function.")
+            return None
 
-            # Get the function literal node
-            function_literal_node = function_symbol.node
-            print('\nFUNC LITERAL NODE IS\n'
-                  f'\n{function_literal_node}\n')
+        # Get the function literal node
+        function_literal_node = function_symbol.node
+        if trace.parser:
+            trace.parser("FUNC LITERAL NODE IS %s", function_literal_node)
 
-            call_func_node = CallExpressionNode(Token(f"{function_literal_node.name}_call", function_name),
-                                                function_literal_node,
-                                                args,
-                                                context_table)
-            print('\nCALL FUNC NODE IS\n'
-                  f'\n{call_func_node}\n')
+        call_func_node = CallExpressionNode(Token(f"{function_literal_node.name}_call", function_name),
+                                            function_literal_node,
+                                            args,
+                                            context_table)
+        if trace.parser:
+            trace.parser("CALL FUNC NODE IS %s", call_func_node)
 
-            return call_func_node
-        else:
-            self._error(token=call_token,
-                        message=f"Expected '(' after function name '{function_name}'")
-            return None
+        return call_func_node
 
     def parse_arguments(self):
         """
-        Parses a list of arguments passed to a function call.
+        Parses the parenthesised, comma separated arguments of a function call, each one an expression.
 
         Returns:
-            ArgumentsListNode: A node representing the double-ended list of arguments.
+            ArgumentsListNode: A node representing the double-ended list of arguments, None after an error.
         """
+        open_token = self.current_token
+        if open_token.kind != TokenKind.LPAREN:
+            self._error(open_token, f"Expected '(' in front of the arguments, found '{open_token.lexeme}'")
+            return None
+        self._consume(LPAREN)
         args = deque([])
-        if self.current_token.type == RPAREN:
-            # No arguments
-            self._consume()  # Consume the right parenthesis
-            return ArgumentsListNode(
-                Token("ARGUMENTS", "()", self.current_token.begin_position, self.current_token.line_position),
-                arguments=args)
-
-        # Here's the key change: Follow LL(1) to ensure ArgumentsListNode
         arg_string = ''
-        while self.current_token.type != RPAREN:  # Lookahead for closing parenthesis
+        while self.current_token.kind != TokenKind.RPAREN:
             arg_string += f'{self.current_token.lexeme}'
-            args.append(self.expression())
-            if self.current_token.type == IDENT:
-                self._consume(IDENT)
-
-            if self.current_token.type != COMMA:
+            arg = self.parse_expression()
+            if arg is None:
+                return None
+            args.append(arg)
+            if self.current_token.kind != TokenKind.COMMA:
                 break
             arg_string += ', '
-            self._consume(COMMA)  # Consume comma separator
-
-        # Consume the right parenthesis before returning the Arguments node
-        if self.current_token.type == RPAREN:
-            if self.next_token.type == SEMICOLON:
-                self._consume(RPAREN)
-                self._consume(SEMICOLON)
-
-        elif self.current_token.type == SEMICOLON:
-            self._consume(SEMICOLON)
+            self._consume(COMMA)
 
+        if self.current_token.kind != TokenKind.RPAREN:
+            self._error(self.current_token, f"Expected ',' or ')' after the argument, "
+                                            f"found '{self.current_token.lexeme}'")
+            return None
+        self._consume(RPAREN)
         return ArgumentsListNode(
-            Token("ARGUMENTS", arg_string, self.current_token.begin_position, self.current_token.line_position),
+            self._made_from(Token("ARGUMENTS", arg_string, open_token.begin_position, open_token.line_position),
+                            open_token),
             arguments=args)
 
-    def parse_primary(self):
-        print(f'\nDealing with factor: {self.current_token}'
-              f'\nNext dealt terminal/non-term-> token: {self.next_token}')
-        try:
-            if self.current_token.type in (INT, FLOAT, STR, BOOL):
-                child = self.current_token.lexeme
-                type_ = self.current_token.type
-                line_pos = self.current_token.line_position
-                begin_pos = self.current_token.begin_position
-                self._consume()
-                print(f'\nRETURN BASIC LITERAL NODE {self.current_token} {self.next_token}\n')
-
-                basic_node = IntegerLiteralNode(Token(type_, child, line_pos, begin_pos), child) if type_ == INT else \
-                    FloatLiteralNode(Token(type_, child, line_pos, begin_pos), child) if type_ == FLOAT else \
-                        StringLiteralNode(Token(type_, child, line_pos, begin_pos), child) if type_ == STR else \
-                            BooleanLiteralNode(Token(type_, child, line_pos, begin_pos), child)
-
-                print("\nThis is the basic node representation"
-                      f"\n{basic_node}\n"
-                      "\n")
-                return basic_node
-            elif self.current_token.type == IDENT:
-                if self.next_token.type == LPAREN:
-                    self.call_flag = True
-                    call = self.parse_call_statement(self.current_token, self.symbol_table)
-                    self.call_flag = False
-                    return call
-
-                if self.var_declaration_flag:
-                    ident_node = IdentifierNode(self.current_token, None)
-                    self.var_declaration_flag = False
-                    return ident_node
-                # Handle situations of parsing identifiers expected to have been defined
-                symbol, error = self.symbol_table.lookup(self.current_token.lexeme)
-                # TODO: DO ERRORS NEED TO BE CAPTURED FOR NON-EXISTING REFERENCES?
-                if error:
-                    ident_node = IdentifierNode(self.current_token, None)
-                    ident_symbol = Symbol(ident_node,
-                                          self.symbol_table.context_level)
-                    self.symbol_table.define(ident_node.name, ident_symbol)
-                    print(f"\nError returned this node {ident_node}\n")
-                    self._error(self.current_token,
-                                f"ArgumentNotDefinedError: Usage of an undeclared identifier as an argument")
-                    return None
-                else:
-                    # TODO: HOW CAN CONTROL FLOW GRAPHS AND GRAPH COLORING HELP?
-                    print(f"\nLookup returned this node {symbol.node}\n"
-                          f"\n{self.current_token}\n"
-                          f"\n{self.next_token}\n")
-                    if self.print_flag and self.next_token.type == RPAREN:
-                        self._consume()
-                        self._consume(RPAREN)
-                    return symbol.node
-        except SyntaxError:
-            self._error()
+    def _report(self,
+                token: Token | None = None,
+                message: str | None = "Wrong usage!"):
+        """
+        Records an error without recovering from it, for errors found in constructs that parsed fine
+        (undeclared names, missing return statements, ...).
+        """
+        error_node = ParseError(token, message) if token else ParseError(self.current_token, message)
+        self.errors.append(error_node)
+        return error_node
 
     def _error(self,
                token: Token | None = None,
@@ -1013,10 +780,10 @@ class Parser:
         Handles and records syntax errors during parsing.
 
         This method creates a new ParseError object with the current token and the provided error message.
-        It then appends this error to the list of errors for later recall. The method also prints the current
-        and next tokens for debugging purposes. It then attempts to recover from the error by consuming tokens
-        until it reaches a SEMICOLON token, signifying the end of a statement. After recovery, it prints the
-        error information for the recovered error.
+        It then appends this error to the list of errors for later recall. It then attempts to recover from
+        the error by consuming tokens until it reaches a SEMICOLON token, signifying the end of a statement,
+        and consumes the SEMICOLON too. Inside a block it also stops in front of a closing brace, which ends
+        the statement as well as the block.
 
         Args:
             message (str | None): The error message to be recorded. Defaults to "Wrong usage!".
@@ -1024,19 +791,19 @@ class Parser:
         Returns:
             None
         """
-        error_node = ParseError(token, message) if token else ParseError(self.current_token, message)
-        self.errors.append(error_node)
-        while self.current_token.type not in [SEMICOLON, EOF, False]:
-            print(f'\nCURRENT\n{self.current_token}'
-                  f'\nNEXT\n{self.next_token}')
+        error_node = self._report(token, message)
+        while self.current_token.kind not in (TokenKind.SEMICOLON, TokenKind.EOF):
+            if self.current_token.kind == TokenKind.RBRACE and any(frame[0] == BLOCK for frame in self.frames):
+                break
+            if trace.parser:
+                trace.parser("CURRENT %s NEXT %s", self.current_token, self.next_token)
             self._consume()
-            print(f'\nSTART AT {self.current_token}\n')
-        print(f'\nRecovered from error: {error_node.error_info}\n')
-        if isinstance(self.current_token, Token):
-            if self.current_token.type == SEMICOLON:
-                self._consume(SEMICOLON)
-        for _ in self.critical_flags:
-            _ = False
+            if trace.parser:
+                trace.parser("START AT %s", self.current_token)
+        if trace.parser:
+            trace.parser("Recovered from error: %s", error_node.error_info)
+        if self.current_token.kind == TokenKind.SEMICOLON:
+            self._consume(SEMICOLON)
         return None
 
     @classmethod
@@ -1044,21 +811,11 @@ class Parser:
         """
         Check if a token is a specific keyword.
         """
-        return token.type == IDENT and token.lexeme == keyword
+        return token.kind == TokenKind.IDENT and token.lexeme == keyword
 
     @classmethod
     def is_ident(cls, token: Token):
         """
         Check if a token is an identifier.
         """
-        return token.type == IDENT
-
-    def check_hanging(self):
-        # Hanging semicolons that are preceded by a semicolon
-        # These are basically empty statements
-        # let a,b,c;;
-        while self.current_token.type == SEMICOLON:
-            print(f"\nCHECK HANGING{self}\n")
-            self._consume(SEMICOLON)
-            print(f"\nDONE EATING SEMICOLON\n"
-                  f"CHECK HANGING{self}\n")
+        return token.kind == TokenKind.IDENT
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+from collections import deque
+from typing import Any, Callable, Iterator
+# The symbol table has to be imported before parser.LL1, the two modules import each other
+from symbol_table.symbol_table import SymbolTable
+from parser.LL1 import Node
+
+# An enter handler returning SKIP leaves the children of its node out of the walk
+SKIP = 'SKIP'
+
+# A NodeTransformer exit handler returning REMOVE takes its node out of the deque or list it is in
+REMOVE = 'REMOVE'
+
+
+def node_fields(cls: type) -> tuple[str, ...]:
+    # The slots of a node class in the order of its bases, token aside, it has a column of its own
+    fields = []
+    for base in reversed(cls.__mro__):
+        fields.extend(name for name in base.__dict__.get('__slots__', ()) if name != 'token' and name not in fields)
+    return tuple(fields)
+
+
+_FIELDS: dict[type, tuple[str, ...]] = {}
+
+
+def fields_of(cls: type) -> tuple[str, ...]:
+    # node_fields, worked out once per class
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        fields = _FIELDS[cls] = node_fields(cls)
+    return fields
+
+
+def iter_child_slots(node: Node) -> Iterator[tuple[Node, str, int | None]]:
+    """
+    The children of node in field order as (child, field, index), index None for a node held in the field
+    itself and its position for one in a deque or list there. A node or container in more than one field,
+    ExpressionStatementNode keeps its expression as its value as well, is given once, under the first.
+    """
+    held = []
+    for name in fields_of(type(node)):
+        item = getattr(node, name, None)
+        if isinstance(item, Node):
+            if not any(item is other for other in held):
+                held.append(item)
+                yield item, name, None
+        elif isinstance(item, (deque, list)) and item:
+            if not any(item is other for other in held):
+                held.append(item)
+                for index, element in enumerate(item):
+                    if isinstance(element, Node):
+                        yield element, name, index
+
+
+def child_slots(node: Node) -> list[tuple[Node, str, int | None]]:
+    return list(iter_child_slots(node))
+
+
+def children(node: Node) -> list[Node]:
+    return [child for child, _, _ in child_slots(node)]
+
+
+def walk(root: Node) -> Iterator[Node]:
+    """
+    Every node under root, root first, in preorder with an explicit stack. A node reachable from more than
+    one parent, the value an assignment shares with its identifier, is given once, where it is reached first.
+    """
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        yield node
+        stack.extend(reversed(children(node)))
+
+
+# Stack entries of NodeVisitor.visit: (what, node, parent, field, index)
+_ENTER = 0
+_EXIT = 1
+
+
+class NodeVisitor:
+    """
+    Walks an AST with an explicit stack, so its depth costs no recursion. Going down every node is handed
+    to enter_<class name>(node), coming back up after its children to exit_<class name>(node), the
+    handler of the nearest class in the node's MRO, enter_ExpressionNode takes all the literals, and
+    enter_node / exit_node when there is none. Handlers are looked up once per node class.
+
+    Children are the nodes in a node's slots and in the deques and lists there, in field order (see
+    child_slots). A node reachable from more than one parent is visited once, where it is reached first.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every visitor class has handler tables of its own
+        cls._enter_handlers = {}
+        cls._exit_handlers = {}
+
+    _enter_handlers: dict[type, Callable] = {}
+    _exit_handlers: dict[type, Callable] = {}
+
+    @classmethod
+    def handler(cls, prefix: str, node_class: type) -> Callable:
+        # The unbound enter_ or exit_ handler for node_class, from the tables once it has been looked up
+        table = cls._enter_handlers if prefix == 'enter' else cls._exit_handlers
+        function = table.get(node_class)
+        if function is None:
+            for base in node_class.__mro__:
+                function = getattr(cls, f'{prefix}_{base.__name__}', None)
+                if function is not None:
+                    break
+            else:
+                function = getattr(cls, f'{prefix}_node')
+            table[node_class] = function
+        return function
+
+    def enter_node(self, node: Node) -> Any:
+        return None
+
+    def exit_node(self, node: Node) -> Any:
+        return None
+
+    def visit(self, root: Node) -> Node:
+        """
+        Walks the AST under root and returns its root, for a NodeTransformer what took root's place.
+        """
+        handler = type(self).handler
+        # Both handlers of a class, bound to this visitor
+        handlers: dict[type, tuple[Callable, Callable]] = {}
+        seen = set()
+        stack = [(_ENTER, root, None, None, None)]
+        while stack:
+            what, node, parent, name, index = stack.pop()
+            cls = type(node)
+            pair = handlers.get(cls)
+            if pair is None:
+                pair = handlers[cls] = (handler('enter', cls).__get__(self), handler('exit', cls).__get__(self))
+            if what == _ENTER:
+                if id(node) in seen:
+                    continue
+                seen.add(id(node))
+                stack.append((_EXIT, node, parent, name, index))
+                if pair[0](node) is not SKIP:
+                    slots = child_slots(node)
+                    if slots:
+                        stack.extend((_ENTER, child, node, field, position)
+                                     for child, field, position in reversed(slots))
+            else:
+                self._before_exit(node)
+                result = pair[1](node)
+                if parent is None:
+                    if isinstance(result, Node):
+                        root = result
+                elif result is not None and result is not node:
+                    self._replace(parent, name, index, node, result)
+        return root
+
+    def _before_exit(self, node: Node):
+        pass
+
+    def _replace(self, parent: Node, name: str, index: int | None, node: Node, result: Any):
+        pass
+
+
+class NodeTransformer(NodeVisitor):
+    """
+    A NodeVisitor whose exit handlers rewrite the AST in place. What an exit handler returns takes the
+    node's place in its parent: None or the node itself keeps it, another node replaces it in the field,
+    and in every other field of the parent holding it, or in the deque or list it is in, and REMOVE takes
+    it out of its deque or list, a field it is held in alone is set to None. Children exit before their
+    parent, so an exit handler sees its children as already rewritten.
+
+    A node reachable from more than one parent is visited once and replaced only where it was reached.
+    """
+
+    def visit(self, root: Node) -> Node:
+        # Containers with REMOVE marks by the id of the node holding them, swept when that node exits
+        self._removed: dict[int, list] = {}
+        try:
+            return super().visit(root)
+        finally:
+            del self._removed
+
+    def _before_exit(self, node: Node):
+        containers = self._removed.pop(id(node), None)
+        if containers:
+            for container in containers:
+                kept = [item for item in container if item is not REMOVE]
+                container.clear()
+                container.extend(kept)
+
+    def _replace(self, parent: Node, name: str, index: int | None, node: Node, result: Any):
+        if index is not None:
+            container = getattr(parent, name)
+            container[index] = result
+            if result is REMOVE:
+                containers = self._removed.setdefault(id(parent), [])
+                if not any(container is other for other in containers):
+                    containers.append(container)
+            return
+        if result is REMOVE:
+            result = None
+        for field in fields_of(type(parent)):
+            if getattr(parent, field, None) is node:
+                setattr(parent, field, result)
+
+
+class _Counter(NodeVisitor):
+    # Counts nodes by class, the benchmark's stand-in for an analysis pass
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+
+    def enter_node(self, node: Node):
+        name = type(node).__name__
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def _recursive_count(node: Node, seen: set) -> int:
+    # What the walk would be with recursion, as every consumer of the AST used to do it
+    if id(node) in seen:
+        return 0
+    seen.add(id(node))
+    return 1 + sum(_recursive_count(child, seen) for child in children(node))
+
+
+def main():
+    from compiler.compiler import compile_source, CompileOptions
+
+    arg_parser = argparse.ArgumentParser(description="Walk long operator chains with and without recursion.")
+    arg_parser.add_argument("--terms", type=int, nargs="+", default=[100, 1000, 10000],
+                            help="terms of the sum in the program, one infix node per term")
+    args = arg_parser.parse_args()
+
+    for terms in args.terms:
+        source = "let x = " + " + ".join(str(i) for i in range(terms)) + ";"
+        ast = compile_source(source, CompileOptions(engine="pattern", redefinition='shadow')).ast
+        start_time = time.perf_counter()
+        counter = _Counter()
+        counter.visit(ast)
+        visit_time = time.perf_counter() - start_time
+        try:
+            start_time = time.perf_counter()
+            _recursive_count(ast, set())
+            recursive = f"{(time.perf_counter() - start_time) * 1e3:.1f} ms"
+        except RecursionError:
+            recursive = f"RecursionError at limit {sys.getrecursionlimit()}"
+        print(f"{terms:>6} terms  {sum(counter.counts.values()):>6} nodes  visitor {visit_time * 1e3:.1f} ms  "
+              f"recursive {recursive}")
+
+
+if __name__ == "__main__":
+    # python -m parser.visitor --terms 100 1000 10000, run from the Paw directory
+    main()
@@ -10,16 +10,12 @@ def start():
         line+='\n'
         if line == ":quit":
             return
-        l = Lexer(line)
+        l = Lexer(line, keep_tokens=False)
         start_time = time.time()
-        while True:
-            tok = l.next_token()
-            try:
-                if tok.type == tokens.EOF:
-                    break
-                print(f'{tok}\n')
-            except AttributeError:
-                continue
-                
+        for tok in l:
+            if tok.type == tokens.EOF:
+                break
+            print(f'{tok}\n')
+
         end_time = time.time()
         print(f"Total runtime is {round(end_time-start_time,8)}\n")
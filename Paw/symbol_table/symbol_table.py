@@ -5,15 +5,27 @@ from collections import deque, ChainMap
 from tabulate import tabulate
 from typing import Dict, List, Deque
 from tokens.tokens import MAX_CONTEXT_DEPTH
+from tracing.tracing import trace
+from parser.p_err import Diagnostic, ERROR, WARNING, SYMBOLS
 from parser.LL1 import Node, ProgramNode, StatementListNode, StatementNode, LetStatementNode, AssignStatementNode,\
 ExpressionNode, ReturnStatementNode, IfStatementNode, PrintStatementNode, ClockStatementNode,FunctionLiteralNode
 from tokens.tokens import *
 
 sys.path.append("..")
+
+# What SymbolTable.define does with a name that is already defined in the same context
+REDEFINE_ASK = 'ask'
+REDEFINE_ERROR = 'error'
+REDEFINE_WARN = 'warn'
+REDEFINE_SHADOW = 'shadow'
+REDEFINITION_POLICIES = (REDEFINE_ASK, REDEFINE_ERROR, REDEFINE_WARN, REDEFINE_SHADOW)
+
 # TODO: Add symbols dict to each new symbol table instance as done with global_symbols to enhance lookup
 
 
 class Symbol:
+    __slots__ = ('node', '_type', 'name', 'declared', '_verbatim', 'line_referenced', 'context_level', 'errors')
+
     def __init__(
             self,
             node: ProgramNode | StatementListNode | StatementNode | LetStatementNode |
@@ -24,79 +36,95 @@ class Symbol:
         self.node = node
         self._type = self.set_type()
         self.name = None
-        self.line_declared = None
+        # Where the symbol was declared, see line_declared
+        self.declared: Token | None = None
+        self._verbatim = False
         self.line_referenced = None
         self.context_level: int = context_level
-        self.value = None
         self.errors = []
         self.create_symbol()
 
     def create_symbol(self) -> bool:
-        print(f'\nCREATE SYMBOL\n'
-              f'\n{self.node}\n'
-              f'\n{type(self.node)}\n'
-              f'\n{isinstance(self.node, Node)}\n')
+        if trace.symbols:
+            trace.symbols("CREATE SYMBOL %s %s %s", self.node, type(self.node), isinstance(self.node, Node))
+        self._verbatim = False
         if isinstance(self.node, Node):
-            print(f"\nCreating a symbol from Node\n {self.node}\n"
-                  f"{self.node.__class__.__name__}\n")
+            if trace.symbols:
+                trace.symbols("Creating a symbol from Node %s %s", self.node, self.node.__class__.__name__)
             self.name: str = self.node.name
             self._type = self.set_type()
             if self._type == CONTEXT:
-                print(f"\nCreating a symbol from ContextToken\n {self.node}\n {self.node.context_token}\n")
-                self.line_declared: str | None = (str(self.node.context_token.line_position) +
-                                                  ':' +
-                                                  str(self.node.context_token.begin_position))
+                if trace.symbols:
+                    trace.symbols("Creating a symbol from ContextToken %s %s", self.node, self.node.context_token)
+                self.declared = self.node.context_token
 
             elif self.node.__class__.__name__ == 'FunctionLiteralNode':
-                print(f"\nCreating a symbol from Token\n {self.node}\n {self.node.token}\n")
-                self.line_declared: str | None = (str(self.node.token))
-                pass
+                if trace.symbols:
+                    trace.symbols("Creating a symbol from Token %s %s", self.node, self.node.token)
+                self.declared, self._verbatim = self.node.token, True
             elif self.node.__class__.__name__ == 'AssignStatementNode':
-                print(f"\nCreating a symbol from Node.Value.Token\n {self.node.value}\n")
-                print(f"\nCreating a symbol from Node.Value.Token\n {self.node.token}\n")
-                print(f"\nCreating a symbol from Node.Value.Token\n {self.node.value.token}\n")
-                self.line_declared: str | None = (str(self.node.value.token.line_position) +
-                                                  ':' +
-                                                  str(self.node.value.token.begin_position))
+                if trace.symbols:
+                    trace.symbols("Creating a symbol from Node.Value.Token %s", self.node.value)
+                    trace.symbols("Creating a symbol from Node.Value.Token %s", self.node.token)
+                    trace.symbols("Creating a symbol from Node.Value.Token %s", self.node.value.token)
+                self.declared = self.node.value.token
             elif self.node.__class__.__name__ in ['LetStatementNode', 'IdentifierNode']:
-                print(f"\nCreating a symbol from Node.Value.Token\n {self.node.token}\n")
-                self.line_declared: str | None = (str(self.node.token.line_position) +
-                                                  ':' +
-                                                  str(self.node.token.begin_position))
+                if trace.symbols:
+                    trace.symbols("Creating a symbol from Node.Value.Token %s", self.node.token)
+                self.declared = self.node.token
             else:
-                print(f"\nCreating a symbol from NodeValue\n {self.node.value}\n")
-                self.line_declared: str | None = (str(self.node.value.line_position) +
-                                                  ':' +
-                                                  str(self.node.value.begin_position))
+                if trace.symbols:
+                    trace.symbols("Creating a symbol from NodeValue %s", self.node.value)
+                self.declared = self.node.value
             self.line_referenced: list = []
-            self.value = self.node.value if self.node.value else None
 
         # Handling creating symbols for inner context symbol tables
         elif isinstance(self.node, SymbolTable):
-            print(f"\nCreating a symbol from Symbol Table named {self.node.context_name}\n")
+            if trace.symbols:
+                trace.symbols("Creating a symbol from Symbol Table named %s", self.node.context_name)
             self.name: str = self.node.context_name
             self._type = self.node.__class__.__name__
-            self.line_declared: str | None = (str(self.node.context_token.line_position) +
-                                              ':'+
-                                              str(self.node.context_token.begin_position))
+            self.declared = self.node.context_token
             self.line_referenced: list = []
-            self.value = self.node if self.node else None
-
-        # Handling situations where the value is empty
-        if self.value is None:
-            pass
 
         return True
 
+    def assign(self, node: AssignStatementNode):
+        # A new value for an existing name: let a; a = 5;
+        self.node = node
+        self.declared, self._verbatim = node.token, False
+
+    # Read from the node, a copy would go stale when the node is reassigned or replaced
+    @property
+    def value(self):
+        if isinstance(self.node, SymbolTable):
+            return self.node
+        if isinstance(self.node, Node):
+            return self.node.value or None
+        return None
+
+    @property
+    def line_declared(self) -> str | None:
+        # line:offset, read from the token so it follows edits to the source (see compiler/incremental.py)
+        token = self.declared
+        if token is None:
+            return None
+        if self._verbatim:
+            return str(token)
+        return f'{token.line_position}:{token.begin_position}'
+
     def set_type(self):
         _type = None
-        if self.node._type:
+        if isinstance(self.node, SymbolTable):
+            _type = self.node.__class__.__name__
+        elif self.node._type:
             _type = self.node._type
         elif self.node._type == ReturnStatementNode:
             _type = 'FUNCTION DEFINITION'
         elif self.node._type == StatementListNode:
             _type = 'CONTEXT'
-        print(f'\nTHIS IS SELF.NODE._TYPE {self.node._type}\nSYMBOL TYPE {_type}\n')
+        if trace.symbols:
+            trace.symbols("SYMBOL TYPE %s", _type)
         return _type
 
     @property
@@ -119,32 +147,48 @@ class Symbol:
 
 
 class SymbolTable:
-    _global_set: True = False
-    _instance = None
-
-    def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super().__new__(cls)
-            cls._parent_table = None  # Reference to parent symbol table (if any)
-            return cls._instance
-        else:
-            return super().__new__(cls)
+    """
+    The symbols of one context. A table without a parent is the global one, every context entered
+    from it gets a child table that inherits its redefinition policy and diagnostics.
+
+    The redefinition policy decides what define does with a name that is already defined in the
+    same context:
+        ask     ask on the terminal whether to redefine it (the interactive compiler)
+        error   keep the old symbol and record an error diagnostic
+        warn    redefine it and record a warning diagnostic
+        shadow  redefine it silently
+    """
 
     def __init__(self,
                  context_name: str | None = None,
                  context_token: Token | None = None,
-                 parent_table: SymbolTable | None = None):
+                 parent_table: SymbolTable | None = None,
+                 redefinition: str | None = None,
+                 diagnostics: list[Diagnostic] | None = None,
+                 journal: list[tuple] | None = None):
 
-        if not SymbolTable._global_set:
-            SymbolTable._global_set = True
-            self.context_name = 'global'
-            self.context_token = None
-        elif context_name:
+        if parent_table is None:
+            self.context_name = context_name or 'global'
+        else:
             self.context_name = context_name
-            self.context_token = context_token
-
-        print(f'\nINITIATED SYMBOL TABLE {self.context_name}'
-              f' {self.context_token}\n')
+        self.context_token = context_token
+
+        if trace.symbols:
+            trace.symbols("INITIATED SYMBOL TABLE %s %s", self.context_name, self.context_token)
+
+        if redefinition is None:
+            redefinition = REDEFINE_ASK if parent_table is None else parent_table.redefinition
+        if redefinition not in REDEFINITION_POLICIES:
+            raise ValueError(f"Unknown redefinition policy '{redefinition}', expected one of {REDEFINITION_POLICIES}")
+        self.redefinition: str = redefinition
+        if diagnostics is None:
+            diagnostics = [] if parent_table is None else parent_table.diagnostics
+        self.diagnostics: list[Diagnostic] = diagnostics
+        # When a list is handed in, every lookup, define, context entry and assignment of this table and the
+        # tables entered from it is appended to it (see compiler/incremental.py)
+        if journal is None and parent_table is not None:
+            journal = parent_table.journal
+        self.journal: list[tuple] | None = journal
 
         self._context_level: int | None = 0 if parent_table is None else \
             parent_table.context_level + 1
@@ -177,9 +221,11 @@ class SymbolTable:
     def enter_context(self,
                       context_name: str | None = None,
                       context_token: Token | None = None,
+                      define: bool = True,
                       ):
         """
-        Creates and enters a new context within the current symbol table.
+        Creates and enters a new context within the current symbol table. Without define the context is
+        not added to this one under its name, nothing can reach into it with ::, as for a function body.
 
         Returns:
             SymbolTable: The new context as a SymbolTable instance.
@@ -191,9 +237,21 @@ class SymbolTable:
         new_context_symbol = Symbol(new_context, self.context_level)
 
         # Return the new context and its symbol after adding it to the parent context's symbol table
-        self.define(context_name, new_context_symbol)
+        if define:
+            self.define(context_name, new_context_symbol)
+        if self.journal is not None:
+            self.journal.append(('enter', self, new_context))
         return new_context, new_context_symbol
 
+    def inner_context_name(self) -> str | None:
+        # Name of the next anonymous context entered from this one, None once the inner scopes are used up
+        if not self.inners:
+            return None
+        number = self.inners.popleft()
+        if self.journal is not None:
+            self.journal.append(('inner', self, number))
+        return f'{self.context_name}_inner_{number}'
+
     def exit_context(self):
         """
         Exits the current context of the symbol table.
@@ -204,46 +262,81 @@ class SymbolTable:
         Raises:
             Exception: If attempting to exit the global context.
         """
-        print(f'\nThis is the child table \n{self}\n')
-        print(f'\nThis is the parent table\n{self._parent_table}\n')
-        print(f'\nCONTEXTS IS: {self.context_table}\n')
-        print(f'\nPARENT CONTEXTS IS: {self._parent_table.context_table}\n')
         if self._parent_table is None:
             raise Exception("Cannot pop the global context")
+        if trace.symbols:
+            trace.symbols("This is the child table %s", self)
+            trace.symbols("This is the parent table %s", self._parent_table)
+            trace.symbols("CONTEXTS IS: %s", self.context_table)
+            trace.symbols("PARENT CONTEXTS IS: %s", self._parent_table.context_table)
         return self._parent_table
 
     def define(self, name: str, symbol: Symbol):
+        if self.journal is None:
+            return self._define(name, symbol)
+        prior = self.current_context().get(name)
+        self._define(name, symbol)
+        self.journal.append(('define', self, name, symbol, prior, self.current_context().get(name) is symbol))
+
+    def restore(self, name: str, symbol: Symbol):
+        # Puts back a symbol defined by an earlier parse, its redefinition was already reported then
+        current_context = self.current_context()
+        if self.journal is not None:
+            self.journal.append(('define', self, name, symbol, current_context.get(name), True))
+        current_context[name] = symbol
+
+    def reassign(self, symbol: Symbol, node: AssignStatementNode):
+        if self.journal is not None:
+            self.journal.append(('assign', symbol, node))
+        symbol.assign(node)
+
+    def _define(self, name: str, symbol: Symbol):
         current_context = self.current_context()
-        print('\nBEFORE DEFINE _contexts and current_context\n'
-              f'{self.context_table}\n{repr(current_context)}\n')
-        print(f'\nBEFORE DEFINE self: {self.context_name}\n')
-        print(f'{str(self)}\n')
-        print(f'\nSAVING NAME: {name}\n')
-        print(f'\nSAVING SYMBOL: {symbol}\n')
-        print(f'\nSAVING CONTEXT: {current_context}\n')
+        if trace.symbols:
+            trace.symbols("BEFORE DEFINE _contexts and current_context %s %s", self.context_table, current_context)
+            trace.symbols("BEFORE DEFINE self: %s", self)
+            trace.symbols("SAVING NAME: %s", name)
+            trace.symbols("SAVING SYMBOL: %s", symbol)
+            trace.symbols("SAVING CONTEXT: %s", current_context)
 
-        print(f'\nTHIS IS CURRENT CONTEXT => {current_context}\n')
+            trace.symbols("THIS IS CURRENT CONTEXT => %s", current_context)
 
         if not isinstance(current_context, dict):
             raise NameError(f"No active context to define symbol '{name}'")
 
         if name in current_context.keys():
-            answer = ""
-            while answer not in ['Y', 'N']:
-                answer = input(f"\nHERE IS THE CURRENT SYMBOL TABLE\n{str(self)}\n"
-                               f"\nSymbol '{name}' '{symbol}' already defined in current context\n"
-                               f"\nEnter Y if you intend to redefine the symbol {name}"
-                               f"\nelse enter N to not save this new symbol and"
-                               f" continue parsing with an erroneous assignment\n"
-                               )
-                if answer.split('\n')[0] == 'Y':
-                    break
-                elif answer.split('\n')[0] == 'N':
-                    return None
+            if self.redefinition == REDEFINE_ASK:
+                answer = ""
+                while answer not in ['Y', 'N']:
+                    answer = input(f"\nHERE IS THE CURRENT SYMBOL TABLE\n{str(self)}\n"
+                                   f"\nSymbol '{name}' '{symbol}' already defined in current context\n"
+                                   f"\nEnter Y if you intend to redefine the symbol {name}"
+                                   f"\nelse enter N to not save this new symbol and"
+                                   f" continue parsing with an erroneous assignment\n"
+                                   )
+                    if answer.split('\n')[0] == 'Y':
+                        break
+                    elif answer.split('\n')[0] == 'N':
+                        return None
+            elif self.redefinition == REDEFINE_ERROR:
+                self.diagnostics.append(Diagnostic(ERROR, f"Symbol '{name}' is already defined in context "
+                                                          f"'{self.context_name}'", self._token_of(symbol), SYMBOLS))
+                return None
+            elif self.redefinition == REDEFINE_WARN:
+                self.diagnostics.append(Diagnostic(WARNING, f"Symbol '{name}' redefined in context "
+                                                            f"'{self.context_name}'", self._token_of(symbol), SYMBOLS))
 
         current_context[name] = symbol
-        print(f'\nUpdated Symbol table {self.context_name}\n'
-              f'{self}\n')
+        if trace.symbols:
+            trace.symbols("Updated Symbol table %s %s", self.context_name, self)
+
+    @staticmethod
+    def _token_of(symbol: Symbol) -> Token | None:
+        node = symbol.node
+        if isinstance(node, SymbolTable):
+            return node.context_token
+        token = getattr(node, 'token', None)
+        return token if isinstance(token, Token) else None
 
     def get_all_symbols(self):
         all_symbols = {}
@@ -254,19 +347,29 @@ class SymbolTable:
                 # Handle SymbolTable instances appropriately
                 all_symbols.update({f"{context.context_name}":f'{repr(context)}'})
             else:
-                print(f"\nWarning: Unable to update all_symbols with context\n"
-                      f"{context}\nas it is not a dictionary.\n")
+                if trace.symbols:
+                    trace.symbols("Warning: Unable to update all_symbols with context %s as it is not a "
+                                  "dictionary.", context)
         return all_symbols
 
     def lookup(self, name):
-        context = self.current_context()
-        if name in context:
-            return context[name], None
-        elif self._parent_table:
-            return self._parent_table.lookup(name)  # Delegate to the parent context
-        else:
+        symbol = self.resolve(name)
+        if self.journal is not None:
+            self.journal.append(('lookup', self, name, symbol, symbol.node if symbol is not None else None))
+        if symbol is None:
             error_message = f"Symbol '{name}' not found"
             return None, error_message
+        return symbol, None
+
+    def resolve(self, name) -> Symbol | None:
+        # lookup without the error message and the journal
+        table = self
+        while table is not None:
+            context = table.current_context()
+            if name in context:
+                return context[name]
+            table = table._parent_table  # Delegate to the parent context
+        return None
 
     def __getitem__(self, key: str | Symbol) -> Symbol | None:
         return self.lookup(key)
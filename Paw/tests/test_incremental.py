@@ -0,0 +1,126 @@
+# Edits random programs with IncrementalParser and checks every result against a fresh compile_source of
+# the same text. Run from the Paw directory: python -m pytest -p no:cacheprovider tests, the json package
+# of this directory hides the one pytest caches with
+from __future__ import annotations
+import io
+import random
+import pytest
+from compiler.compiler import CompileOptions, CompileResult, compile_source
+from compiler.incremental import IncrementalParser
+from symbol_table.symbol_table import SymbolTable
+from parser.export import export_jsonl
+
+# Statements the programs are made of: declarations, reads of them, functions, calls, nested and named
+# contexts and reads through them, and a few that do not parse
+LINES = """let a = 10;
+let b = a + 1;
+let c, d;
+c = "str";
+d = a * b;
+x = 5;
+let a = 3;
+print(a, b);
+context mine { let q = a; print(q); };
+context outer { let e = 1; context inner { let e = 2; }; };
+let k = mine::q;
+let v = mine::b;
+c = outer::e;
+let n = outer::inner;
+{ let a = 25; let z = b; };
+{ let a = 26; { let y = a; }; };
+fn add (a, b) { return a + b; };
+fn f0() {  return true - 1; };
+fn sub (x, y) { let t = x - y; return t; };
+let s = add(a, b);
+let u = mine::add(1, 2);
+if (a > b) { print(a); } else if (b < a) { print(b); } else { print(a, b); };
+clock.clock();
+return a;
+let broken = ;
+let e = 1
+};
+{ let w = q; };
+let r = (a + b) * -c;""".splitlines()
+
+# Small edits inside a line
+FRAGMENTS = ["", " ", "a", "b", "1", ";", "{", "}", "\n", "mine", "::"]
+
+
+def describe_table(table: SymbolTable, depth: int = 0) -> list[tuple]:
+    rows = []
+    for context in table.context_table:
+        for name, symbol in sorted(context.items()):
+            node = symbol.node
+            token = node.context_token if isinstance(node, SymbolTable) else getattr(node, 'token', None)
+            rows.append((depth, table.context_name, name, type(node).__name__, symbol._type, symbol.context_level,
+                         getattr(token, 'lexeme', None), getattr(token, 'begin_position', None),
+                         getattr(token, 'line_position', None), getattr(token, 'column_position', None)))
+            if isinstance(node, SymbolTable) and node is not table and depth < 10:
+                rows.extend(describe_table(node, depth + 1))
+    return rows
+
+
+def snapshot(result: CompileResult) -> tuple:
+    ast = io.StringIO()
+    if result.ast is not None:
+        export_jsonl(result.ast, ast)
+    diagnostics = [(d.severity, d.message, d.line, d.column, d.stage) for d in result.diagnostics]
+    symbols = describe_table(result.symbols) if result.symbols is not None else None
+    return ast.getvalue(), diagnostics, symbols
+
+
+def random_edit(rng: random.Random, source: str) -> tuple[int, int, str]:
+    choice = rng.random()
+    if choice < 0.4 or not source:
+        # A whole statement inserted at the start of a line
+        offset = source.rfind("\n", 0, rng.randrange(len(source) + 1)) + 1
+        return offset, 0, rng.choice(LINES) + "\n"
+    if choice < 0.7:
+        # A line replaced by another one, or removed
+        start = source.rfind("\n", 0, rng.randrange(len(source))) + 1
+        end = source.find("\n", start)
+        end = len(source) if end == -1 else end + 1
+        return start, end - start, rng.choice(LINES + [""]) + ("\n" if rng.random() < 0.8 else "")
+    offset = rng.randrange(len(source) + 1)
+    return offset, min(rng.randrange(4), len(source) - offset), rng.choice(FRAGMENTS)
+
+
+@pytest.mark.parametrize("redefinition", ["error", "warn", "shadow"])
+@pytest.mark.parametrize("seed", range(4))
+def test_edits_match_fresh_compiles(seed, redefinition):
+    rng = random.Random(seed)
+    options = CompileOptions(engine="pattern", redefinition=redefinition)
+    for _ in range(40):
+        source = "\n".join(rng.choice(LINES) for _ in range(rng.randrange(1, 12))) + "\n"
+        parser = IncrementalParser(options)
+        parser.compile(source)
+        for _ in range(5):
+            before = parser.source
+            offset, deleted, inserted = random_edit(rng, before)
+            edited = before[:offset] + inserted + before[offset + deleted:]
+            if edited.count('"') % 2:
+                # An open string swallows the rest of the source, not what this is about
+                break
+            result = parser.edit(offset, deleted, inserted)
+            assert snapshot(result) == snapshot(compile_source(edited, options)), \
+                f"edit {(offset, deleted, inserted)!r} of {before!r}"
+
+
+def test_made_up_tokens_move_with_the_statement():
+    # The body of a reused function is given the position of the function, not the one it had before
+    options = CompileOptions(engine="pattern", redefinition='shadow')
+    parser = IncrementalParser(options)
+    parser.compile('d = a;\nlet e = c1;\nfn f0() {  return true - 1; };')
+    result = parser.edit(14, 4, 'let e = true - 2;\n')
+    assert parser.stats["reused"]
+    assert snapshot(result) == snapshot(compile_source(parser.source, options))
+
+
+def test_context_reads_are_checked_again():
+    # mine::a finds the a of the global context through mine, a new a there parses the read again
+    options = CompileOptions(engine="pattern", redefinition='shadow')
+    parser = IncrementalParser(options)
+    parser.compile('let a = 1;\ncontext mine { let q = 2; };\nlet k = mine::a;\n')
+    result = parser.edit(8, 1, '5')
+    assert parser.stats["reused"]
+    assert snapshot(result) == snapshot(compile_source(parser.source, options))
@@ -0,0 +1,60 @@
+# Stores the results of compile_source as ModuleImages, in memory and in a ModuleCache, and checks what is
+# loaded back against compile_source of the same text. Run from the Paw directory:
+# python -m pytest -p no:cacheprovider tests
+from __future__ import annotations
+import os
+import random
+import pytest
+from compiler.compiler import CompileOptions, compile_source
+from compiler.module_cache import ModuleCache
+from compiler.serialization import ModuleImage, dumps, loads
+from test_incremental import LINES, snapshot
+from test_parser import SAMPLES, SAMPLE_ERRORS
+
+
+def tokens(result) -> list[tuple] | None:
+    if result.tokens is None:
+        return None
+    return [(t.type, t.lexeme, t.begin_position, t.line_position, t.column_position) for t in result.tokens]
+
+
+def sources(seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [open(os.path.join(SAMPLES, name)).read() for name in sorted(SAMPLE_ERRORS)] + \
+        ["\n".join(rng.choice(LINES) for _ in range(rng.randrange(1, 30))) for _ in range(20)] + \
+        ["", "let x = 1e;", "@@@"]
+
+
+@pytest.mark.parametrize("redefinition", ["error", "warn", "shadow"])
+def test_images_match_compile_source(redefinition):
+    options = CompileOptions(engine="pattern", redefinition=redefinition)
+    for source in sources(0):
+        result = compile_source(source, options)
+        loaded = loads(dumps(ModuleImage.from_result(result))).to_result(source)
+        assert snapshot(loaded) == snapshot(result), source
+        assert tokens(loaded) == tokens(result)
+        assert (loaded.statements is None) == (result.statements is None)
+
+
+@pytest.mark.parametrize("redefinition", ["error", "warn", "shadow"])
+def test_cached_results_match_compile_source(tmp_path, redefinition):
+    options = CompileOptions(engine="pattern", redefinition=redefinition, module_cache=ModuleCache(str(tmp_path)))
+    plain = CompileOptions(engine="pattern", redefinition=redefinition)
+    for source in sources(1):
+        stored = compile_source(source, options)
+        loaded = compile_source(source, options)
+        assert 'load' not in stored.timings and 'load' in loaded.timings
+        expected = compile_source(source, plain)
+        assert snapshot(loaded) == snapshot(stored) == snapshot(expected), source
+        assert tokens(loaded) == tokens(expected)
+
+
+def test_damaged_entries_are_misses(tmp_path):
+    cache = ModuleCache(str(tmp_path))
+    options = CompileOptions(engine="pattern", module_cache=cache)
+    source = "let a = 1;\nprint(a);\n"
+    compile_source(source, options)
+    with open(cache.path(cache.key(source, options)), 'wb') as entry:
+        entry.write(b'MKMI not an image')
+    assert cache.load(source, options) is None
+    assert 'load' not in compile_source(source, options).timings
@@ -0,0 +1,30 @@
+# Compiles random programs with compile_parallel and checks every result against compile_source of the same
+# text. Run from the Paw directory: python -m pytest -p no:cacheprovider tests
+from __future__ import annotations
+import random
+import pytest
+from compiler.compiler import CompileOptions, compile_source
+from compiler.parallel import compile_parallel, generate_source
+from test_incremental import LINES, snapshot
+
+
+@pytest.mark.parametrize("redefinition", ["error", "warn", "shadow"])
+@pytest.mark.parametrize("seed", range(2))
+def test_parallel_matches_compile_source(seed, redefinition):
+    rng = random.Random(seed)
+    options = CompileOptions(engine="pattern", redefinition=redefinition)
+    for _ in range(10):
+        source = "\n".join(rng.choice(LINES) for _ in range(rng.randrange(1, 30))) + "\n"
+        if source.count('"') % 2:
+            continue
+        # Every context and function is a unit of its own, however small
+        result = compile_parallel(source, options, max_workers=3, min_unit_tokens=0)
+        assert snapshot(result) == snapshot(compile_source(source, options)), source
+
+
+def test_generated_source_matches_compile_source():
+    options = CompileOptions(engine="pattern", redefinition='error')
+    source = generate_source(40)
+    result = compile_parallel(source, options, max_workers=2, min_unit_tokens=0)
+    assert 'units' in result.timings
+    assert snapshot(result) == snapshot(compile_source(source, options))
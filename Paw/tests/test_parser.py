@@ -0,0 +1,123 @@
+# Parses the sample sources of parser/ and small programs with the table driven statement parser and the
+# Pratt expression parser. Run from the Paw directory: python -m pytest -p no:cacheprovider tests
+from __future__ import annotations
+import os
+import pytest
+from compiler.compiler import CompileOptions, compile_file, compile_source
+from parser.LL1 import ReturnStatementNode, InfixOperatorNode, PrefixOperatorNode, GroupedExpressionNode, \
+    LetStatementNode
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "parser")
+
+# Lines of the errors each sample is written to have, source_parser_2.txt leaves out the parentheses of
+# an if, reads a name of another context and closes a block twice
+SAMPLE_ERRORS = {
+    "source_parser.txt": [],
+    "source_parser_2.txt": [10, 15, 17],
+    "source_parser_3.txt": [],
+}
+
+
+def messages(source: str) -> list[str]:
+    result = compile_source(source, CompileOptions(engine="pattern", redefinition='error'))
+    return [diagnostic.message.split("\n")[0] for diagnostic in result.diagnostics]
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLE_ERRORS))
+def test_samples(name):
+    result = compile_file(os.path.join(SAMPLES, name), CompileOptions(engine="pattern", redefinition='error'))
+    assert [diagnostic.line for diagnostic in result.diagnostics] == SAMPLE_ERRORS[name], \
+        [str(diagnostic) for diagnostic in result.diagnostics]
+
+
+def test_every_sample_is_checked():
+    assert sorted(name for name in os.listdir(SAMPLES) if name.startswith("source_parser")) == \
+           sorted(SAMPLE_ERRORS)
+
+
+@pytest.mark.parametrize("source", [
+    "let x = 1; if (x > 0) { print(x) };",
+    "context c { let d = 20 };",
+    "{ let a = 1; let b = 2 };",
+    "{ let a = 1; { let b = a } };",
+    "let x = 1; if (x > 0) { print(x) } else { print(x); };",
+])
+def test_last_statement_of_a_block_needs_no_semicolon(source):
+    assert messages(source) == []
+
+
+@pytest.mark.parametrize("source", [
+    "let a = 1 let b = 2;",
+    "{ let a = 1 let b = 2 };",
+    "let a = 1",
+])
+def test_other_statements_need_their_semicolon(source):
+    assert messages(source)[0].startswith("Expected ';'")
+
+
+def test_functions_have_a_context_of_their_own():
+    # The parameters are defined in it and the names the body defines stay in it
+    options = CompileOptions(engine="pattern", redefinition='error')
+    result = compile_source("let a = 5;\nfn add(x, y) { let t = x + y; return t + a; };\nlet t = add(1, 2);\n"
+                            "print(x);", options)
+    assert [(diagnostic.line, diagnostic.message.split("\n")[0]) for diagnostic in result.diagnostics] == \
+           [(4, "NameError: Usage of the undeclared identifier 'x'")]
+    function = result.symbols.resolve('add').node
+    assert [parameter.name for parameter in function.parameters.parameters] == ['x', 'y']
+    assert isinstance(function.body.statements[-1], ReturnStatementNode)
+    assert messages("fn f(a, a) { return a; };") == ["Symbol 'a' is already defined in context 'fn_f'"]
+
+
+def grouped(node) -> str:
+    # The expression under node with every operator application in parentheses
+    if isinstance(node, GroupedExpressionNode):
+        return grouped(node.expression)
+    if isinstance(node, InfixOperatorNode):
+        return f"({grouped(node.left)} {node.operator} {grouped(node.right)})"
+    if isinstance(node, PrefixOperatorNode):
+        return f"({node.operator} {grouped(node.right)})"
+    if isinstance(node, LetStatementNode):
+        return node.name
+    return node.token.lexeme
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("1 + 2 * 3", "(1 + (2 * 3))"),
+    ("1 * 2 + 3", "((1 * 2) + 3)"),
+    ("1 - 2 - 3", "((1 - 2) - 3)"),
+    ("8 / 4 / 2", "((8 / 4) / 2)"),
+    ("1 + 2 + 3 * 4 - 5", "(((1 + 2) + (3 * 4)) - 5)"),
+    ("a * b / c", "((a * b) / c)"),
+    ("-a * b", "((- a) * b)"),
+    ("a - -b", "(a - (- b))"),
+    ("- -a", "(- (- a))"),
+    ("!a == b", "((! a) == b)"),
+    ("a + b < c * 2", "((a + b) < (c * 2))"),
+    ("a < b == b > c", "((a < b) == (b > c))"),
+    ("a <= b != a >= c", "((a <= b) != (a >= c))"),
+    ("(a + b) * c", "((a + b) * c)"),
+    ("a * (b + c)", "(a * (b + c))"),
+    ("((a))", "a"),
+])
+def test_operator_precedence(expression, expected):
+    result = compile_source(f"let a = 1; let b = 2; let c = 3; let r = {expression};",
+                            CompileOptions(engine="pattern", redefinition='error'))
+    assert result.diagnostics == []
+    assert grouped(result.statements[-1].value) == expected
+
+
+def test_long_expressions_render():
+    # The str and repr of a node and the name of its drawing are made without recursing through the nodes
+    from parser.p_ast import Tree
+    source = "let x = " + " + ".join(str(term) for term in range(2000)) + ";"
+    result = compile_source(source, CompileOptions(engine="pattern", redefinition='error'))
+    assert result.diagnostics == []
+    statement = result.statements[0]
+    assert repr(statement).count("int(1999)") == 1
+    assert str(statement).count("int(1999)") == 1
+    assert Tree(statement).name == str(statement)
+
+
+def test_contexts_are_not_values():
+    assert messages("context outer { context inner { let e = 2; }; };\nlet n = outer::inner;") == \
+           ["RetrivalError: Cannot use value of inner from CONTEXT 'outer'"]
@@ -0,0 +1,51 @@
+# Pulls the statements of random programs from a StatementStream and checks them and the stream's result
+# against compile_source of the same text. Run from the Paw directory: python -m pytest -p no:cacheprovider tests
+from __future__ import annotations
+import io
+import random
+import pytest
+from compiler.compiler import CompileOptions, compile_source
+from compiler.pipeline import StatementStream
+from parser.export import export_jsonl
+from parser.parser import Parser
+from test_incremental import LINES, describe_table
+
+
+def exported(statement) -> str:
+    # Exported while the stream is at it, it lets go of the statement once the next is pulled
+    out = io.StringIO()
+    export_jsonl(statement, out)
+    return out.getvalue()
+
+
+def diagnostics(result) -> list[tuple]:
+    return [(d.severity, d.message, d.line, d.column, d.stage) for d in result.diagnostics]
+
+
+@pytest.mark.parametrize("engine", ["pattern", "classic", "stream", "buffer"])
+@pytest.mark.parametrize("seed", range(2))
+def test_stream_matches_compile_source(seed, engine):
+    rng = random.Random(seed)
+    for _ in range(30):
+        source = "\n".join(rng.choice(LINES) for _ in range(rng.randrange(1, 12)))
+        options = CompileOptions(engine=engine, redefinition=rng.choice(["error", "warn", "shadow"]))
+        stream = StatementStream(source, options)
+        statements = [exported(statement) for statement in stream]
+        expected = compile_source(source, options)
+        assert statements == [exported(statement) for statement in expected.statements or ()], source
+        assert diagnostics(stream.result) == diagnostics(expected), source
+        assert describe_table(stream.result.symbols) == describe_table(expected.symbols), source
+        assert stream.count == len(statements)
+
+
+def test_parser_failures_come_after_the_errors_before_them(monkeypatch):
+    def fail(values, inherited):
+        raise RuntimeError("no print")
+
+    monkeypatch.setattr(Parser, 'build_print_statement', staticmethod(fail))
+    options = CompileOptions(engine="pattern", redefinition='error')
+    source = "let v = mine::b;\nlet n = outer::inner;\nprint(1);\nlet z = 1;\n"
+    stream = StatementStream(source, options)
+    list(stream)
+    assert diagnostics(stream.result) == diagnostics(compile_source(source, options))
+    assert stream.result.diagnostics[-1].message == "The parser failed: RuntimeError: no print"
@@ -0,0 +1,35 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class LineIndex:
+    """
+    Offsets at which the lines of a source start, built in one bulk pass over the source.
+
+    Maps a character offset to its (line, column) with a binary search, both 1-based. Lines are
+    the real lines of the source: unlike Token.line_position (see PatternLexer for its quirks)
+    newlines inside strings count.
+    """
+
+    def __init__(self, source: str):
+        # Each line after the first starts one past the end of the line before it
+        self.starts = array('I', [0])
+        self.starts.extend(accumulate(map((1).__add__, map(len, source.split('\n')[:-1]))))
+
+    def line_of(self, offset: int) -> int:
+        return bisect_right(self.starts, offset)
+
+    def column_of(self, offset: int) -> int:
+        return offset - self.starts[bisect_right(self.starts, offset) - 1] + 1
+
+    def locate(self, offset: int) -> tuple[int, int]:
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+    def line_start(self, line: int) -> int:
+        return self.starts[line - 1]
+
+    def __len__(self) -> int:
+        return len(self.starts)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+from array import array
+from typing import Iterable, Iterator
+from tokens.line_index import LineIndex
+from tokens.tokens import Token, TokenKind, token_kinds, kind_names
+
+
+class TokenBuffer:
+    """
+    Struct-of-arrays token store.
+
+    Every token costs one byte for its TokenKind, four bytes each for its start and end offsets and
+    four bytes for its line, kept in ``array`` columns. Lexemes are not stored, they are sliced
+    out of the source on demand, and Token objects are only built when the buffer is indexed or
+    iterated. It behaves like a read-only sequence of Tokens, so it can stand in for
+    ``Lexer.tokens`` (the parser, show_tokens and eval_tokens all work on it).
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self._line_index: LineIndex | None = None
+
+    @classmethod
+    def from_tokens(cls, source: str, tokens: Iterable[Token]) -> TokenBuffer:
+        """
+        Packs tokens that were lexed from source, e.g. the tokens deque of any lexer.
+        """
+        buffer = cls(source)
+        for tok in tokens:
+            buffer.append(tok.type, tok.begin_position, tok.begin_position + len(tok.lexeme), tok.line_position)
+        return buffer
+
+    def append(self, type_: str, start: int, end: int, line: int):
+        # Only lexer token types have a kind, parser-made (SYNTHETIC) tokens do not belong here
+        self.kinds.append(token_kinds[type_])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    # Columns are not stored either, they are looked up in an index of the source built on first use
+    @property
+    def line_index(self) -> LineIndex:
+        if self._line_index is None:
+            self._line_index = LineIndex(self.source)
+        return self._line_index
+
+    def kind_at(self, index: int) -> TokenKind:
+        return TokenKind(self.kinds[index])
+
+    def type_at(self, index: int) -> str:
+        return kind_names[self.kinds[index]]
+
+    def lexeme_at(self, index: int) -> str:
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def token_at(self, index: int) -> Token:
+        start = self.starts[index]
+        return Token(kind_names[self.kinds[index]],
+                     self.source[start:self.ends[index]],
+                     begin_position=start,
+                     line_position=self.lines[index],
+                     column_position=self.line_index.column_of(start))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes held by the columns, the source text itself is not counted.
+        """
+        return sum(column.itemsize * len(column) for column in (self.kinds, self.starts, self.ends, self.lines))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int | slice) -> Token | list[Token]:
+        if isinstance(index, slice):
+            return [self.token_at(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TokenBuffer index out of range")
+        return self.token_at(index)
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.kinds)):
+            yield self.token_at(index)
+
+    def __repr__(self) -> str:
+        return f"TokenBuffer({len(self)} tokens, {self.nbytes} bytes)"
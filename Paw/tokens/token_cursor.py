@@ -0,0 +1,123 @@
+from __future__ import annotations
+from typing import Iterable, Iterator
+from tokens.tokens import Token, TokenKind, EOF
+
+
+class TokenCursor:
+    """
+    Indexable token buffer with a cursor, what the parser reads its tokens through.
+
+    Tokens are pulled from the stream only as far as the parser looks ahead and are kept in a list, so
+    peek(k) for any k, and mark/reset for speculative parsing, are list indexing. The end of the input is
+    an EOF token that every read past the end returns again, the one the lexer emits or a sentinel made
+    up when the stream ends without one. A list that ends in its EOF token is read in place, other lists
+    and tuples are copied up front; deques, TokenBuffers, TokenFiles and lexers are read lazily through
+    their iterators.
+    """
+
+    def __init__(self, tokens: Iterable[Token]):
+        self._tokens: list[Token] = []
+        self._stream: Iterator[Token] | None = None
+        self.position = 0
+        # Only tokens read from a stream are the cursor's own to forget, see release
+        self._streamed = False
+        if isinstance(tokens, list) and tokens and tokens[-1].kind == TokenKind.EOF:
+            self._tokens = tokens
+        elif isinstance(tokens, (list, tuple)):
+            self._tokens.extend(tokens)
+            self._end()
+        else:
+            self._stream = iter(tokens)
+            self._streamed = True
+
+    def _end(self):
+        # The stream is done, make sure the last token is an EOF token
+        self._stream = None
+        tokens = self._tokens
+        if not tokens or tokens[-1].kind != TokenKind.EOF:
+            last = tokens[-1] if tokens else None
+            tokens.append(Token(EOF, '',
+                                begin_position=last.begin_position + len(last.lexeme) if last else 0,
+                                line_position=last.line_position if last else 1))
+
+    def _fill(self, index: int) -> Token:
+        # Reads up to index from the stream, anything past the end is the EOF token
+        tokens = self._tokens
+        stream = self._stream
+        while stream is not None and len(tokens) <= index:
+            try:
+                token = next(stream)
+            except StopIteration:
+                self._end()
+                break
+            tokens.append(token)
+            if token.kind == TokenKind.EOF:
+                self._stream = stream = None
+        return tokens[index] if index < len(tokens) else tokens[-1]
+
+    @property
+    def current(self) -> Token:
+        return self.peek(0)
+
+    def peek(self, k: int = 1) -> Token | None:
+        """
+        The token k places after the current one, the EOF token past the end. Negative k looks back at
+        tokens already read, None before the first token.
+        """
+        index = self.position + k
+        if index < 0:
+            return None
+        tokens = self._tokens
+        if index < len(tokens):
+            return tokens[index]
+        return self._fill(index)
+
+    def advance(self) -> Token:
+        """
+        Moves to the next token and returns it. The cursor stays on the EOF token once it reaches it.
+        """
+        position = self.position + 1
+        try:
+            token = self._tokens[position]
+        except IndexError:
+            token = self._fill(position)
+            if position >= len(self._tokens):
+                return token
+        self.position = position
+        return token
+
+    @property
+    def buffer(self) -> list[Token] | None:
+        # All the tokens, EOF included, once the stream is read to the end, None before
+        return self._tokens if self._stream is None else None
+
+    def at_end(self) -> bool:
+        return self.current.kind == TokenKind.EOF
+
+    def mark(self) -> int:
+        return self.position
+
+    def reset(self, mark: int) -> Token:
+        """
+        Moves back (or forward) to a position from mark and returns the token there.
+        """
+        self.position = mark
+        return self.current
+
+    def release(self):
+        """
+        Forgets the tokens before the current one, which then is at position 0, so reading a long stream
+        does not keep every token of it. Marks taken before are no good afterwards. Tokens handed in as a
+        list or tuple are kept, they are in memory anyway.
+        """
+        if self._streamed and self.position:
+            del self._tokens[:self.position]
+            self.position = 0
+
+    def __len__(self) -> int:
+        # Tokens read so far and not released, the EOF token included once the stream is done
+        return len(self._tokens)
+
+    def __repr__(self) -> str:
+        state = "done" if self._stream is None else "streaming"
+        return f"TokenCursor(at {self.position} of {len(self._tokens)} tokens, {state})"
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterable, Iterator
+from tokens.tokens import Token, TokenKind, kind_names, token_kinds
+
+# Monke token file, all integers little-endian:
+#
+#   header        magic b'MKTK', version u16, reserved u16, token count u32, string count u32, string bytes u32
+#   kinds         u8 TokenKind per token, zero padded to a multiple of 4 bytes
+#   offsets       u32 begin_position per token
+#   lines         u32 line_position per token
+#   columns       u32 column_position per token (0 when unknown)
+#   lexemes       u32 index into the string table per token
+#   string table  u32 start offset per string plus one end offset, then the UTF-8 bytes of all strings
+#
+# Every column starts 4-byte aligned, so a reader can view the columns of an mmap without copying them.
+MAGIC = b'MKTK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIII')
+
+
+def _padded(size: int) -> int:
+    return (size + 3) & ~3
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_token_file(target: str | BinaryIO, tokens: Iterable[Token]):
+    """
+    Writes tokens, e.g. Lexer.tokens or a lexer being iterated, as a token file. Equal lexemes are stored
+    once in the string table. Only lexer token types can be written, not tokens the parser made up.
+    """
+    kinds, offsets, lines, columns, lexemes = array('B'), array('I'), array('I'), array('I'), array('I')
+    strings: dict[str, int] = {}
+    for tok in tokens:
+        kinds.append(token_kinds[tok.type])
+        offsets.append(tok.begin_position)
+        lines.append(tok.line_position)
+        columns.append(tok.column_position or 0)
+        lexemes.append(strings.setdefault(tok.lexeme, len(strings)))
+
+    encoded = [lexeme.encode('utf-8', 'surrogatepass') for lexeme in strings]
+    bounds = array('I', [0])
+    for data in encoded:
+        bounds.append(bounds[-1] + len(data))
+
+    count = len(kinds)
+    chunks = [HEADER.pack(MAGIC, VERSION, 0, count, len(encoded), bounds[-1]),
+              kinds.tobytes(), bytes(_padded(count) - count)]
+    chunks += [_little_endian(column) for column in (offsets, lines, columns, lexemes, bounds)]
+    chunks += encoded
+
+    if isinstance(target, str):
+        with open(target, 'wb') as f:
+            f.writelines(chunks)
+    else:
+        target.writelines(chunks)
+
+
+class TokenFile:
+    """
+    Reads a token file through mmap.
+
+    The columns are memoryviews into the mapping, so opening a file costs the same for any number of
+    tokens and only the tokens that are looked at are turned into Token objects. Lexemes are decoded
+    from the string table once each. It is a read-only sequence of Tokens, so it can be handed straight
+    to the Parser:
+
+        with TokenFile("program.mktk") as tokens:
+            Parser(tokens).parse()
+    """
+
+    def __init__(self, filename: str):
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{filename} is not a token file")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._map[:HEADER.size]
+        if header[:4] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{filename} is not a token file")
+        magic, version, _, count, string_count, string_bytes = HEADER.unpack(header)
+        if version != VERSION:
+            self._map.close()
+            raise ValueError(f"{filename} is a version {version} token file, only version {VERSION} is supported")
+        if len(self._map) < HEADER.size + _padded(count) + 16 * count + 4 * (string_count + 1) + string_bytes:
+            self._map.close()
+            raise ValueError(f"{filename} is truncated")
+
+        view = memoryview(self._map)
+        position = HEADER.size
+        self.kinds = view[position:position + count]
+        position += _padded(count)
+        self.offsets, position = self._column(view, position, count)
+        self.lines, position = self._column(view, position, count)
+        self.columns, position = self._column(view, position, count)
+        self.lexemes, position = self._column(view, position, count)
+        self._bounds, position = self._column(view, position, string_count + 1)
+        self._strings = view[position:position + string_bytes]
+        view.release()
+        self._decoded: list[str | None] = [None] * string_count
+
+    @staticmethod
+    def _column(view: memoryview, position: int, count: int) -> tuple[memoryview | array, int]:
+        end = position + 4 * count
+        if sys.byteorder == 'big':
+            # The file is little-endian, only big-endian machines pay for a swapped copy
+            column = array('I', view[position:end].tobytes())
+            column.byteswap()
+            return column, end
+        return view[position:end].cast('I'), end
+
+    def lexeme_at(self, index: int) -> str:
+        string = self.lexemes[index]
+        lexeme = self._decoded[string]
+        if lexeme is None:
+            lexeme = self._decoded[string] = \
+                str(self._strings[self._bounds[string]:self._bounds[string + 1]], 'utf-8', 'surrogatepass')
+        return lexeme
+
+    def kind_at(self, index: int) -> TokenKind:
+        return TokenKind(self.kinds[index])
+
+    def token_at(self, index: int) -> Token:
+        return Token(kind_names[self.kinds[index]],
+                     self.lexeme_at(index),
+                     begin_position=self.offsets[index],
+                     line_position=self.lines[index],
+                     column_position=self.columns[index] or None)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int | slice) -> Token | list[Token]:
+        if isinstance(index, slice):
+            return [self.token_at(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TokenFile index out of range")
+        return self.token_at(index)
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.kinds)):
+            yield self.token_at(index)
+
+    def close(self):
+        # The views have to be released before the mapping can be closed
+        for name in ('kinds', 'offsets', 'lines', 'columns', 'lexemes', '_bounds', '_strings'):
+            column = getattr(self, name)
+            if isinstance(column, memoryview):
+                column.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"TokenFile({len(self)} tokens, {len(self._decoded)} strings)"
@@ -1,14 +1,23 @@
+from enum import IntEnum
 from typing import Any, Literal
 
 
 class Token:
+    # Slots, a program has one token per lexeme and a dict for each would weigh more than the token
+    __slots__ = ('type', 'kind', 'lexeme', 'begin_position', 'line_position', 'symbol_table_ref', 'column_position')
+
     def __init__(self, type_: Literal["str"] | str, lexeme: str, begin_position: int | None = None,
-                 line_position: int | None = None, symbol_table_ref: Any | None = None):
+                 line_position: int | None = None, symbol_table_ref: Any | None = None,
+                 column_position: int | None = None):
         self.type = type_
+        # Integer twin of type, see TokenKind. Whoever changes type has to change kind too.
+        self.kind = token_kinds.get(type_, TokenKind.SYNTHETIC)
         self.lexeme = lexeme
         self.begin_position = begin_position
         self.line_position = line_position
         self.symbol_table_ref = symbol_table_ref
+        # 1-based column of begin_position within its real line, None for tokens the parser makes up
+        self.column_position = column_position
 
     def __str__(self) -> str:
         return f'<Type-> {self.type}, Lexeme-> {self.lexeme}, ' \
@@ -96,5 +105,91 @@ keywords = {
 bool_ops = [LT_EQ, LT, GT_EQ, GT, EQ, NOT_EQ]
 
 
+class TokenKind(IntEnum):
+    """
+    Integer kinds for the token types above, so dispatch and membership tests are int and
+    set operations and kinds fit in a byte when stored in bulk (see TokenBuffer).
+    """
+    ILLEGAL = 0
+    EOF = 1
+    IDENT = 2
+    INT = 3
+    FLOAT = 4
+    STR = 5
+    BOOL = 6
+    ASSIGN = 7
+    PLUS = 8
+    MINUS = 9
+    BANG = 10
+    ASTERISK = 11
+    SLASH = 12
+    LT_EQ = 13
+    LT = 14
+    GT_EQ = 15
+    GT = 16
+    EQ = 17
+    NOT_EQ = 18
+    DOT = 19
+    COMMA = 20
+    SEMICOLON = 21
+    LPAREN = 22
+    RPAREN = 23
+    LBRACE = 24
+    RBRACE = 25
+    DOUBLE_COLON = 26
+    CONTEXT = 27
+    GLOBAL = 28
+    FUNCTION = 29
+    PRINT = 30
+    LET = 31
+    IF = 32
+    ELSE = 33
+    RETURN = 34
+    TRUE = 35
+    FALSE = 36
+    CLOCK = 37
+    LEN = 38
+    MATH = 39
+    # Tokens the parser makes up itself (PROGRAM, ARGUMENTS, context names, ...)
+    SYNTHETIC = 40
+
+
+# Token type names mapped to their kinds, and back
+token_kinds: dict[str, TokenKind] = {globals()[kind.name]: kind
+                                     for kind in TokenKind if kind is not TokenKind.SYNTHETIC}
+kind_names: dict[TokenKind, str] = {kind: type_ for type_, kind in token_kinds.items()}
+
+# Kind groups the parser checks over and over
+LITERAL_KINDS = frozenset({TokenKind.INT, TokenKind.FLOAT, TokenKind.STR, TokenKind.BOOL})
+PREFIX_KINDS = frozenset({TokenKind.BANG, TokenKind.MINUS})
+BOOL_OP_KINDS = frozenset(token_kinds[op] for op in bool_ops)
+
+# Operator and delimiter lexemes mapped to their token types.
+# Two character operators are listed first so that maximal munch
+# picks '==' over '=' when the table is turned into a pattern.
+operators = {
+    "==": EQ,
+    "!=": NOT_EQ,
+    "<=": LT_EQ,
+    ">=": GT_EQ,
+    "::": DOUBLE_COLON,
+    "=": ASSIGN,
+    "+": PLUS,
+    "-": MINUS,
+    "!": BANG,
+    "*": ASTERISK,
+    "/": SLASH,
+    "<": LT,
+    ">": GT,
+    ".": DOT,
+    ",": COMMA,
+    ";": SEMICOLON,
+    "(": LPAREN,
+    ")": RPAREN,
+    "{": LBRACE,
+    "}": RBRACE,
+}
+
+
 def lookup_ident(ident):
     return keywords.get(ident, IDENT)
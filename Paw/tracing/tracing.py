@@ -0,0 +1,112 @@
+from __future__ import annotations
+import os
+import reprlib
+import sys
+from typing import Any, TextIO
+
+# Trace channels, one per compiler stage
+CHANNELS = ("lexer", "parser", "symbols", "ast")
+
+# Longest rendering of a single traced value
+MAX_REPR = 120
+
+
+class BoundedRepr(reprlib.Repr):
+    """
+    reprlib.Repr that never calls the recursive __repr__/__str__ of parse tree nodes, symbols and
+    symbol tables: they are shown by class name and name only, so a traced node costs the same
+    whether it is a leaf or a whole program.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.maxlevel = 2
+        self.maxdeque = self.maxlist = self.maxtuple = self.maxdict = 4
+        self.maxstring = self.maxother = MAX_REPR
+
+    def repr_instance(self, obj: Any, level: int) -> str:
+        name = getattr(obj, 'name', None) or getattr(obj, 'context_name', None)
+        if name is not None and not hasattr(obj, 'lexeme'):
+            return f"{obj.__class__.__name__}({reprlib.repr(name)})"
+        return super().repr_instance(obj, level)
+
+
+bounded_repr = BoundedRepr().repr
+
+
+class Channel:
+    """
+    A named trace channel. It is falsy while disabled, so a call site on a hot path can skip the call
+    altogether:
+
+        if trace.lexer:
+            trace.lexer("comment ends at %s", self.position)
+
+    Messages are %-formatted only when the channel is enabled. Arguments that are not plain strings or
+    numbers are rendered with bounded_repr.
+    """
+
+    def __init__(self, name: str, tracer: Tracer):
+        self.name = name
+        self.enabled = False
+        self._tracer = tracer
+
+    def __bool__(self) -> bool:
+        return self.enabled
+
+    def __call__(self, message: str, *args: Any):
+        if not self.enabled:
+            return
+        if args:
+            message = message % tuple(arg if isinstance(arg, (str, int, float)) else bounded_repr(arg)
+                                      for arg in args)
+        self._tracer.stream.write(f"[{self.name}] {message}\n")
+
+    def __repr__(self) -> str:
+        return f"Channel({self.name}, {'on' if self.enabled else 'off'})"
+
+
+class Tracer:
+    """
+    Holds the trace channels (trace.lexer, trace.parser, trace.symbols, trace.ast), all disabled by
+    default. The MONKE_TRACE environment variable enables channels at start up, e.g.
+    MONKE_TRACE=parser,symbols or MONKE_TRACE=all.
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream: TextIO = stream or sys.stderr
+        self.lexer = Channel("lexer", self)
+        self.parser = Channel("parser", self)
+        self.symbols = Channel("symbols", self)
+        self.ast = Channel("ast", self)
+
+    def channel(self, name: str) -> Channel:
+        if name not in CHANNELS:
+            raise ValueError(f"Unknown trace channel '{name}', expected one of {CHANNELS}")
+        return getattr(self, name)
+
+    def enable(self, *names: str):
+        for name in names or CHANNELS:
+            self.channel(name).enabled = True
+
+    def disable(self, *names: str):
+        for name in names or CHANNELS:
+            self.channel(name).enabled = False
+
+    def enabled(self) -> list[str]:
+        return [name for name in CHANNELS if self.channel(name).enabled]
+
+
+trace = Tracer()
+
+_from_env = [name.strip() for name in os.environ.get("MONKE_TRACE", "").split(",") if name.strip()]
+if "all" in _from_env:
+    trace.enable()
+else:
+    # A misspelled channel should not keep the compiler from starting, it is left out with a note
+    for _name in _from_env:
+        if _name in CHANNELS:
+            trace.enable(_name)
+        else:
+            trace.stream.write(f"MONKE_TRACE: unknown trace channel '{_name}' ignored, expected one of "
+                               f"{', '.join(CHANNELS)} or all\n")